@@ -28,8 +28,18 @@ Phase 2: Task Execution (Router + Experts)
 
 import os
 import sys
+import signal
+import asyncio
 from pathlib import Path
 
+# uvloop as the default event loop policy (must happen before any loop is created)
+if sys.platform != "win32":
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
+
 # Add project root to path
 project_root = Path(__file__).parent
 if str(project_root) not in sys.path:
@@ -37,19 +47,54 @@ if str(project_root) not in sys.path:
 
 from dotenv import load_dotenv
 from utils.memory_manager import HotMemory
-from agents.contextor import chat_loop as run_contextor
-from agents.router import app as router_app
-from langchain_core.messages import HumanMessage
+from agents.contextor import achat_loop as run_contextor
+from agents.router import get_app as get_router_app, stream_workflow, new_thread_id
+from utils.event_loop import run_async
+from prompt_toolkit import PromptSession
 
 load_dotenv()
 
+EXIT_COMMANDS = frozenset({"q", "exit", "quit"})
+
 # ==========================================================
 # 🎬 MAIN ORCHESTRATOR
 # ==========================================================
 
-def main():
+async def run_interruptible(coro):
+    """
+    Awaits a long-running phase (Contextor, Router workflow) so that Ctrl+C cancels just
+    that phase and surfaces here as KeyboardInterrupt, instead of tearing down amain().
+    """
+    loop = asyncio.get_running_loop()
+    task = asyncio.ensure_future(coro)
+    interrupted = False
+
+    def _on_sigint():
+        nonlocal interrupted
+        interrupted = True
+        task.cancel()
+
+    try:
+        loop.add_signal_handler(signal.SIGINT, _on_sigint)
+    except (NotImplementedError, RuntimeError):
+        pass  # e.g. Windows: asyncio.run's default Ctrl+C handling applies
+    try:
+        return await task
+    except asyncio.CancelledError:
+        # Only a cancel from our handler is a Ctrl+C; anything else cancels amain() itself
+        if interrupted:
+            raise KeyboardInterrupt
+        raise
+    finally:
+        try:
+            loop.remove_signal_handler(signal.SIGINT)
+        except (NotImplementedError, RuntimeError):
+            pass
+
+async def amain():
     """
     Main workflow orchestrator implementing the base_idea.txt architecture.
+    Input is read with prompt_async, so the event loop keeps running while the user types.
     """
     print("=" * 60)
     print("🤖 NotDataAnalyst - Autonomous Analytics System")
@@ -59,6 +104,8 @@ def main():
     print("  └─ Shared Memory via Vector Store (Qdrant)")
     print()
     
+    session = PromptSession()
+
     # Initialize HotMemory to check for existing context
     hot_memory = HotMemory()
     existing_context = hot_memory.get_context()
@@ -78,7 +125,7 @@ def main():
         print("  4. Build a comprehensive project context\n")
         
         try:
-            run_contextor()
+            await run_interruptible(run_async(run_contextor()))
             print("\n✅ Context building complete!")
             print("-" * 60)
         except KeyboardInterrupt:
@@ -87,20 +134,20 @@ def main():
         except Exception as e:
             print(f"\n❌ Error during context building: {e}")
             print("You can still proceed to Router, but agents may lack context.")
-            user_choice = input("\nContinue to Router anyway? (y/n): ").strip().lower()
+            user_choice = (await session.prompt_async("\nContinue to Router anyway? (y/n): ")).strip().lower()
             if user_choice != 'y':
                 return
     else:
         print("✅ Project context already exists in memory.")
         print(f"\n📄 Context Preview:\n{existing_context[:300]}...\n")
         
-        reset_choice = input("Reset context and re-run Contextor? (y/n): ").strip().lower()
+        reset_choice = (await session.prompt_async("Reset context and re-run Contextor? (y/n): ")).strip().lower()
         if reset_choice == 'y':
             # Clear existing context
             hot_memory.set_context("")
             print("\n🔄 Context cleared. Restarting Contextor...\n")
             try:
-                run_contextor()
+                await run_interruptible(run_async(run_contextor()))
                 print("\n✅ Context building complete!")
             except KeyboardInterrupt:
                 print("\n\n🛑 Context building interrupted. Exiting...")
@@ -122,26 +169,28 @@ def main():
     
     print("Commands:")
     print("  'graph'  - Visualize workflow")
+    print("  '/resume' - Continue the last interrupted workflow")
     print("  'q'      - Quit")
     print("  Type your data analysis request to begin.\n")
     
     # Start Router Interactive Loop
     from agents.router import SHARED_SESSION_ID
+    interrupted_thread = None
     
     while True:
         try:
-            user_input = input("\n💬 Your Request: ").strip()
+            user_input = (await session.prompt_async("\n💬 Your Request: ")).strip()
             
             if not user_input:
                 continue
             
-            if user_input.lower() in ['q', 'exit', 'quit']:
+            if user_input.lower() in EXIT_COMMANDS:
                 print("\n👋 Exiting NotDataAnalyst. Goodbye!")
                 break
             
             if user_input.lower() == 'graph':
                 try:
-                    print(router_app.get_graph().draw_ascii())
+                    print(get_router_app().get_graph().draw_ascii())
                 except Exception as e:
                     print(f"Graph visualization requires extra dependencies: {e}")
                 continue
@@ -163,25 +212,34 @@ def main():
                 hot_memory.set_context("")
                 print("✅ Context cleared. Please restart the application to re-run Contextor.")
                 continue
-            # ----------------------
             
-            # Build initial state for Router workflow
-            initial_state = {
-                "user_request": user_input,
-                "messages": [HumanMessage(content=user_input)],
-                "original_task": user_input,
-                "watcher_status": "PASS",
-                "watcher_feedback": ""
-            }
+            if user_input.startswith("/resume"):
+                if not interrupted_thread:
+                    print("Nothing to resume.")
+                    continue
+                # None resumes the thread from its last checkpoint
+                thread_id, initial_state = interrupted_thread, None
+            # ----------------------
+            else:
+                # Build initial state for Router workflow
+                thread_id = new_thread_id()
+                initial_state = {
+                    "user_request": user_input,
+                    "messages": [("User", user_input)],
+                    "original_task": user_input,
+                    "watcher_status": "PASS",
+                    "watcher_feedback": ""
+                }
             
             # Execute the LangGraph workflow
             print("\n" + "-" * 60)
             try:
-                for output in router_app.stream(initial_state):
-                    pass  # Output is handled by print statements in nodes
+                await run_interruptible(run_async(stream_workflow(initial_state, thread_id)))
             except KeyboardInterrupt:
-                print("\n\n🛑 Workflow interrupted by user. Returning to main menu...")
+                interrupted_thread = thread_id
+                print("\n\n🛑 Workflow interrupted by user. Type '/resume' to continue it. Returning to main menu...")
                 continue
+            interrupted_thread = None
             
             print("\n✅ Workflow Completed.")
             print("-" * 60)
@@ -199,7 +257,7 @@ def main():
 # ==========================================================
 if __name__ == "__main__":
     try:
-        main()
+        asyncio.run(amain())
     except KeyboardInterrupt:
         print("\n\n👋 Exiting...")
     except Exception as e:
@@ -1,7 +1,10 @@
 import os
 import sys
-import json
+import time
+import ctypes
+import asyncio
 import threading
+from functools import lru_cache
 from dotenv import load_dotenv
 from typing import List, Dict, Any, Optional
 
@@ -13,7 +16,6 @@ if project_root not in sys.path:
     sys.path.append(project_root)
 
 from langchain_core.messages import SystemMessage, HumanMessage, AIMessage, ToolMessage
-from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 
 # --- Import Tools ---
 from tools.expert_crew_tools import get_expert_tools
@@ -21,8 +23,10 @@ from utils.qdrant_setup import chat_log_search_tool
 
 # --- Import Memory ---
 from utils.memory_manager import HotMemory, WarmMemory
-from utils.memory_manager import HotMemory, WarmMemory
-from utils.model_manager import ModelManager, switch_to_provider
+from utils.model_manager import ModelManager, switch_to_provider, provider_of, record_provider_result, fallback_order
+from utils.event_loop import run_sync
+from utils.messages import flatten_content
+from utils import semantic_cache
 
 # --- Import Prompt Toolkit ---
 from prompt_toolkit import PromptSession
@@ -32,6 +36,65 @@ from prompt_toolkit.application import run_in_terminal
 # Load Env
 load_dotenv()
 
+# Tools that touch shared interpreter state / prompt the user; never run two of these at once
+# (each tool captures only its own thread's stdout, see expert_crew_tools._capture_stdout)
+SERIAL_TOOLS = frozenset({"python_interpreter", "install_package"})
+_SESSION_TOOL_LOCKS: Dict[str, asyncio.Lock] = {}
+
+MAX_HISTORY_CHARS = 3000
+
+TOOL_ERROR_REPLY = "I encountered a tool error. The requested tool is not available. Please use only: python_interpreter, install_package, or chat_log_search."
+
+# Roles stored as the human side of the conversation, in the casings the code writes
+HUMAN_ROLES = frozenset({"user", "User", "USER"})
+EXIT_COMMANDS = frozenset({"exit", "quit"})
+
+async def _arun_tool(selected_tool, args):
+    """
+    asyncio.to_thread(selected_tool.invoke, args), except that cancelling it (Ctrl+C) raises
+    KeyboardInterrupt inside the tool's thread. Otherwise a running cell would keep executing
+    after the task is gone. The interrupt lands at the next Python bytecode, so a long C call
+    (one big pandas operation) finishes first.
+    """
+    state = {"ident": None}
+    lock = threading.Lock()
+
+    def _run():
+        with lock:
+            state["ident"] = threading.get_ident()
+        try:
+            return selected_tool.invoke(args)
+        finally:
+            with lock:
+                state["ident"] = None
+
+    try:
+        return await asyncio.to_thread(_run)
+    except asyncio.CancelledError:
+        with lock:
+            if state["ident"] is not None:
+                ctypes.pythonapi.PyThreadState_SetAsyncExc(ctypes.c_ulong(state["ident"]),
+                                                           ctypes.py_object(KeyboardInterrupt))
+        raise
+
+@lru_cache(maxsize=256)
+def _to_langchain_message(role: str, content: str):
+    """
+    Converts a WarmMemory entry to a LangChain message. Cached: the same history
+    window is converted again on every turn.
+    """
+    # WarmMemory truncates on write; this only catches entries stored before that
+    if len(content) > MAX_HISTORY_CHARS:
+        content = content[:MAX_HISTORY_CHARS] + "... [TRUNCATED]"
+
+    # Treat "User" as Human (set lookup first; .lower() only for unusual casings)
+    if role in HUMAN_ROLES or role.lower() == "user":
+        return HumanMessage(content=content)
+    # Treat ALL other roles (Cleaner, Fe_Agent, etc.) as AI colleagues
+    # We prefix the content with the Role Name so the current agent knows WHO said it
+    return AIMessage(content=f"[{role}]: {content}")
+
+
 class BaseAgent:
     def __init__(self, agent_name: str, system_prompt_template: str, session_id: Optional[str] = None):
         """
@@ -48,56 +111,83 @@ class BaseAgent:
         self.analysis_tools = get_expert_tools()
         self.memory_tools = [chat_log_search_tool]
         self.all_tools = self.analysis_tools + self.memory_tools
-        self.tools_map = {t.name: t for t in self.all_tools}
+        # Lowercased aliases are registered up front; other casings are remembered on first use
+        self.tools_map = {**{t.name.lower(): t for t in self.all_tools}, **{t.name: t for t in self.all_tools}}
         
-        # Bind tools to LLM initially
-        self.current_llm_with_tools = self.llm.bind_tools(self.all_tools)
+        # Bind tools to LLM initially (cached per model in ModelManager)
+        self.current_llm_with_tools = self.model_manager.get_model_with_tools(self.all_tools)
 
         # 2. Setup Memory
         self.hot_memory = HotMemory()
         self.session_id = session_id or f"{agent_name.lower()}_session_v1"
-        self.warm_memory = WarmMemory(session_id=self.session_id, llm=self.llm)
+        self.warm_memory = WarmMemory(session_id=self.session_id, llm=self.llm, max_content_chars=MAX_HISTORY_CHARS)
 
-        # 3. Prepare System Prompt
-        context = self.hot_memory.get_context()
-        if "No global context set" in context:
+        # 3. Prepare System Prompt (context is read once per agent instance)
+        self.project_context = self.hot_memory.get_context()
+        if "No global context set" in self.project_context:
             print(f"⚠️  [{self.agent_name}] WARNING: No Project Context found in Hot Memory.")
         
-        self.formatted_system_prompt = system_prompt_template.format(project_context=context)
+        self.formatted_system_prompt = system_prompt_template.format(project_context=self.project_context)
+        self._system_message = SystemMessage(content=self.formatted_system_prompt)
 
-    def _robust_invoke(self, messages):
+    async def _arobust_invoke(self, messages):
+        """
+        Invokes the LLM behind the semantic cache (utils/semantic_cache.py).
+        Cache misses go through _ainvoke_with_fallback; the store runs in the background.
+        """
+        cached = await asyncio.to_thread(semantic_cache.lookup, messages, semantic_cache.SIMILARITY_THRESHOLD, self.llm)
+        if cached is not None:
+            print(f"⚡ [{self.agent_name}] Semantic cache hit.")
+            return AIMessage(content=cached)
+
+        response = await self._ainvoke_with_fallback(messages)
+        if response.content != TOOL_ERROR_REPLY:
+            # self.llm after the call: a fallback switch stores under the model that answered
+            asyncio.get_running_loop().run_in_executor(None, semantic_cache.store, list(messages), response, self.llm)
+        return response
+
+    async def _ainvoke_with_fallback(self, messages):
         """
         Attempts to invoke the LLM with automatic fallback to other providers.
         Updates self.llm and self.current_llm_with_tools on switch.
         """
         # 1. Try current model
+        current = provider_of(self.llm)
+        start = time.monotonic()
         try:
-            return self.current_llm_with_tools.invoke(messages)
+            response = await self.current_llm_with_tools.ainvoke(messages)
+            record_provider_result(current, True, time.monotonic() - start)
+            return response
         except Exception as e:
             error_str = str(e)
             
             # Check for tool validation errors (model hallucinated a tool that doesn't exist)
             if "tool call validation failed" in error_str or "not in request.tools" in error_str:
                 print(f"⚠️  Tool validation error - model tried to call invalid tool. Returning error message.")
-                return AIMessage(content="I encountered a tool error. The requested tool is not available. Please use only: python_interpreter, install_package, or chat_log_search.")
+                return AIMessage(content=TOOL_ERROR_REPLY)
             
+            record_provider_result(current, False)
             print(f"⚠️  LLM Failed with current/default provider: {e}")
         
-        # 2. Fallback Sequence
+        # 2. Fallback Sequence: skips providers whose breaker is open, fastest first
         providers = ["gemini", "groq", "openrouter"]
         
-        for provider in providers:
+        for provider in fallback_order(providers, exclude=current):
             print(f"🔄 Auto-switching to: {provider}...")
+            start = time.monotonic()
             try:
                 switch_to_provider(provider)
                 
                 # REFRESH internal model state
                 self.llm = self.model_manager.get_model()
-                self.current_llm_with_tools = self.llm.bind_tools(self.all_tools)
+                self.current_llm_with_tools = self.model_manager.get_model_with_tools(self.all_tools)
                 
                 # Retry
-                return self.current_llm_with_tools.invoke(messages)
+                response = await self.current_llm_with_tools.ainvoke(messages)
+                record_provider_result(provider, True, time.monotonic() - start)
+                return response
             except Exception as e:
+                record_provider_result(provider, False)
                 print(f"❌ Provider {provider} failed: {e}")
                 continue
 
@@ -106,30 +196,47 @@ class BaseAgent:
 
     def _build_history(self) -> List:
         """Reconstructs LangChain history from WarmMemory."""
-        messages = [SystemMessage(content=self.formatted_system_prompt)]
-        recent_chat = self.warm_memory.get_recent_messages(limit=30) 
+        recent_chat = self.warm_memory.get_recent_messages_cached(limit=30)
+        return [self._system_message, *(_to_langchain_message(m.get("role"), m.get("content")) for m in recent_chat)]
 
-        for msg in recent_chat:
-            role = msg.get("role")
-            content = msg.get("content")
-            
-            if len(content) > 3000:
-                content = content[:3000] + "... [TRUNCATED]"
-            
-            # Treat "User" as Human
-            if role.lower() == "user":
-                messages.append(HumanMessage(content=content))
-            # Treat ALL other roles (Cleaner, Fe_Agent, etc.) as AI colleagues
-            else:
-                # We prefix the content with the Role Name so the current agent knows WHO said it
-                labeled_content = f"[{role}]: {content}"
-                messages.append(AIMessage(content=labeled_content))
-        return messages
-
-    def run_task(self, task: str) -> str:
+    async def _aexecute_tool_calls(self, tool_calls: List[Dict[str, Any]]) -> List[ToolMessage]:
         """
-        Executes a single task from the Router/Graph and returns the result.
-        This is for AUTOMATED mode (LangGraph).
+        Executes all tool calls of one LLM turn concurrently.
+        Tools that mutate shared state (SERIAL_TOOLS) are serialized through a per-session lock,
+        everything else (e.g. chat_log_search) runs free. Results keep the original call order.
+        """
+        session_lock = _SESSION_TOOL_LOCKS.setdefault(self.session_id, asyncio.Lock())
+
+        async def _execute(tool_call):
+            tool_name = tool_call["name"]
+            args = tool_call["args"]
+
+            selected_tool = self.tools_map.get(tool_name)
+            if selected_tool is None:
+                selected_tool = self.tools_map.get(tool_name.lower())
+                if selected_tool is not None:
+                    self.tools_map[tool_name] = selected_tool
+            if not selected_tool:
+                return f"Error: Tool {tool_name} not found."
+
+            print(f"🛠️  [{self.agent_name}] Executing: {tool_name}...")
+            if selected_tool.name in SERIAL_TOOLS:
+                async with session_lock:
+                    return await _arun_tool(selected_tool, args)
+            return await _arun_tool(selected_tool, args)
+
+        results = await asyncio.gather(*(_execute(tc) for tc in tool_calls), return_exceptions=True)
+
+        return [
+            ToolMessage(f"Error executing tool: {result}" if isinstance(result, Exception) else result,
+                        tool_call_id=tool_call["id"])
+            for tool_call, result in zip(tool_calls, results)
+        ]
+
+    async def run_task_async(self, task: str) -> str:
+        """
+        Async variant of run_task, for callers already on the shared event loop
+        (the LangGraph nodes), so several agents can work concurrently.
         """
         print(f"\n🚀 [{self.agent_name}] Received Task: {task}")
         
@@ -140,9 +247,8 @@ class BaseAgent:
         messages = self._build_history()
 
         try:
-            # 3. Invoke LLM
             # 3. Invoke LLM (Robust)
-            ai_msg = self._robust_invoke(messages)
+            ai_msg = await self._arobust_invoke(messages)
             messages.append(ai_msg)
 
             # 4. Handle Tool Calls (Loop)
@@ -151,43 +257,31 @@ class BaseAgent:
             
             while ai_msg.tool_calls and loop_count < MAX_LOOPS:
                 loop_count += 1
-                for tool_call in ai_msg.tool_calls:
-                    tool_name = tool_call["name"]
-                    args = tool_call["args"]
-                    
-                    selected_tool = self.tools_map.get(tool_name) or self.tools_map.get(tool_name.lower())
-                    
-                    if selected_tool:
-                        print(f"🛠️  [{self.agent_name}] Executing: {tool_name}...")
-                        try:
-                            # Direct execution (Validation is inside the tool now)
-                            tool_output = selected_tool.invoke(args)
-                        except Exception as e:
-                            tool_output = f"Error executing tool: {e}"
-                    else:
-                        tool_output = f"Error: Tool {tool_name} not found."
-
-                    messages.append(ToolMessage(tool_output, tool_call_id=tool_call["id"]))
+                messages.extend(await self._aexecute_tool_calls(ai_msg.tool_calls))
 
                 # Re-invoke after tools
-                # Re-invoke after tools
-                ai_msg = self._robust_invoke(messages)
+                ai_msg = await self._arobust_invoke(messages)
                 messages.append(ai_msg)
 
             # 5. Final Response
-            final_text = ai_msg.content
-            if isinstance(final_text, list):
-                final_text = "\n".join([p.get('text', '') for p in final_text if isinstance(p, dict) and 'text' in p])
+            final_text = flatten_content(ai_msg.content)
 
-            self.warm_memory.add_message(self.agent_name, str(final_text))
+            self.warm_memory.add_message(self.agent_name, final_text)
             print(f"🏁 [{self.agent_name}] Finished: {final_text[:100]}...")
-            return str(final_text)
+            return final_text
 
         except Exception as e:
             error_msg = f"❌ Agent Error: {e}"
             print(error_msg)
             return error_msg
 
+    def run_task(self, task: str) -> str:
+        """
+        Executes a single task from the Router/Graph and returns the result.
+        This is for AUTOMATED mode (LangGraph).
+        """
+        return run_sync(self.run_task_async(task))
+
     def run(self):
         """Main Chat Loop."""
         session = PromptSession()
@@ -205,7 +299,7 @@ class BaseAgent:
             except (KeyboardInterrupt, EOFError):
                 break
 
-            if user_input.lower() in {"exit", "quit"}:
+            if user_input.lower() in EXIT_COMMANDS:
                 break
             if not user_input.strip():
                 continue
@@ -218,45 +312,25 @@ class BaseAgent:
 
             try:
                 # 3. Invoke LLM
-                # 3. Invoke LLM
-                ai_msg = self._robust_invoke(messages)
+                ai_msg = run_sync(self._arobust_invoke(messages))
                 messages.append(ai_msg)
 
                 # 4. Handle Tool Calls
                 while ai_msg.tool_calls:
-                    for tool_call in ai_msg.tool_calls:
-                        tool_name = tool_call["name"]
-                        args = tool_call["args"]
-                        
-                        # --- VALIDATION LAYER (Placeholder for Phase 2) ---
-                        # check_safety(tool_name, args) 
-                        # --------------------------------------------------
-
-                        selected_tool = self.tools_map.get(tool_name) or self.tools_map.get(tool_name.lower())
-                        
-                        if selected_tool:
-                            print(f"🛠️  [{self.agent_name}] Executing: {tool_name}...")
-                            try:
-                                tool_output = selected_tool.invoke(args)
-                            except Exception as e:
-                                tool_output = f"Error executing tool: {e}"
-                        else:
-                            tool_output = f"Error: Tool {tool_name} not found."
-
-                        messages.append(ToolMessage(tool_output, tool_call_id=tool_call["id"]))
+                    # --- VALIDATION LAYER (Placeholder for Phase 2) ---
+                    # check_safety(tool_name, args) 
+                    # --------------------------------------------------
+                    messages.extend(run_sync(self._aexecute_tool_calls(ai_msg.tool_calls)))
 
                     # Re-invoke after tool outputs
-                    # Re-invoke after tool outputs
-                    ai_msg = self._robust_invoke(messages)
+                    ai_msg = run_sync(self._arobust_invoke(messages))
                     messages.append(ai_msg)
 
                 # 5. Final Response
-                final_text = ai_msg.content
-                if isinstance(final_text, list):
-                    # Handle Gemini's occasional list response
-                    final_text = "\n".join([p.get('text', '') for p in final_text if isinstance(p, dict) and 'text' in p])
+                # (handles Gemini's occasional list response)
+                final_text = flatten_content(ai_msg.content)
 
-                self.warm_memory.add_message(self.agent_name, str(final_text))
+                self.warm_memory.add_message(self.agent_name, final_text)
                 print(f"\n{self.agent_name}: {final_text}\n")
 
             except Exception as e:
@@ -264,5 +338,26 @@ class BaseAgent:
                 import traceback
                 traceback.print_exc()
 
+class AgentRegistry:
+    """
+    Lazily constructed, process-wide BaseAgent instances keyed by (name, session_id).
+    Building an agent reads HotMemory, opens Redis and binds tools, so it happens on
+    first use instead of at import time, and only once per agent.
+    """
+    _cache: Dict[tuple, BaseAgent] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def get(cls, agent_name: str, system_prompt_template: str, session_id: Optional[str] = None) -> BaseAgent:
+        key = (agent_name, session_id)
+        agent = cls._cache.get(key)
+        if agent is None:
+            with cls._lock:
+                agent = cls._cache.get(key)
+                if agent is None:
+                    agent = BaseAgent(agent_name, system_prompt_template, session_id=session_id)
+                    cls._cache[key] = agent
+        return agent
+
 if __name__ == "__main__":
     print("Run specific agents (cleaner.py, trainer.py) instead of this base class.")
\ No newline at end of file
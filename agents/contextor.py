@@ -1,7 +1,9 @@
 import os
+import re
 import sys
 import json
-import threading
+import asyncio
+from functools import lru_cache
 from dotenv import load_dotenv
 from typing import Optional, List
 
@@ -14,6 +16,8 @@ if project_root not in sys.path:
 
 from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
 from langchain_core.tools import tool
+from prompt_toolkit import PromptSession
+from prompt_toolkit.patch_stdout import patch_stdout
 
 # --- Import Data Analysis Tools ---
 from tools.contextor_tools import get_data_context
@@ -21,9 +25,12 @@ from tools.contextor_tools import get_data_context
 # --- Import Memory Functions ---
 # Contextor needs direct write access to Cold Storage for initializing the project
 from utils.qdrant_setup import mcp_wrapper
-from utils.qdrant_setup import update_context 
+from utils.qdrant_setup import aupdate_context
 from utils.memory_manager import HotMemory, WarmMemory
 from utils.model_manager import ModelManager
+from utils.semantic_cache import aget_or_invoke
+from utils.event_loop import run_sync
+from utils.messages import flatten_content
 
 # ===============================================================
 # ⚙️ ENV + MODEL SETUP
@@ -32,12 +39,16 @@ load_dotenv()
 model_manager = ModelManager()
 Contextor = model_manager.get_model(temperature=0)
 
+EXIT_COMMANDS = frozenset({"exit", "quit"})
+# The prompt asks for the final context to *end* with **DONE**; a DONE quoted mid-reply doesn't count
+_DONE_RE = re.compile(r"(?:\*\*)?\bDONE\b\W*$")
+
 # ===============================================================
 # 🧵 BACKGROUND PROCESS
 # ===============================================================
-def process_and_save_summary(raw_summary: str, file_path: str):
+async def process_and_save_summary(raw_summary: str, file_path: str):
     """
-    Background task to:
+    Background task (scheduled with asyncio.create_task) to:
     1. Improve the raw data summary using Contextor.
     2. Save it to Qdrant (Cold Memory) under section="Data_summary".
     """
@@ -53,13 +64,13 @@ def process_and_save_summary(raw_summary: str, file_path: str):
             HumanMessage(content=f"Here is the raw summary:\n\n{raw_summary}")
         ]
         
-        # Invoke Contextor to get improved summary
+        # Invoke Contextor to get improved summary (re-analyzing the same dataset hits the semantic cache)
         # Note: We use a separate invocation here, not affecting the main chat memory
-        improved_response = Contextor.invoke(improvement_prompt)
-        improved_summary = str(improved_response.content).strip()
+        improved_response = await aget_or_invoke(Contextor, improvement_prompt)
+        improved_summary = flatten_content(improved_response.content)
         
         # Save to Qdrant (Cold Storage)
-        update_context(
+        await aupdate_context(
             improved_summary,
             dataset=file_path,
             agent="Contextor",
@@ -70,45 +81,99 @@ def process_and_save_summary(raw_summary: str, file_path: str):
     except Exception as e:
         print(f"\n❌ [Background] Error processing data summary: {e}")
 
+async def save_final_context(final_context: str, file_path: str):
+    """
+    Background task: saves the final project context to Qdrant (Cold Memory) so it can be
+    retrieved after a restart. Started at DONE so the session isn't blocked on the write.
+    """
+    result = await aupdate_context(
+        final_context,
+        dataset=file_path,
+        agent="Contextor",
+        section="Context"
+    )
+    if result.startswith("Error"):
+        print(f"❌ Persistent Context (Cold Memory) not saved: {result}")
+    else:
+        print("🧊 Persistent Context (Cold Memory) saved!")
+
+@lru_cache(maxsize=32)
+def derive_session_id(file_path: str) -> str:
+    """Deterministic WarmMemory session ID for a dataset's setup phase."""
+    return f"setup_{os.path.basename(file_path).replace(' ', '_')}"
+
 # ===============================================================
 # 🧠 HELPER: History Reconstruction
 # ===============================================================
-def build_langchain_history(system_prompt: str, warm_memory: WarmMemory) -> List:
+def build_langchain_history(system_message: SystemMessage, warm_memory: WarmMemory) -> List:
     """
     Reconstructs the LangChain message history from WarmMemory (Redis).
     This ensures the LLM always sees the 'Hot' window of context.
+    `system_message` is built once per session by the caller and reused every turn.
     """
-    messages = [SystemMessage(content=system_prompt)]
+    messages = [system_message]
     
-    # Fetch recent chat history (Last 20 messages)
-    recent_chat = warm_memory.get_recent_messages(limit=20)
+    # Fetch recent chat history (Last 20 messages), served from WarmMemory's in-process window
+    recent_chat = warm_memory.get_recent_messages_cached(limit=20)
     
     for msg in recent_chat:
-        role = msg.get("role")
-        content = msg.get("content")
-        
-        if role.lower() == "user":
-            messages.append(HumanMessage(content=content))
-        elif role.lower() in ["ai", "contextor", "assistant"]:
-            messages.append(AIMessage(content=content))
+        converted = _to_langchain_message(msg.get("role"), msg.get("content"))
+        if converted is not None:
+            messages.append(converted)
             
     return messages
 
+@lru_cache(maxsize=128)
+def _to_langchain_message(role: str, content: str):
+    """Converts a WarmMemory entry; cached, since each turn only adds two new messages."""
+    if role.lower() == "user":
+        return HumanMessage(content=content)
+    elif role.lower() in ["ai", "contextor", "assistant"]:
+        return AIMessage(content=content)
+    return None
+
 # ===============================================================
 # 💬 MAIN CHAT LOOP
 # ===============================================================
-def chat_loop():
+async def achat_loop():
+    """
+    Async Contextor session. Input is read with prompt_async, so the background
+    summary task (improve + embed + upsert) runs during the user's think time.
+    Output goes through patch_stdout so streamed tokens and background prints
+    don't garble the prompt.
+    """
+    with patch_stdout():
+        await _run_session()
+
+async def _prompt(session: PromptSession, message: str) -> Optional[str]:
+    """
+    prompt_async on the shared loop. Ctrl+C becomes a cancellation of the session (the caller
+    sees it as an interrupt) and Ctrl+D returns None; letting prompt_toolkit's
+    KeyboardInterrupt escape would kill the shared loop's thread instead.
+    """
+    try:
+        return await session.prompt_async(message)
+    except KeyboardInterrupt:
+        raise asyncio.CancelledError from None
+    except EOFError:
+        return None
+
+async def _run_session():
     print("Test session started! Type 'exit' to quit.\n")
+    session = PromptSession()
 
     # Ask for file path once
-    file_path = input("Enter dataset file/folder path or database connection string: ").strip()
+    file_path = await _prompt(session, "Enter dataset file/folder path or database connection string: ")
+    if file_path is None:
+        return
+    file_path = file_path.strip()
     if not os.path.exists(file_path):
         print("❌ File not found. Exiting.")
         return
 
     # Initialize Warm Memory for this session
     # Using a deterministic ID for this setup phase
-    session_id = f"setup_{os.path.basename(file_path).replace(' ', '_')}"
+    session_id = derive_session_id(file_path)
     warm_memory = WarmMemory(session_id=session_id)
     
     # Clear previous setup attempts for a clean slate
@@ -117,19 +182,14 @@ def chat_loop():
     print("\n📊 Collecting Context...\n")
     try:
         # Get raw summary
-        dataset_summary = get_data_context(file_path)
+        dataset_summary = await asyncio.to_thread(get_data_context, file_path)
         print("✅ Dataset analyzed successfully.\n")
         
         # Save structured metadata to Warm Memory (Redis) for fast access
         warm_memory.save_metadata("dataset_path", file_path)
         
-        # Start background thread to improve and save summary to Cold Storage
-        summary_thread = threading.Thread(
-            target=process_and_save_summary, 
-            args=(dataset_summary, file_path),
-            daemon=True
-        )
-        summary_thread.start()
+        # Improve and save summary to Cold Storage in the background, overlapping the Q&A below
+        summary_task = asyncio.create_task(process_and_save_summary(dataset_summary, file_path))
         
     except Exception as e:
         print(f"❌ Error analyzing data: {e}")
@@ -164,22 +224,49 @@ def chat_loop():
     # We manually inject the first user trigger into memory to start the loop
     warm_memory.add_message("user", "Please begin the conversation by asking your first question.")
 
-    # Generate first response
-    history = build_langchain_history(system_prompt_content, warm_memory)
-    first_response = Contextor.invoke(history)
-    
-    if isinstance(first_response.content, list):
-        first_text = " ".join([p.get("text", "") for p in first_response.content if isinstance(p, dict)]).strip()
-    else:
-        first_text = str(first_response.content).strip()
+    context_task = None
+    try:
+        context_task = await _converse(system_prompt_content, warm_memory, file_path, session)
+    finally:
+        # Don't let the session end drop the pending Qdrant writes; they run concurrently
+        await asyncio.gather(summary_task, *([context_task] if context_task else []))
 
+async def _astream_reply(history: List) -> str:
+    """
+    Streams Contextor's reply to the terminal as it is generated; returns the full text.
+    The stream always runs to the end: whether a **DONE** in it finishes the setup can
+    only be decided on the complete reply (_DONE_RE, the marker must come last).
+    """
+    parts = []
+    print("AI: ", end="", flush=True)
+    async for chunk in Contextor.astream(history):
+        content = chunk.content
+        text = content if isinstance(content, str) else "".join(
+            p["text"] for p in content if isinstance(p, dict) and "text" in p
+        )
+        if text:
+            print(text, end="", flush=True)
+            parts.append(text)
+    print("\n")
+    return "".join(parts).strip()
+
+async def _converse(system_prompt_content: str, warm_memory: WarmMemory, file_path: str, session: PromptSession):
+    """
+    Runs the Q&A until Contextor answers with the final context (DONE).
+    Returns the background task saving that context to Cold Memory, if one was started.
+    """
+    # The (large) system prompt never changes during the session; build its message once
+    system_message = SystemMessage(content=system_prompt_content)
+
+    # Generate first response
+    history = build_langchain_history(system_message, warm_memory)
+    first_text = await _astream_reply(history)
     warm_memory.add_message("Contextor", first_text)
-    print(f"AI: {first_text}\n")
 
     # Interactive loop
     while True:
-        user_input = input("You: ")
-        if user_input.lower() in {"exit", "quit"}:
+        user_input = await _prompt(session, "You: ")
+        if user_input is None or user_input.lower() in EXIT_COMMANDS:
             print("Chat ended manually.")
             break
 
@@ -188,23 +275,19 @@ def chat_loop():
         warm_memory.add_message("User", user_input)
 
         # 2. Reconstruct History from Warm Memory
-        history = build_langchain_history(system_prompt_content, warm_memory)
+        history = build_langchain_history(system_message, warm_memory)
 
-        # 3. Invoke LLM
-        response = Contextor.invoke(history)
-        if isinstance(response.content, list):
-            ai_text = " ".join([p.get("text", "") for p in response.content if isinstance(p, dict)]).strip()
-        else:
-            ai_text = str(response.content).strip()
+        # 3. Invoke LLM (streamed to the terminal)
+        print()
+        ai_text = await _astream_reply(history)
 
         # 4. Add AI Response to Warm Memory
         warm_memory.add_message("Contextor", ai_text)
-        print(f"\nAI: {ai_text}\n")
 
         # 5. Check for Completion
-        if "DONE" in ai_text:
+        if _DONE_RE.search(ai_text):
             print("✅ Context generation completed.\n")
-            final_context = ai_text.replace("DONE", "").strip()
+            final_context = _DONE_RE.sub("", ai_text).strip()
 
             # --- A) Save to Hot Memory (Global System Prompt) ---
             # This makes the context immediately available to other agents in the runtime
@@ -213,17 +296,16 @@ def chat_loop():
 
             # --- B) Save to Cold Memory (Persistent Qdrant) ---
             # This ensures we can retrieve this context even after a restart
-            update_context(
-                final_context,
-                dataset=file_path,
-                agent="Contextor",
-                section="Context"
-            )
-            print("🧊 Persistent Context (Cold Memory) saved!")
+            context_task = asyncio.create_task(save_final_context(final_context, file_path))
             
             # Optional: Clear the setup session from Redis as it's done
             # warm_memory.clear_session() 
-            break
+            return context_task
+    return None
+
+def chat_loop():
+    """Sync entry point; runs the session on the shared agent event loop."""
+    run_sync(achat_loop())
 
 if __name__ == "__main__":
     chat_loop()
\ No newline at end of file
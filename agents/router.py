@@ -1,8 +1,11 @@
 import os
 import sys
 import re
+import asyncio
+import uuid
 import operator
-from typing import Annotated, List, TypedDict, Union, Dict
+from functools import lru_cache
+from typing import Annotated, List, Optional, Tuple, TypedDict, Union, Dict
 
 # Add project root to path so we can import 'tools' and 'utils'
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -13,17 +16,22 @@ if project_root not in sys.path:
 
 from dotenv import load_dotenv
 from utils.model_manager import ModelManager
-from langgraph.graph import StateGraph, END
-from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
+from langchain_core.messages import HumanMessage, SystemMessage
+
+try:
+    import orjson as _json  # faster parser for the (common) well-formed case
+except ImportError:
+    import json as _json
 
 # Import Agent Definitions
 # We instantiate the BaseAgent with the prompts defined in your files
-from agents.base_agent import BaseAgent
+from agents.base_agent import AgentRegistry
 from agents.cleaner import CLEANER_PROMPT
 from agents.feature_engineer import FE_PROMPT
 from agents.vizualizer import VIZ_PROMPT
 from agents.trainer import TRAINER_PROMPT
 from utils.model_manager import switch_to_provider
+from utils.event_loop import run_sync
 
 load_dotenv()
 
@@ -43,7 +51,8 @@ class AgentState(TypedDict):
     viz_task: str
     trainer_task: str
     
-    messages: Annotated[List[str], operator.add]
+    # (agent, result) pairs; rendered to text only when building a prompt (see render_history)
+    messages: Annotated[List[Tuple[str, str]], operator.add]
     errors: Annotated[List[str], operator.add]
     last_agent: str  # Tracks who ran last to guide the Watcher's routing
     
@@ -51,21 +60,46 @@ class AgentState(TypedDict):
     watcher_status: str   # "PASS" or "RETRY"
     watcher_feedback: str  # Feedback message from Watcher
 
+def render_history(messages: List[Tuple[str, str]], k: int = 10) -> str:
+    """Renders the last `k` (agent, result) entries as 'Agent: result' lines."""
+    return "\n".join(f"{agent}: {result}" for agent, result in messages[-k:])
+
 # ==========================================================
 # 🤖 INITIALIZE AGENTS
 # ==========================================================
-# Instantiate Agents with SHARED session ID for shared context
+# Agents share one session ID for shared context. They are built on first use
+# (AgentRegistry), so they also pick up the context Contextor saved after import.
 SHARED_SESSION_ID = "shared_session_v1"
+EXIT_COMMANDS = frozenset({"q", "exit", "quit"})
 
-cleaner_agent = BaseAgent("Cleaner", CLEANER_PROMPT, session_id=SHARED_SESSION_ID)
-fe_agent = BaseAgent("Feature_Engineer", FE_PROMPT, session_id=SHARED_SESSION_ID)
-viz_agent = BaseAgent("Visualizer", VIZ_PROMPT, session_id=SHARED_SESSION_ID)
-trainer_agent = BaseAgent("Trainer", TRAINER_PROMPT, session_id=SHARED_SESSION_ID)
+def get_agent(agent_name: str, prompt: str):
+    return AgentRegistry.get(agent_name, prompt, session_id=SHARED_SESSION_ID)
 
 # Router LLM (The Manager)
 model_manager = ModelManager()
 router_llm = model_manager.get_model(temperature=0)
 
+# ==========================================================
+# 🧩 JSON PARSING
+# ==========================================================
+_FENCE_RE = re.compile(r"```json\s*(.*?)\s*```", re.S)
+
+def parse_llm_json(content: str):
+    """
+    Parses the JSON object in an LLM reply (fenced ```json block or bare).
+    Valid JSON is parsed directly; only malformed output goes through json_repair.
+    """
+    match = _FENCE_RE.search(content)
+    raw = match.group(1) if match else content.strip()
+    try:
+        parsed = _json.loads(raw)
+        if isinstance(parsed, dict):
+            return parsed
+    except ValueError:
+        pass
+    import json_repair
+    return json_repair.repair_json(content, return_objects=True)
+
 # ==========================================================
 # 🧠 ROUTER LOGIC
 # ==========================================================
@@ -80,8 +114,8 @@ Your role has two modes:
 Determine the user's intent and output a single JSON object that dictates the next step.
 
 ### 📋 Available Agents (The Expert Crew)
-1.  **Cleaner:** Fixes datatypes, nulls, duplicates. (Output: 'clean_data.parquet')
-2.  **Feature_Engineer:** Adds new columns, ratios, segments. (Output: 'engineered_data.parquet')
+1.  **Cleaner:** Fixes datatypes, nulls, duplicates. (Output: dataset tag 'clean_data')
+2.  **Feature_Engineer:** Adds new columns, ratios, segments. (Output: dataset tag 'engineered_data')
 3.  **Visualizer:** Creates charts/plots. (Does NOT clean or train).
 4.  **Trainer:** Trains ML models, predicts, evaluates.
 
@@ -127,7 +161,11 @@ Router Output:
 }```
 """
 
-def router_node(state: AgentState):
+# Assembled once; only a FAIL verdict needs a different system prompt
+JSON_WRAP_INSTRUCTION = "\n\nCRITICAL: YOU MUST WRAP YOUR OUTPUT IN ```json ... ```"
+ROUTER_SYSTEM_MESSAGE = SystemMessage(content=ROUTER_SYSTEM_PROMPT + JSON_WRAP_INSTRUCTION)
+
+async def router_node(state: AgentState):
     print("\n🚦 [ROUTER] Analyzing Request...")
     request = state["user_request"]
     
@@ -151,21 +189,23 @@ DO NOT say "already complete". The Watcher verdict OVERRIDES your judgment.
     
     # 1. Invoke LLM
     # Format history for context
-    history = "\n".join([str(m) for m in state.get("messages", [])])
+    history = render_history(state.get("messages", []))
     
-    system_prompt = ROUTER_SYSTEM_PROMPT + fail_context + "\n\nCRITICAL: YOU MUST WRAP YOUR OUTPUT IN ```json ... ```"
+    if fail_context:
+        system_message = SystemMessage(content=ROUTER_SYSTEM_PROMPT + fail_context + JSON_WRAP_INSTRUCTION)
+    else:
+        system_message = ROUTER_SYSTEM_MESSAGE
     
     messages = [
-        ("system", system_prompt),
-        ("user", f"Request: {request}\n\nExisting Execution History (Do NOT re-run completed tasks unless failed):\n{history}")
+        system_message,
+        HumanMessage(content=f"Request: {request}\n\nExisting Execution History (Do NOT re-run completed tasks unless failed):\n{history}")
     ]
-    response = router_llm.invoke(messages)
+    response = await router_llm.ainvoke(messages)
     content = response.content
     
     # 2. Robust JSON Extraction and Cleanup using json_repair
     try:
-        import json_repair
-        tasks = json_repair.repair_json(content, return_objects=True)
+        tasks = parse_llm_json(content)
         
         # 3. Extract and Display Chat Response
         chat_response = tasks.pop("chat_response", "✅ Task delegated or completed.")
@@ -188,7 +228,7 @@ DO NOT say "already complete". The Watcher verdict OVERRIDES your judgment.
         "viz_task": tasks.get("viz_task"),
         "trainer_task": tasks.get("trainer_task"),
         # Add a placeholder message for the final output, not the chat response
-        "messages": [AIMessage(content=f"Router Decision: {tasks}")] 
+        "messages": [("Router Decision", str(tasks))]
     }
     
 # ==========================================================
@@ -197,49 +237,94 @@ DO NOT say "already complete". The Watcher verdict OVERRIDES your judgment.
 
 from agents.watcher import WATCHER_PROMPT
 
-# Initialize Watcher
-watcher_agent = BaseAgent("Watcher", WATCHER_PROMPT, session_id=SHARED_SESSION_ID)
-
-def run_agent_safely(agent_func, task, state):
-    """Helper to run agents with interrupt handling."""
+async def run_agent_safely(agent_func, task, state):
+    """
+    Helper to run agents with interrupt handling.
+    Nodes are async (on the shared loop), so Ctrl+C arrives as cancellation.
+    """
     try:
         # If there is feedback, append it to the task
         if state.get("watcher_status") == "RETRY":
              task = f"FEEDBACK_FROM_WATCHER: {state.get('watcher_feedback')}\n\nORIGINAL_TASK: {task}"
         
-        return agent_func(task)
-    except KeyboardInterrupt:
+        return await agent_func(task)
+    except asyncio.CancelledError:
         print(f"\n🛑 Agent execution interrupted.")
-        return "Task interrupted by user."
+        raise
+
+# --- Speculative execution past the Watcher ---
+# PASS is by far the most common verdict, so while the Watcher reviews a step the next step(s)
+# already start; on FAIL they are cancelled, otherwise their node just awaits the running task.
+# Latency per reviewed step becomes max(watcher, next) instead of watcher + next.
+# Off by default (SPECULATE_PAST_WATCHER=1 to enable): cancelling on FAIL does not undo what the
+# speculative agent already did (saved datasets, running tool calls, messages in the shared
+# WarmMemory session the Watcher reads its history from).
+SPECULATE_PAST_WATCHER = os.getenv("SPECULATE_PAST_WATCHER", "0").strip() == "1"
+
+# node -> (agent name, prompt, task key)
+PIPELINE_AGENTS = {
+    "feature_engineer": ("Feature_Engineer", FE_PROMPT, "fe_task"),
+    "visualizer": ("Visualizer", VIZ_PROMPT, "viz_task"),
+    "trainer": ("Trainer", TRAINER_PROMPT, "trainer_task"),
+}
+_speculative: Dict[Tuple[str, str], asyncio.Task] = {}
+
+def start_speculative(state: AgentState):
+    """Starts the agents the pipeline will run if the Watcher passes the current step."""
+    for node in next_after_review(state):
+        agent_name, prompt, task_key = PIPELINE_AGENTS[node]
+        task = state.get(task_key)
+        if task and (node, task) not in _speculative:
+            print(f"⚡ Speculatively starting {agent_name} while the Watcher reviews...")
+            _speculative[(node, task)] = asyncio.create_task(get_agent(agent_name, prompt).run_task_async(task))
+
+def cancel_speculative():
+    for (node, _), spec in list(_speculative.items()):
+        if not spec.done():
+            print(f"🛑 Cancelling speculative {PIPELINE_AGENTS[node][0]} run.")
+            spec.cancel()
+    _speculative.clear()
+
+async def run_pipeline_agent(node: str, state: AgentState) -> str:
+    """Runs a pipeline node's agent, reusing the speculative run for the same task if there is one."""
+    agent_name, prompt, task_key = PIPELINE_AGENTS[node]
+    task = state.get(task_key)
+    spec = _speculative.pop((node, task), None)
+    if spec is not None:
+        try:
+            return await spec
+        except asyncio.CancelledError:
+            spec.cancel()
+            raise
+    return await run_agent_safely(get_agent(agent_name, prompt).run_task_async, task, state)
 
-def cleaner_node(state: AgentState):
+async def cleaner_node(state: AgentState):
     task = state.get("cleaner_task")
     if not task: return {}
-    # Note: BaseAgent.run_task already prints the task received
-    result = run_agent_safely(cleaner_agent.run_task, task, state)
-    return {"messages": [AIMessage(content=f"Cleaner: {result}")], "last_agent": "cleaner"}
-
-def fe_node(state: AgentState):
-    task = state.get("fe_task")
-    if not task: return {}
-    result = run_agent_safely(fe_agent.run_task, task, state)
-    return {"messages": [AIMessage(content=f"FE: {result}")], "last_agent": "feature_engineer"}
-
-def viz_node(state: AgentState):
-    task = state.get("viz_task")
-    if not task: return {}
-    result = run_agent_safely(viz_agent.run_task, task, state)
+    # Note: BaseAgent.run_task_async already prints the task received
+    result = await run_agent_safely(get_agent("Cleaner", CLEANER_PROMPT).run_task_async, task, state)
+    return {"messages": [("Cleaner", result)], "last_agent": "cleaner"}
+
+async def fe_node(state: AgentState):
+    if not state.get("fe_task"): return {}
+    result = await run_pipeline_agent("feature_engineer", state)
+    return {"messages": [("FE", result)], "last_agent": "feature_engineer"}
+
+# Visualizer and Trainer are async so that, when fanned out together, they overlap:
+# wall-clock ≈ max(viz, trainer) instead of viz + trainer.
+async def viz_node(state: AgentState):
+    if not state.get("viz_task"): return {}
+    result = await run_pipeline_agent("visualizer", state)
     # Note: No last_agent update - this node goes directly to END
-    return {"messages": [AIMessage(content=f"Visualizer: {result}")]}
+    return {"messages": [("Visualizer", result)]}
 
-def trainer_node(state: AgentState):
-    task = state.get("trainer_task")
-    if not task: return {}
-    result = run_agent_safely(trainer_agent.run_task, task, state)
+async def trainer_node(state: AgentState):
+    if not state.get("trainer_task"): return {}
+    result = await run_pipeline_agent("trainer", state)
     # Note: No last_agent update - this node goes directly to END
-    return {"messages": [AIMessage(content=f"Trainer: {result}")]}
+    return {"messages": [("Trainer", result)]}
 
-def watcher_node(state: AgentState):
+async def watcher_node(state: AgentState):
     """
     The Critic Node.
     Reviews the last message with 3-level severity: PASS, WARN, FAIL.
@@ -247,19 +332,20 @@ def watcher_node(state: AgentState):
     print("\n👀 [WATCHER] Reviewing work...")
     
     # Get the last message (content of the work done)
-    last_msg = state["messages"][-1] if state["messages"] else AIMessage(content="")
-    last_agent_output = last_msg.content
+    last_agent_output = render_history(state["messages"], k=1)
     
+    if SPECULATE_PAST_WATCHER:
+        start_speculative(state)
     try:
-        review = watcher_agent.run_task(f"Review this output: {last_agent_output}")
-    except KeyboardInterrupt:
+        review = await get_agent("Watcher", WATCHER_PROMPT).run_task_async(f"Review this output: {last_agent_output}")
+    except asyncio.CancelledError:
         print("\n🛑 Watcher interrupted by user.")
-        return {"watcher_status": "INTERRUPTED", "watcher_feedback": "Watcher interrupted by user."} 
+        cancel_speculative()
+        raise
 
     # Clean the JSON output
     try:
-        import json_repair
-        cleaned_review = json_repair.repair_json(review, return_objects=True)
+        cleaned_review = parse_llm_json(review)
     except Exception as e:
         print(f"❌ Watcher failed to parse JSON even with repair: {e}. Defaulting to PASS.")
         return {"watcher_status": "PASS", "watcher_feedback": "Watcher output unparseable, defaulting to PASS."}
@@ -274,6 +360,7 @@ def watcher_node(state: AgentState):
     # Log based on severity
     if status == "FAIL":
         print(f"❌ Watcher Verdict: FAIL -> {feedback}")
+        cancel_speculative()  # the Router replans; the work built on the failed step is moot
         return {"watcher_status": "FAIL", "watcher_feedback": feedback}
     elif status == "WARN":
         print(f"⚠️  Watcher Verdict: WARN -> {feedback}")
@@ -283,55 +370,47 @@ def watcher_node(state: AgentState):
         return {"watcher_status": "PASS", "watcher_feedback": feedback}
 
 # ==========================================================
-# 🕸️ GRAPH CONSTRUCTION
+# 🔀 ROUTING
 # ==========================================================
-workflow = StateGraph(AgentState)
+def downstream_branch(state: AgentState):
+    """The independent Viz/Trainer nodes to fan out to (may be empty)."""
+    return [node for node, key in (("visualizer", "viz_task"), ("trainer", "trainer_task")) if state.get(key)]
 
-# 1. Add Nodes
-workflow.add_node("router", router_node)
-workflow.add_node("cleaner", cleaner_node)
-workflow.add_node("feature_engineer", fe_node)
-workflow.add_node("visualizer", viz_node)
-workflow.add_node("trainer", trainer_node)
-workflow.add_node("watcher", watcher_node)
-
-# 2. Define Edges (The Logic Flow)
-workflow.set_entry_point("router")
+def next_after_review(state: AgentState) -> List[str]:
+    """The node(s) the pipeline continues with once the Watcher passes `last_agent`'s work."""
+    last = state.get("last_agent")
+    # Logic: Output of Cleaner -> Feature Engineer (or Viz/Train if skipped)
+    if last == "cleaner" and state.get("fe_task"):
+        return ["feature_engineer"]
+    # Logic: Output of FE (or Cleaner without FE task) -> Parallel Viz/Train
+    if last in ("cleaner", "feature_engineer"):
+        return downstream_branch(state)
+    return []
 
 # Router -> Cleaner (If task exists) OR Router -> FE (If no clean task)
+# OR Router -> (Viz + Trainer) in parallel when there is nothing upstream to wait for
 def route_after_router(state: AgentState):
+    from langgraph.graph import END
+
     if state.get("cleaner_task"):
         return "cleaner"
     elif state.get("fe_task"):
         return "feature_engineer"
-    elif state.get("viz_task"):
-        return "visualizer"
-    elif state.get("trainer_task"):
-        return "trainer"
-    return END
 
-workflow.add_conditional_edges(
-    "router",
-    route_after_router
-)
-
-# Serial Flow: Cleaner -> FE -> (Viz + Trainer)
-# This enforces the dependency chain you requested
-workflow.add_edge("cleaner", "watcher")
-
-# Post-Cleaner Flow handled by unified router
-# workflow.add_conditional_edges("watcher", route_after_cleaner) <- REMOVED CONFLICT
-
-# FE -> Watcher -> Next
-workflow.add_edge("feature_engineer", "watcher") 
+    next_nodes = downstream_branch(state)
+    if next_nodes:
+        print(f"🔀 Branching to parallel nodes: {next_nodes}")
+        return next_nodes
+    return END
 
 def route_after_watcher(state: AgentState):
     """
     Unified routing logic after Watcher review.
     Handles 3-level severity: PASS, WARN, FAIL.
     """
-    watcher_status = state.get('watcher_status')
-    last = state.get('last_agent')
+    from langgraph.graph import END
+
+    watcher_status, feedback, last = map(state.get, ("watcher_status", "watcher_feedback", "last_agent"))
     print(f"DEBUG: Routing State -> Last: {last}, Watcher: {watcher_status}")
     
     # 1. Handle FAIL - Route back to Router for replanning
@@ -341,55 +420,169 @@ def route_after_watcher(state: AgentState):
     
     # 2. Handle WARN - Log warning but continue pipeline
     if watcher_status == "WARN":
-        feedback = state.get('watcher_feedback', '')
-        print(f"⚠️  WARN logged: {feedback}. Continuing pipeline...")
+        print(f"⚠️  WARN logged: {feedback or ''}. Continuing pipeline...")
         # Fall through to normal routing
     
     # 3. PASS or WARN → Continue normal pipeline flow
-    
-    # Logic: Output of Cleaner -> Feature Engineer (or Viz/Train if skipped)
-    if last == "cleaner":
-        if state.get("fe_task"): return "feature_engineer"
-        # If no FE task, fall through to Viz/Train checks immediately
-        
-    # Logic: Output of FE (or Cleaner fell through) -> Parallel Viz/Train
-    if last in ["cleaner", "feature_engineer"]:
-        next_nodes = []
-        if state.get("viz_task"): next_nodes.append("visualizer")
-        if state.get("trainer_task"): next_nodes.append("trainer")
-        
-        if next_nodes:
-            print(f"🔀 Branching to parallel nodes: {next_nodes}")
-            return next_nodes
+    next_nodes = next_after_review(state)
+    if next_nodes == ["feature_engineer"]:
+        return "feature_engineer"
+    if next_nodes:
+        print(f"🔀 Branching to parallel nodes: {next_nodes}")
+        return next_nodes
             
     return END
 
-# Apply the ONE conditional edge for Watcher
-workflow.add_conditional_edges("watcher", route_after_watcher)
+# ==========================================================
+# 💾 CHECKPOINTING
+# ==========================================================
+def _build_checkpointer():
+    """
+    Saves graph state after every step so an interrupted run can be resumed instead of
+    recomputed. Redis-backed when REDIS_URL is set and langgraph-checkpoint-redis is
+    installed, in-memory otherwise. Both implement the async API `astream` needs.
+    """
+    redis_url = os.getenv("REDIS_URL", "").strip()
+    if redis_url:
+        try:
+            from langgraph.checkpoint.redis.aio import AsyncRedisSaver
+            return AsyncRedisSaver(redis_url=redis_url)
+        except Exception as e:
+            print(f"⚠️ Redis checkpointer unavailable, keeping checkpoints in memory: {e}")
+    from langgraph.checkpoint.memory import MemorySaver
+    return MemorySaver()
+
+_checkpointer_ready = False
+
+async def _ensure_checkpointer(app):
+    """Creates the Redis indices on first use (on the shared loop the saver is bound to)."""
+    global _checkpointer_ready
+    if _checkpointer_ready:
+        return
+    if hasattr(app.checkpointer, "asetup"):
+        try:
+            await app.checkpointer.asetup()
+        except Exception as e:
+            print(f"⚠️ Redis checkpointer setup failed, keeping checkpoints in memory: {e}")
+            from langgraph.checkpoint.memory import MemorySaver
+            app.checkpointer = MemorySaver()
+    _checkpointer_ready = True
+
+_kept_thread: Optional[str] = None  # the interrupted run `/resume` can still continue
+
+async def _release_checkpoints(app, thread_id: str, outcome: str):
+    """
+    Deletes checkpoints nobody can resume any more. Every request gets a fresh thread_id, so
+    without this MemorySaver keeps every step of every request until the process exits.
+    outcome: "interrupted" keeps this thread (replacing the previous kept one), "completed"
+    drops it and the kept one (the CLI forgets it), "failed" drops it unless it's the kept one.
+    """
+    global _kept_thread
+    stale = set()
+    if outcome == "interrupted":
+        stale.add(_kept_thread)
+        _kept_thread = thread_id
+    elif outcome == "completed":
+        stale.update((thread_id, _kept_thread))
+        _kept_thread = None
+    elif thread_id != _kept_thread:
+        stale.add(thread_id)
+    stale.discard(None)
+    stale.discard(_kept_thread)
+    for stale_id in stale:
+        try:
+            await app.checkpointer.adelete_thread(stale_id)
+        except Exception as e:
+            print(f"⚠️ Could not delete checkpoints of {stale_id}: {e}")
+
+# ==========================================================
+# 🕸️ GRAPH CONSTRUCTION
+# ==========================================================
+@lru_cache(maxsize=1)
+def get_app():
+    """
+    Builds and compiles the graph on first call; every request reuses the compiled graph.
+    langgraph is only imported here, so importing AgentState or the nodes stays cheap.
+    """
+    from langgraph.graph import StateGraph, END
+
+    workflow = StateGraph(AgentState)
+
+    # 1. Add Nodes
+    workflow.add_node("router", router_node)
+    workflow.add_node("cleaner", cleaner_node)
+    workflow.add_node("feature_engineer", fe_node)
+    workflow.add_node("visualizer", viz_node)
+    workflow.add_node("trainer", trainer_node)
+    workflow.add_node("watcher", watcher_node)
+
+    # 2. Define Edges (The Logic Flow)
+    workflow.set_entry_point("router")
+    workflow.add_conditional_edges(
+        "router",
+        route_after_router
+    )
+
+    # Serial Flow: Cleaner -> FE -> (Viz + Trainer)
+    # This enforces the dependency chain you requested
+    workflow.add_edge("cleaner", "watcher")
+
+    # FE -> Watcher -> Next
+    workflow.add_edge("feature_engineer", "watcher") 
 
-# Viz -> End
-workflow.add_edge("visualizer", END)
-# Trainer -> End
-workflow.add_edge("trainer", END)
+    # Apply the ONE conditional edge for Watcher
+    workflow.add_conditional_edges("watcher", route_after_watcher)
 
-# Compile
-app = workflow.compile()
+    # Viz -> End
+    workflow.add_edge("visualizer", END)
+    # Trainer -> End
+    workflow.add_edge("trainer", END)
+
+    return workflow.compile(checkpointer=_build_checkpointer())
+
+def new_thread_id() -> str:
+    """One checkpoint thread per request, so `messages` doesn't accumulate across requests."""
+    return f"{SHARED_SESSION_ID}:{uuid.uuid4().hex[:8]}"
+
+async def stream_workflow(initial_state: Optional[dict], thread_id: str):
+    """
+    Drives the graph asynchronously; output is handled by print statements in nodes.
+    Nodes are async and must run on the shared agent loop: use `run_sync` / `run_async`.
+    Pass `initial_state=None` with the thread_id of an interrupted run to resume it from
+    its last checkpoint; finished steps (e.g. a costly Cleaner run) are not re-executed.
+    """
+    app = get_app()
+    await _ensure_checkpointer(app)
+    config = {"configurable": {"thread_id": thread_id}}
+    outcome = "failed"
+    try:
+        async for _ in app.astream(initial_state, config=config):
+            pass
+        outcome = "completed"
+    except (asyncio.CancelledError, KeyboardInterrupt):
+        outcome = "interrupted"
+        raise
+    finally:
+        # e.g. the run ended (or was interrupted) before a speculated node got to use its task
+        cancel_speculative()
+        await _release_checkpoints(app, thread_id, outcome)
 
 # ==========================================================
 # 🚀 MAIN ENTRY POINT
 # ==========================================================
 if __name__ == "__main__":
     print("🤖 Autonomous Analytics Crew Started")
-    print("Type 'graph' to visualize the workflow or 'q' to quit.")
+    print("Type 'graph' to visualize the workflow, '/resume' to continue an interrupted run or 'q' to quit.")
+    interrupted_thread = None
 
     while True:
         try:
             user_input = input("\nUser Request: ")
             if not user_input: continue
-            if user_input.lower() in ['q', 'exit']: break
+            if user_input.lower() in EXIT_COMMANDS: break
             if user_input.lower() == 'graph':
                 try:
-                    print(app.get_graph().draw_ascii())
+                    print(get_app().get_graph().draw_ascii())
                 except Exception as e:
                     print(f"Graph viz requires extra dependencies: {e}")
                 continue
@@ -404,23 +597,30 @@ if __name__ == "__main__":
                 model = parts[2] if len(parts) > 2 else None
                 switch_to_provider(provider, model)
                 continue
-            # ----------------------
-
-            initial_state = {
-                "user_request": user_input,
-                "messages": [HumanMessage(content=user_input)],
-                "original_task": user_input,
-                "watcher_status": "PASS",
-                "watcher_feedback": ""
-            }
+
+            if user_input.startswith("/resume"):
+                if not interrupted_thread:
+                    print("Nothing to resume.")
+                    continue
+                thread_id, initial_state = interrupted_thread, None
+            else:
+                thread_id = new_thread_id()
+                initial_state = {
+                    "user_request": user_input,
+                    "messages": [("User", user_input)],
+                    "original_task": user_input,
+                    "watcher_status": "PASS",
+                    "watcher_feedback": ""
+                }
             
             # Streaming execution to allow interrupts
             try:
-                for output in app.stream(initial_state):
-                    pass # Output is handled by print statements in nodes
+                run_sync(stream_workflow(initial_state, thread_id))
             except KeyboardInterrupt:
-                 print("\n\n🛑 Workflow interrupted by user. Returning to main menu...")
+                 interrupted_thread = thread_id
+                 print("\n\n🛑 Workflow interrupted by user. Type '/resume' to continue it. Returning to main menu...")
                  continue
+            interrupted_thread = None
 
             print("\n✅ Workflow Completed.")
         except KeyboardInterrupt:
@@ -35,7 +35,7 @@ Return a JSON object with EXACTLY these fields:
 **FAIL (Hard Error - Must Retry):**
 - Output contains "Traceback (most recent call last)"
 - Output says "I will do..." without actual code execution
-- Required artifact not saved (e.g., clean_data.parquet missing)
+- Required dataset not saved (e.g., no save_df(..., 'clean_data') for the cleaning step)
 - Completely wrong task addressed
 - Output is empty or null
 
@@ -1,66 +1,401 @@
+import io
 import os
 import json
+import hashlib
+import sqlite3
+import threading
+import numpy as np
 import pandas as pd
-import sqlalchemy
+from decimal import Decimal
 import re
-from typing import Optional, Dict, Any, List
+from functools import lru_cache, partial
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, List, Tuple
 from pathlib import Path
 
+# sqlalchemy (DB sources) and numba (float stats kernel) are imported where they are used:
+# most calls never touch a database, and importing numba alone costs about half a second.
+
+DATA_EXTS = (".csv", ".xlsx", ".xls", ".parquet")
+
+# Capped so a large folder doesn't spawn one thread per file
+MAX_INGEST_WORKERS = min(8, os.cpu_count() or 1)
+
+# Local files above this size are summarized from metadata / a streamed pass instead of
+# a full in-memory read (see analyze_parquet_fast / analyze_csv_fast)
+FAST_SCAN_BYTES = int(os.getenv("FAST_SCAN_MB", "256")) * 1024 * 1024
+SAMPLE_ROWS = 1000
+CSV_CHUNK_ROWS = 100_000
+
+# --- Summary Cache ---
+# Per-file summaries keyed by (abspath, mtime_ns, size): an unchanged file is never re-parsed,
+# within a session (dict) or across restarts (SQLite, same pattern as utils/qdrant_setup.py).
+# Bump SUMMARY_FORMAT_VERSION whenever the summary output changes, so old rows stop matching.
+SUMMARY_FORMAT_VERSION = 1
+_SUMMARY_DB = Path(__file__).parent / "data_context_cache.db"
+_summary_lock = threading.Lock()
+_summary_memo: Dict[str, List[Tuple[str, str]]] = {}
+
+def _summary_key(path: str, full_scan: bool) -> str:
+    st = os.stat(path)
+    return hashlib.md5(
+        f"v{SUMMARY_FORMAT_VERSION}:{os.path.abspath(path)}:{st.st_mtime_ns}:{st.st_size}:{full_scan}".encode()
+    ).hexdigest()
+
+def _cached_summary(key: str) -> Optional[List[Tuple[str, str]]]:
+    if key in _summary_memo:
+        return _summary_memo[key]
+    try:
+        with _summary_lock, sqlite3.connect(_SUMMARY_DB) as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS summaries (key TEXT PRIMARY KEY, pieces TEXT)")
+            row = conn.execute("SELECT pieces FROM summaries WHERE key = ?", (key,)).fetchone()
+    except sqlite3.Error as e:
+        print(f"⚠️ Data context cache lookup failed: {e}")
+        return None
+    if row is None:
+        return None
+    pieces = _summary_memo[key] = [tuple(p) for p in json.loads(row[0])]
+    return pieces
+
+def _store_summary(key: str, pieces: List[Tuple[str, str]]):
+    _summary_memo[key] = pieces
+    try:
+        with _summary_lock, sqlite3.connect(_SUMMARY_DB) as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS summaries (key TEXT PRIMARY KEY, pieces TEXT)")
+            conn.execute("INSERT OR REPLACE INTO summaries VALUES (?, ?)", (key, json.dumps(pieces)))
+    except sqlite3.Error as e:
+        print(f"⚠️ Data context cache write failed: {e}")
+
 # ==========================================================
 # 📊 DATA ANALYSIS TOOLS
 # ==========================================================
 
-def analyze_df(df: pd.DataFrame):
+def _render_summary(rows: int, index_unique, duplicates, columns: List[Dict[str, Any]],
+                    head_df: pd.DataFrame, note: Optional[str] = None) -> str:
     """
-    Produce a concise Markdown summary of a DataFrame for LLM consumption.
+    Formats the Markdown summary shared by analyze_df and the fast (metadata / streamed) paths.
+    Each entry of `columns` has name, dtype, nulls, sample and either min/max (numeric) or top/freq.
     """
-    lines = []
-    lines.append("## Table Summary")
-    lines.append("")
-    lines.append(f"- Rows: {len(df)}")
-    lines.append(f"- Columns: {len(df.columns)}")
-    lines.append(f"- Index is unique: {bool(df.index.is_unique)}")
-    lines.append(f"- Duplicate rows: {int(df.duplicated().sum())}")
-    lines.append("")
-
-    lines.append("### Columns")
-    lines.append("")
+    # Written straight into one buffer (wide frames produce thousands of lines)
+    buf = io.StringIO()
+    w = buf.write
+    w("## Table Summary\n\n")
+    w(f"- Rows: {rows}\n")
+    w(f"- Columns: {len(columns)}\n")
+    w(f"- Index is unique: {index_unique}\n")
+    w(f"- Duplicate rows: {duplicates}\n")
+    if note:
+        w(f"- Note: {note}\n")
+    w("\n")
+
+    w("### Columns\n\n")
+    for c in columns:
+        if c["numeric"]:
+            w(f"- `{c['name']}` — {c['dtype']}, nulls={c['nulls']}, min={c['min']}, max={c['max']}, sample={c['sample']}\n")
+        else:
+            w(f"- `{c['name']}` — {c['dtype']}, nulls={c['nulls']}, top={c['top']} ({c['freq']}), sample={c['sample']}\n")
+
+    # Head Preview
+    try:
+        head_csv = head_df.head().to_csv(index=False)
+        w("\n### Head Preview (CSV)\n```\n")
+        w(head_csv.strip())
+        w("\n```\n")
+    except Exception:
+        pass
+
+    return buf.getvalue()
+
+
+@lru_cache(maxsize=1)
+def _float_col_kernel():
+    """The Numba kernel behind _jit_float_stats, built on first use; None without numba."""
+    try:
+        from numba import njit, prange
+    except ImportError:
+        return None
+
+    @njit(cache=True, parallel=True)
+    def _float_col_stats(arr):
+        """(mins, maxs, null_counts) per column of a 2-D float64 array; NaN counts as null."""
+        n_rows, n_cols = arr.shape
+        mins = np.full(n_cols, np.nan)
+        maxs = np.full(n_cols, np.nan)
+        nulls = np.zeros(n_cols, np.int64)
+        for j in prange(n_cols):
+            lo, hi, nn = np.inf, -np.inf, 0
+            for i in range(n_rows):
+                v = arr[i, j]
+                if np.isnan(v):
+                    nn += 1
+                else:
+                    lo = min(lo, v)
+                    hi = max(hi, v)
+            nulls[j] = nn
+            if nn < n_rows:
+                mins[j], maxs[j] = lo, hi
+        return mins, maxs, nulls
+
+    return _float_col_stats
+
+
+def _jit_float_stats(df: pd.DataFrame) -> Dict[str, Tuple[int, Any, Any]]:
+    """
+    {column: (nulls, min, max)} for the plain float64 columns, in one Numba pass over all of
+    them. Empty when numba isn't installed. Only floats go through it: their NaN encodes
+    nulls exactly, and ints/bools would come back as floats.
+    """
+    cols = [col for col, dtype in df.dtypes.items() if isinstance(dtype, np.dtype) and dtype == np.float64]
+    if not cols:
+        return {}
+    _float_col_stats = _float_col_kernel()
+    if _float_col_stats is None:
+        return {}
+    arr = np.asfortranarray(df[cols].to_numpy(dtype=np.float64))  # column-major: each column is contiguous
+    mins, maxs, nulls = _float_col_stats(arr)
+    return {col: (int(nulls[j]), mins[j], maxs[j]) for j, col in enumerate(cols)}
+
+
+def _column_stats(df: pd.DataFrame, nulls=None, mins=None, maxs=None) -> List[Dict[str, Any]]:
+    """
+    Per-column stats for _render_summary. Nulls/min/max computed elsewhere (e.g. from a
+    Parquet footer or a streamed pass) can be passed in; anything missing comes from `df`.
+    Nulls and numeric min/max are computed frame-wide in one pass each, not per column;
+    float columns use the Numba kernel when available.
+    """
+    numeric = {col for col, dtype in df.dtypes.items() if pd.api.types.is_numeric_dtype(dtype)}
+    jit_stats = _jit_float_stats(df) if nulls is None or mins is None or maxs is None else {}
+    rest = [col for col in df.columns if col not in jit_stats]
+    if nulls is None:
+        nulls = {col: s[0] for col, s in jit_stats.items()}
+        nulls.update({col: int(n) for col, n in df[rest].isna().sum().items()})
+    if numeric and (mins is None or maxs is None):
+        # Column-wise dict keeps each column's dtype (a row slice would upcast ints to float)
+        rest_numeric = [col for col in rest if col in numeric]
+        num_stats = df[rest_numeric].agg(["min", "max"]).to_dict() if rest_numeric else {}
+        if mins is None:
+            mins = {col: s[1] for col, s in jit_stats.items()}
+            mins.update({col: s["min"] for col, s in num_stats.items()})
+        if maxs is None:
+            maxs = {col: s[2] for col, s in jit_stats.items()}
+            maxs.update({col: s["max"] for col, s in num_stats.items()})
+
+    columns = []
     for col in df.columns:
         ser = df[col]
-        dtype = str(ser.dtype)
-        null_count = int(ser.isna().sum())
-        
-        if pd.api.types.is_numeric_dtype(ser):
-            mn = ser.min()
-            mx = ser.max()
-            sample_vals = ser.dropna().unique()[:5].tolist()
-            lines.append(f"- `{col}` — {dtype}, nulls={null_count}, min={mn}, max={mx}, sample={sample_vals}")
+        c = {
+            "name": col,
+            "dtype": str(ser.dtype),
+            "nulls": nulls.get(col, "n/a"),
+            "numeric": col in numeric,
+        }
+        if c["numeric"]:
+            c["min"] = mins.get(col, "n/a")
+            c["max"] = maxs.get(col, "n/a")
+            c["sample"] = ser.dropna().unique()[:5].tolist()
         else:
+            # One hash pass gives top, freq and the sample (the 5 most frequent values)
             vc = ser.value_counts(dropna=True)
-            top = vc.index[0] if len(vc) else None
-            freq = int(vc.iloc[0]) if len(vc) else None
-            sample_vals = ser.dropna().unique()[:5].tolist()
-            lines.append(f"- `{col}` — {dtype}, nulls={null_count}, top={top} ({freq}), sample={sample_vals}")
-    lines.append("")
+            c["top"] = vc.index[0] if len(vc) else None
+            c["freq"] = int(vc.iloc[0]) if len(vc) else None
+            c["sample"] = vc.index[:5].tolist()
+        columns.append(c)
+    return columns
 
-    # Head Preview
+
+def _count_duplicate_rows(df: pd.DataFrame):
+    """
+    `duplicated()` is already vectorized (per-column factorize + one group index), and
+    measured faster than hashing every row with hash_pandas_object. Columns holding
+    unhashable values (lists, dicts) make it raise; report n/a instead of failing the summary.
+    """
     try:
-        head_csv = df.head().to_csv(index=False)
-        lines.append("### Head Preview (CSV)")
-        lines.append("```")
-        lines.append(head_csv.strip())
-        lines.append("```")
-        lines.append("")
-    except Exception:
+        return int(df.duplicated().sum())
+    except TypeError:
+        return "n/a (unhashable values)"
+
+
+def analyze_df(df: pd.DataFrame):
+    """
+    Produce a concise Markdown summary of a DataFrame for LLM consumption.
+    """
+    return _render_summary(
+        rows=len(df),
+        index_unique=bool(df.index.is_unique),
+        duplicates=_count_duplicate_rows(df),
+        columns=_column_stats(df),
+        head_df=df,
+    )
+
+
+def analyze_parquet_fast(path: str) -> str:
+    """
+    Summarizes a Parquet file from its footer: row count and per-column null_count/min/max
+    come from the row-group statistics, dtypes, samples and top values from the first
+    SAMPLE_ROWS rows. Nothing beyond that first batch is decoded.
+    """
+    import pyarrow.parquet as pq
+
+    pf = pq.ParquetFile(path)
+    md = pf.metadata
+    batch = next(pf.iter_batches(batch_size=SAMPLE_ROWS), None)
+    sample = batch.to_pandas() if batch is not None else pf.schema_arrow.empty_table().to_pandas()
+
+    nulls, mins, maxs = {}, {}, {}
+    complete = set(sample.columns)  # columns with statistics in every row group
+    for r in range(md.num_row_groups):
+        rg = md.row_group(r)
+        for i in range(rg.num_columns):
+            chunk = rg.column(i)
+            name, stats = chunk.path_in_schema, chunk.statistics
+            if stats is None or not stats.has_min_max:
+                complete.discard(name)
+                continue
+            nulls[name] = nulls.get(name, 0) + stats.null_count
+            mins[name] = stats.min if name not in mins else min(mins[name], stats.min)
+            maxs[name] = stats.max if name not in maxs else max(maxs[name], stats.max)
+
+    keep = lambda d: {k: v for k, v in d.items() if k in complete}
+    return _render_summary(
+        rows=md.num_rows,
+        index_unique="n/a",
+        duplicates="n/a",
+        columns=_column_stats(sample, keep(nulls), keep(mins), keep(maxs)),
+        head_df=sample,
+        note=f"large file summarized from Parquet metadata; top values and samples from the first {len(sample)} rows",
+    )
+
+
+def read_csv_full(source: str) -> pd.DataFrame:
+    """
+    Full CSV read with pandas' pyarrow engine (multithreaded, block-wise tokenizer) when
+    pyarrow is installed; the default C parser otherwise or if pyarrow rejects the file.
+    """
+    try:
+        return pd.read_csv(source, engine="pyarrow")
+    except ImportError:
         pass
+    except Exception as e:
+        print(f"⚠️ pyarrow CSV parser failed for {source}, using the default parser: {e}")
+    return pd.read_csv(source)
+
+
+def analyze_csv_fast(path: str) -> str:
+    """
+    Summarizes a CSV without holding it in memory: dtypes, samples and top values come from
+    the first SAMPLE_ROWS rows, then one chunked pass counts rows/nulls and tracks min/max.
+    """
+    sample = pd.read_csv(path, nrows=SAMPLE_ROWS)
+    num_cols = sample.select_dtypes(include="number").columns
+
+    rows, nulls, mins, maxs = 0, None, None, None
+    for chunk in pd.read_csv(path, chunksize=CSV_CHUNK_ROWS):
+        rows += len(chunk)
+        chunk_nulls = chunk.isna().sum()
+        nulls = chunk_nulls if nulls is None else nulls.add(chunk_nulls, fill_value=0)
+        # Later chunks may infer a different dtype; coerce so min/max stay numeric
+        num = chunk.reindex(columns=num_cols).apply(pd.to_numeric, errors="coerce")
+        mins = num.min() if mins is None else np.fmin(mins, num.min())
+        maxs = num.max() if maxs is None else np.fmax(maxs, num.max())
+
+    as_dict = lambda s: {} if s is None else s.to_dict()
+    return _render_summary(
+        rows=rows,
+        index_unique="n/a",
+        duplicates="n/a",
+        columns=_column_stats(sample, {k: int(v) for k, v in as_dict(nulls).items()}, as_dict(mins), as_dict(maxs)),
+        head_df=sample,
+        note=f"large file summarized in a streamed pass; top values and samples from the first {len(sample)} rows",
+    )
+
 
-    return "\n".join(lines)
+def _is_numeric_sql(col_type) -> bool:
+    try:
+        return col_type.python_type in (int, float, Decimal)
+    except NotImplementedError:
+        return False
 
 
-def get_data_context(source):
+def _summarize_table_sql(engine, insp, table: str) -> str:
+    """
+    Summarizes a table inside the database instead of pulling it into pandas: one aggregate
+    query returns the row count, per-column null counts and numeric MIN/MAX; only the first
+    SAMPLE_ROWS rows are fetched (dtypes, samples, top values, head preview).
+    """
+    import sqlalchemy
+
+    columns = insp.get_columns(table)
+    tbl = sqlalchemy.table(table, *(sqlalchemy.column(c["name"]) for c in columns))
+    numeric = [c["name"] for c in columns if _is_numeric_sql(c["type"])]
+
+    aggs = [sqlalchemy.func.count().label("__rows")]
+    for i, c in enumerate(columns):
+        col = tbl.c[c["name"]]
+        aggs.append(sqlalchemy.func.sum(sqlalchemy.case((col.is_(None), 1), else_=0)).label(f"n{i}"))
+    for i, name in enumerate(numeric):
+        aggs += [sqlalchemy.func.min(tbl.c[name]).label(f"lo{i}"), sqlalchemy.func.max(tbl.c[name]).label(f"hi{i}")]
+
+    with engine.connect() as conn:
+        row = conn.execute(sqlalchemy.select(*aggs).select_from(tbl)).mappings().one()
+    sample = pd.read_sql(sqlalchemy.select(tbl).limit(SAMPLE_ROWS), engine)
+
+    nulls = {c["name"]: int(row[f"n{i}"] or 0) for i, c in enumerate(columns)}
+    mins = {name: row[f"lo{i}"] for i, name in enumerate(numeric)}
+    maxs = {name: row[f"hi{i}"] for i, name in enumerate(numeric)}
+    return _render_summary(
+        rows=row["__rows"],
+        index_unique="n/a",
+        duplicates="n/a",
+        columns=_column_stats(sample, nulls, mins, maxs),
+        head_df=sample,
+        note=f"summarized in the database; top values and samples from the first {len(sample)} rows",
+    )
+
+
+def _ingest_one(path: str, full_scan: bool = False) -> List[Tuple[str, str]]:
+    """
+    Reads and analyzes one local file; returns (label, summary) pairs.
+    Excel files yield one pair per sheet. Unsupported extensions yield nothing.
+    CSV/Parquet files larger than FAST_SCAN_BYTES take the fast path unless `full_scan`.
+    Results are cached until the file's mtime or size changes.
+    """
+    if not path.lower().endswith(DATA_EXTS):
+        return []
+    key = _summary_key(path, full_scan)
+    pieces = _cached_summary(key)
+    if pieces is None:
+        pieces = _analyze_file(path, full_scan)
+        if pieces:
+            _store_summary(key, pieces)
+    return pieces
+
+
+def _analyze_file(path: str, full_scan: bool) -> List[Tuple[str, str]]:
+    filename = os.path.basename(path)
+    ext = filename.split(".")[-1].lower()
+    fast = not full_scan and os.path.getsize(path) > FAST_SCAN_BYTES
+
+    if ext == "csv":
+        return [(filename, analyze_csv_fast(path) if fast else analyze_df(read_csv_full(path)))]
+    if ext in ("xlsx", "xls"):
+        sheets = pd.read_excel(path, sheet_name=None)
+        return [(f"{filename}::{s}", analyze_df(df)) for s, df in sheets.items()]
+    if ext == "parquet":
+        if fast:
+            try:
+                return [(filename, analyze_parquet_fast(path))]
+            except ImportError:
+                pass  # pyarrow missing: fall back to a full read
+        return [(filename, analyze_df(pd.read_parquet(path)))]
+    return []
+
+
+def get_data_context(source, full_scan: bool = False):
     """
     Ingests a source (File Path, URL, Folder, DB String) and returns 
     a Markdown string analyzing the data found.
+    Large local CSV/Parquet files are summarized from metadata / a streamed pass;
+    pass `full_scan=True` to load them fully (exact duplicate counts, top values).
     """
     results = {}
     pieces = []
@@ -69,7 +404,7 @@ def get_data_context(source):
     if isinstance(source, str) and source.startswith(("http://", "https://")):
         ext = source.split(".")[-1].lower()
         if ext == "csv":
-            return {"file": analyze_df(pd.read_csv(source))}
+            return {"file": analyze_df(read_csv_full(source))}
         if ext in ("xlsx", "xls"):
             sheets = pd.read_excel(source, sheet_name=None)
             return {name: analyze_df(df) for name, df in sheets.items()}
@@ -78,57 +413,45 @@ def get_data_context(source):
 
     # CASE 2: FILE PATH
     if os.path.isfile(source):
-        ext = source.split(".")[-1].lower()
-        filename = os.path.basename(source)
-        
-        if ext == "csv":
-            txt = analyze_df(pd.read_csv(source))
-            pieces.append(f"### {filename}\n" + txt)
-            results[filename] = txt
-        elif ext in ("xlsx", "xls"):
-            sheets = pd.read_excel(source, sheet_name=None)
-            for s, df in sheets.items():
-                txt = analyze_df(df)
-                results[f"{filename}::{s}"] = txt
-                pieces.append(f"### {filename}::{s}\n" + txt)
-        elif ext == "parquet":
-            txt = analyze_df(pd.read_parquet(source))
-            pieces.append(f"### {filename}\n" + txt)
-            results[filename] = txt
+        for label, txt in _ingest_one(source, full_scan):
+            results[label] = txt
+            pieces.append(f"### {label}\n" + txt)
             
         if pieces:
             return "\n\n".join(pieces)
 
     # CASE 3: FOLDER
     if os.path.isdir(source):
-        for file in os.listdir(source):
-            path = os.path.join(source, file)
-            if file.endswith(".csv"):
-                txt = analyze_df(pd.read_csv(path))
-                pieces.append(f"### {file}\n" + txt)
-            elif file.endswith((".xlsx", ".xls")):
-                sheets = pd.read_excel(path, sheet_name=None)
-                for s, df in sheets.items():
-                    txt = analyze_df(df)
-                    pieces.append(f"### {file}::{s}\n" + txt)
-            elif file.endswith(".parquet"):
-                txt = analyze_df(pd.read_parquet(path))
-                pieces.append(f"### {file}\n" + txt)
+        # Files are read/parsed concurrently (pandas' parsers release the GIL);
+        # sorted so the summary (and any prompt built from it) is stable across runs
+        # scandir's entries already know their type, so non-data files and subfolders are
+        # skipped without a stat or a worker task each
+        with os.scandir(source) as it:
+            paths = sorted(e.path for e in it if e.name.lower().endswith(DATA_EXTS) and e.is_file())
+        with ThreadPoolExecutor(max_workers=MAX_INGEST_WORKERS) as ex:
+            for file_results in ex.map(partial(_ingest_one, full_scan=full_scan), paths):
+                for label, txt in file_results:
+                    pieces.append(f"### {label}\n" + txt)
         if pieces:
             return "\n\n".join(pieces)
 
     # CASE 4: DATABASE
+    try:
+        import sqlalchemy
+    except ImportError:
+        raise ValueError("Unknown source type. Not a URL, file, folder, or valid DB string (sqlalchemy is not installed).")
     try:
         engine = sqlalchemy.create_engine(source)
         insp = sqlalchemy.inspect(engine)
         tables = insp.get_table_names()
-        for table in tables:
-            df = pd.read_sql(f"SELECT * FROM {table}", engine)
-            txt = analyze_df(df)
-            pieces.append(f"### {table}\n" + txt)
+        # Tables are summarized concurrently, each on its own pooled connection
+        with ThreadPoolExecutor(max_workers=MAX_INGEST_WORKERS) as ex:
+            for table, txt in zip(tables, ex.map(partial(_summarize_table_sql, engine, insp), tables)):
+                pieces.append(f"### {table}\n" + txt)
         if pieces:
             return "\n\n".join(pieces)
-    except:
+    except (sqlalchemy.exc.SQLAlchemyError, ImportError):
+        # Not a DB URL, or its driver isn't installed
         pass
 
     raise ValueError("Unknown source type. Not a URL, file, folder, or valid DB string.")
\ No newline at end of file
@@ -4,55 +4,110 @@ import os
 import re
 import ast
 import subprocess
+import importlib.util
+import importlib.metadata
+import threading
 import pandas as pd
+import atexit
+import secrets
+import asyncio
 import traceback
+import contextlib
+from multiprocessing.connection import Client, Listener
+from functools import lru_cache
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
 from langchain_core.tools import tool
 
 # ==========================================================
 # 🛡️ SAFETY & VALIDATION LAYER
 # ==========================================================
-FORBIDDEN_MODULES = {"os", "subprocess", "shutil", "sys"}
-DESTRUCTIVE_KEYWORDS = {"drop", "delete", "remove", "truncate"}
+FORBIDDEN_MODULES = frozenset({"os", "subprocess", "shutil", "sys"})
+DESTRUCTIVE_KEYWORDS = frozenset({"drop", "delete", "remove", "truncate"})
+# One pass over the source: dynamic-code calls are rejected outright...
+_BLOCKED_CALL_RE = re.compile(r"\b(?:exec|eval|__import__)\s*\(")
+# ...and the AST is only visited if the cell contains anything the visitor could flag
+_NEEDS_AST_RE = re.compile(
+    r"\bimport\b|\binplace\b|\.\s*(?:" + "|".join(sorted(DESTRUCTIVE_KEYWORDS)) + r")\b"
+)
 
+class _Blocked(Exception):
+    """Unwinds _SafetyVisitor on the first blocking violation."""
+
+
+class _SafetyVisitor(ast.NodeVisitor):
+    """
+    Visits only the node types validate_code cares about. A forbidden import stops the walk
+    immediately; mutation warnings are remembered (first one wins) and the walk continues,
+    so a harmless-looking .drop() can't hide a forbidden import further down.
+    """
+
+    def __init__(self, allow_destructive: bool):
+        self.allow_destructive = allow_destructive
+        self.violation: Optional[str] = None
+        self.warning: Optional[str] = None
+
+    # 1. Block forbidden imports
+    def _check_module(self, module: Optional[str]):
+        if module and module.split('.')[0] in FORBIDDEN_MODULES:
+            self.violation = f"🚫 Security Violation: Importing '{module}' is restricted."
+            raise _Blocked
+
+    def visit_Import(self, node: ast.Import):
+        for alias in node.names:
+            self._check_module(alias.name)
+
+    def visit_ImportFrom(self, node: ast.ImportFrom):
+        self._check_module(node.module)
+
+    # 2. Warn on destructive DataFrame operations (.drop(), .remove(), ...) unless allowed
+    def visit_Call(self, node: ast.Call):
+        if (not self.allow_destructive and self.warning is None
+                and isinstance(node.func, ast.Attribute) and node.func.attr in DESTRUCTIVE_KEYWORDS):
+            self.warning = f"⚠️ Potential mutation detected: '{node.func.attr}'"
+        self.generic_visit(node)
+
+    # 3. Warn on 'inplace=True' which often implies mutation
+    def visit_keyword(self, node: ast.keyword):
+        if self.warning is None and node.arg == "inplace" and getattr(node.value, "value", False) is True:
+            self.warning = "⚠️ 'inplace=True' detected"
+        self.generic_visit(node)
+
+
+@lru_cache(maxsize=256)
+def _parse_cell(code: str) -> ast.Module:
+    """One parse per distinct cell, shared by validation, the 'df' check and compile()."""
+    return ast.parse(code)
+
+@lru_cache(maxsize=512)
 def validate_code(code: str, allow_destructive: bool = False) -> tuple[bool, str]:
     """
     Statically analyzes Python code for safety violations using AST.
     Returns (is_safe, error_message).
+    Cached per (code, allow_destructive): agents often resubmit the same cell on retries.
     """
+    # 0. Block System Calls via exec/eval/__import__ (fast reject, before any parsing)
+    if _BLOCKED_CALL_RE.search(code):
+         return False, "🚫 Security Violation: 'exec', 'eval' and '__import__' are strictly forbidden."
+
     try:
-        tree = ast.parse(code)
+        tree = _parse_cell(code)
     except SyntaxError as e:
         return False, f"Syntax Error: {e}"
 
-    for node in ast.walk(tree):
-        # 1. Block forbidden imports
-        if isinstance(node, (ast.Import, ast.ImportFrom)):
-            modules = [n.name for n in node.names] if isinstance(node, ast.Import) else [node.module]
-            for module in modules:
-                if module and module.split('.')[0] in FORBIDDEN_MODULES:
-                    return False, f"🚫 Security Violation: Importing '{module}' is restricted."
-
-        # 2. Warn/Block destructive DataFrame operations (if strict)
-        # Looking for .drop(), .del(), etc.
-        if not allow_destructive and isinstance(node, ast.Call):
-            if isinstance(node.func, ast.Attribute):
-                if node.func.attr in DESTRUCTIVE_KEYWORDS:
-                    # We flag it, but maybe allow it if it's just 'df.drop_duplicates'
-                    # For now, we return a warning message that requires user override (simulated)
-                    # In a real Router scenario, the Router would permit this.
-                    # For this prototype, we'll allow it but LOG it, or block if strict.
-                    # Return a warning flag instead of blocking
-                    return True, f"⚠️ Potential mutation detected: '{node.func.attr}'"
-
-        # 3. Check for 'inplace=True' which often implies mutation
-        if isinstance(node, ast.keyword) and node.arg == "inplace" and getattr(node.value, "value", False) is True:
-             return True, "⚠️ 'inplace=True' detected"
-
-    # 3. Block System Calls via exec/eval
-    if "exec(" in code or "eval(" in code:
-         return False, "🚫 Security Violation: 'exec' and 'eval' are strictly forbidden."
-
-    return True, ""
+    # No import / inplace / destructive method anywhere in the text: nothing for the AST to find
+    if not _NEEDS_AST_RE.search(code):
+        return True, ""
+
+    visitor = _SafetyVisitor(allow_destructive)
+    try:
+        visitor.visit(tree)
+    except _Blocked:
+        return False, visitor.violation
+
+    # Mutation findings are warnings, not blocks
+    return True, visitor.warning or ""
 
 # ==========================================================
 # 💾 STATE MANAGEMENT HELPER FUNCTIONS
@@ -71,39 +126,142 @@ def set_session_id(session_id: str):
     os.makedirs(session_dir, exist_ok=True)
     print(f"🔄 Switched to session: {session_id}")
 
-def get_session_path(tag: str) -> str:
-    """Returns the path for a dataset within the current session."""
-    return os.path.join(CACHE_DIR, _CURRENT_SESSION_ID, f"{tag}.parquet")
+# Handoff format: Feather (Arrow IPC, LZ4) round-trips the small/medium frames agents pass
+# around with almost no encode/decode overhead; very large frames stay Parquet (smaller on disk).
+# Reads accept either, so caches written before the switch keep working.
+DATASET_EXTS = (".feather", ".parquet")
+PARQUET_MIN_BYTES = 1024 ** 3
+
+def get_session_path(tag: str, ext: str = ".feather", session_id: Optional[str] = None) -> str:
+    """Returns the path for a dataset within the current (or the given) session."""
+    return os.path.join(CACHE_DIR, session_id or _CURRENT_SESSION_ID, f"{tag}{ext}")
+
+# Write-behind: encoding + disk I/O run on one background writer thread,
+# so agent code continues while the file is written. Readers wait for pending writes.
+_DF_WRITER = ThreadPoolExecutor(max_workers=1, thread_name_prefix="df-writer")
+_PENDING_WRITES: Dict[str, Future] = {}
+_FAILED_WRITES: Dict[str, BaseException] = {}  # path -> error of its last write, until saved again
+_PENDING_LOCK = threading.Lock()
+
+def _write_dataset(df: pd.DataFrame, tag: str, session_id: str):
+    """
+    Writes to a temp file first so readers never see a half-written file, then removes the
+    tag's file in the other format so a load can't pick up a stale copy.
+    """
+    path = get_session_path(tag, ".feather", session_id)
+    tmp_path = f"{path}.tmp"
+    try:
+        if df.memory_usage(deep=False).sum() >= PARQUET_MIN_BYTES:
+            raise ValueError("large frame")
+        df.to_feather(tmp_path, compression="lz4")
+    except ValueError:
+        # Very large frame, or a layout Feather can't store: fall back to Parquet
+        path = get_session_path(tag, ".parquet", session_id)
+        tmp_path = f"{path}.tmp"
+        df.to_parquet(tmp_path)
+    os.replace(tmp_path, path)
+    for ext in DATASET_EXTS:
+        other = get_session_path(tag, ext, session_id)
+        if other != path and os.path.exists(other):
+            os.remove(other)
+
+def _on_write_done(path: str, future: Future):
+    error = future.exception()
+    with _PENDING_LOCK:
+        if _PENDING_WRITES.get(path) is future:
+            del _PENDING_WRITES[path]
+            if error is not None:
+                _FAILED_WRITES[path] = error
+    if error is not None:
+        print(f"❌ Failed to save '{path}': {error}")
+
+def wait_for_saves(path: Optional[str] = None):
+    """
+    Blocks until the pending write for `path` (or all pending writes) has finished.
+    Raises if that write, or an earlier one not since redone, failed: the file on disk
+    would be missing or hold the previous version.
+    """
+    with _PENDING_LOCK:
+        futures = list(_PENDING_WRITES.values()) if path is None else [_PENDING_WRITES.get(path)]
+    for future in futures:
+        if future is not None:
+            future.result()
+    with _PENDING_LOCK:
+        failed = [(p, e) for p, e in _FAILED_WRITES.items() if path is None or p == path]
+    for failed_path, error in failed:
+        raise RuntimeError(f"❌ Saving '{failed_path}' failed ({error}); save it again before using it.") from error
 
 def save_df(df: pd.DataFrame, tag: str):
-    """Saves DataFrame to the shared cache (Parquet)."""
+    """Saves DataFrame to the shared cache (Feather, or Parquet if very large) in the background."""
     global _LAST_SAVED_TAG
-    path = get_session_path(tag)
-    df.to_parquet(path)
+    path = get_session_path(tag)  # pending writes are tracked per tag, under the .feather path
+    # Snapshot so later in-place edits by the agent's code can't leak into the file
+    future = _DF_WRITER.submit(_write_dataset, df.copy(), tag, _CURRENT_SESSION_ID)
+    _forget_loaded(tag, _CURRENT_SESSION_ID)
+    with _PENDING_LOCK:
+        _PENDING_WRITES[path] = future
+        _FAILED_WRITES.pop(path, None)  # superseded; this write's own failure is raised by its future
+    future.add_done_callback(lambda f: _on_write_done(path, f))
     _LAST_SAVED_TAG = tag # Auto-Update state
-    print(f"✅ Data saved to shared storage ({_CURRENT_SESSION_ID}): '{tag}'")
+    print(f"💾 Saving data to shared storage ({_CURRENT_SESSION_ID}): '{tag}' (write errors are raised on the next load)")
+
+# Decoded frames from recent loads, keyed by (path, mtime_ns): loading an unchanged file again
+# (every python_interpreter call starts with load_df) skips the disk read + decode.
+# Bounded LRU so a session touching many datasets doesn't keep all of them in RAM.
+LOADED_CACHE_SIZE = 8
+_LOADED_CACHE: "OrderedDict[Tuple[str, int], pd.DataFrame]" = OrderedDict()
+_LOADED_LOCK = threading.Lock()
+
+def _forget_loaded(tag: str, session_id: str):
+    paths = {get_session_path(tag, ext, session_id) for ext in DATASET_EXTS}
+    with _LOADED_LOCK:
+        for key in [k for k in _LOADED_CACHE if k[0] in paths]:
+            del _LOADED_CACHE[key]
+
+def _read_dataset(path: str) -> pd.DataFrame:
+    key = (path, os.stat(path).st_mtime_ns)
+    with _LOADED_LOCK:
+        df = _LOADED_CACHE.get(key)
+        if df is not None:
+            _LOADED_CACHE.move_to_end(key)
+    if df is None:
+        df = pd.read_feather(path) if path.endswith(".feather") else pd.read_parquet(path)
+        with _LOADED_LOCK:
+            _LOADED_CACHE[key] = df
+            while len(_LOADED_CACHE) > LOADED_CACHE_SIZE:
+                _LOADED_CACHE.popitem(last=False)
+    # Callers get their own copy: agent code mutates frames in place (inplace=True, df[c] = ...)
+    return df.copy()
+
+def _find_dataset(tag: str, session_id: str) -> Optional[str]:
+    for ext in DATASET_EXTS:
+        path = get_session_path(tag, ext, session_id)
+        if os.path.exists(path):
+            return path
+    return None
 
 def load_df(tag: str) -> pd.DataFrame:
     """Loads DataFrame from the shared cache."""
-    path = get_session_path(tag)
-    if not os.path.exists(path):
+    wait_for_saves(get_session_path(tag))
+    path = _find_dataset(tag, _CURRENT_SESSION_ID)
+    if path is None:
         # Fallback to default session if not found in current (optional, but good for shared 'raw' data)
-        default_path = os.path.join(CACHE_DIR, "default_session", f"{tag}.parquet")
-        if os.path.exists(default_path):
+        path = _find_dataset(tag, "default_session")
+        if path is not None:
              print(f"⚠️ Data not found in {_CURRENT_SESSION_ID}, falling back to default_session.")
-             path = default_path
         else:
             raise FileNotFoundError(f"❌ Dataset '{tag}' not found in session '{_CURRENT_SESSION_ID}'.")
     
     print(f"✅ Data loaded from shared storage ({_CURRENT_SESSION_ID}): '{tag}'")
-    return pd.read_parquet(path)
+    return _read_dataset(path)
 
 def list_data():
     """Lists available datasets in cache for current session."""
     session_dir = os.path.join(CACHE_DIR, _CURRENT_SESSION_ID)
+    wait_for_saves()
     if not os.path.exists(session_dir):
         return []
-    files = [f.replace(".parquet", "") for f in os.listdir(session_dir) if f.endswith(".parquet")]
+    files = sorted({os.path.splitext(f)[0] for f in os.listdir(session_dir) if f.endswith(DATASET_EXTS)})
     print(f"📂 Available Datasets ({_CURRENT_SESSION_ID}): {files}")
 
 # ==========================================================
@@ -120,6 +278,17 @@ _INTERPRETER_GLOBALS = {
     "set_session_id": set_session_id
 }
 
+@lru_cache(maxsize=256)
+def _compile_cell(code: str):
+    """Compiled code objects are immutable, so retries of the same cell reuse one."""
+    return compile(_parse_cell(code), "<string>", "exec")
+
+@lru_cache(maxsize=256)
+def _reads_df(code: str) -> bool:
+    """True if the cell reads the name `df` (not `pdf`, `df2`, a string or a comment)."""
+    return any(isinstance(n, ast.Name) and n.id == "df" and isinstance(n.ctx, ast.Load)
+               for n in ast.walk(_parse_cell(code)))
+
 @tool
 def python_interpreter(code: str) -> str:
     """
@@ -147,18 +316,93 @@ def python_interpreter(code: str) -> str:
         if len(code) > 300: print("<...truncated...>")
         
         try:
-            confirm = input("🛑 Allow execution? (y/n): ").lower().strip()
+            confirm = _ask("🛑 Allow execution? (y/n): ").lower().strip()
             if confirm != 'y':
                 return f"❌ Execution blocked by user. Validation message: {safety_msg}"
         except Exception:
             # If input fails (e.g. non-interactive), we default to BLOCK for safety
             return f"❌ Execution blocked: Could not get user confirmation for: {safety_msg}"
 
-    # 3. Capture Stdout
-    old_stdout = sys.stdout
-    sys.stdout = io.StringIO()
-    
-    # 3. Execution
+    # 3. Capture Stdout (this thread's prints only; other tools and agents keep printing to the console)
+    if ISOLATED_INTERPRETER:
+        return _get_worker().run(code)
+
+    buf = io.StringIO()
+    with _capture_stdout(buf):
+        return _run_cell(code, buf)
+
+class _ThreadStdout:
+    """
+    sys.stdout stand-in that sends writes from a thread capturing a cell to that cell's buffer
+    and everything else to the real stdout. Tools run in worker threads (asyncio.to_thread), so
+    redirect_stdout's process-wide swap would also capture sibling tools' and other agents' prints.
+    """
+
+    def __init__(self, real):
+        self._real = real
+        self._local = threading.local()
+
+    def _target(self):
+        buf = getattr(self._local, "buf", None)
+        return self._real if buf is None else buf
+
+    def write(self, s):
+        return self._target().write(s)
+
+    def flush(self):
+        return self._target().flush()
+
+    def __getattr__(self, name):
+        return getattr(self._real, name)
+
+_STDOUT_LOCK = threading.Lock()
+
+@contextlib.contextmanager
+def _capture_stdout(buf: io.StringIO):
+    """Like contextlib.redirect_stdout(buf), but only for the current thread."""
+    with _STDOUT_LOCK:
+        if not isinstance(sys.stdout, _ThreadStdout):
+            sys.stdout = _ThreadStdout(sys.stdout)
+        proxy = sys.stdout
+    proxy._local.buf = buf
+    try:
+        yield buf
+    finally:
+        proxy._local.buf = None
+
+def _ask(prompt: str) -> str:
+    """
+    input() for tools running in worker threads. The question is asked with prompt_async on the
+    shared event loop, so an interrupted tool (see BaseAgent._arun_tool) cancels the prompt
+    instead of leaving a blocked input() that would swallow the user's next line.
+    Ctrl+C at the prompt answers "n".
+    """
+    try:
+        asyncio.get_running_loop()
+        on_loop_thread = True
+    except RuntimeError:
+        on_loop_thread = False
+    if on_loop_thread:
+        return input(prompt)  # blocking the loop is the only option here
+    from prompt_toolkit import PromptSession
+    from utils.event_loop import get_loop
+
+    future = asyncio.run_coroutine_threadsafe(PromptSession().prompt_async(prompt), get_loop())
+    try:
+        # Short waits keep this thread in Python code, where an interrupt can reach it
+        while True:
+            try:
+                return future.result(timeout=0.2)
+            except FutureTimeoutError:
+                continue
+    except (KeyboardInterrupt, EOFError):
+        return "n"
+    finally:
+        future.cancel()
+
+def _run_cell(code: str, buf: io.StringIO) -> str:
+    """Runs a validated cell with stdout already redirected into `buf`."""
+    # 4. Execution
     global _INTERPRETER_GLOBALS
     global _LAST_SAVED_TAG
     exec_globals = _INTERPRETER_GLOBALS
@@ -166,7 +410,7 @@ def python_interpreter(code: str) -> str:
     # --- AUTO-STATE INJECTION ---
     # If the user tries to use 'df' but didn't define it, 
     # try to auto-load the last saved file.
-    if "df" in code and "df" not in exec_globals:
+    if "df" not in exec_globals and _reads_df(code):
         if _LAST_SAVED_TAG:
             print(f"🔄 Auto-loading last saved dataset: '{_LAST_SAVED_TAG}' as 'df'...")
             try:
@@ -179,7 +423,7 @@ def python_interpreter(code: str) -> str:
 
     try:
         # Compile and Execute
-        compiled = compile(code, "<string>", "exec")
+        compiled = _compile_cell(code)
         exec(compiled, exec_globals)
         
         # Eval last expression if possible (REPL style)
@@ -194,35 +438,145 @@ def python_interpreter(code: str) -> str:
             except Exception:
                 pass
                 
-        output = sys.stdout.getvalue()
+        output = buf.getvalue()
         return output if output.strip() else "✅ Code executed successfully (No output)."
         
     except Exception:
         err = traceback.format_exc()
         return f"❌ Execution Error:\n{err}"
-    finally:
-        sys.stdout = old_stdout
+
+# ==========================================================
+# 🧱 ISOLATED INTERPRETER (opt-in: INTERPRETER_ISOLATION=process)
+# ==========================================================
+# Cells run in one long-lived worker process that owns its own _INTERPRETER_GLOBALS, so a
+# crashing or runaway cell can't take the CLI down (Ctrl+C kills the worker; state resets).
+# Validation and the mutation prompt stay in this process. The worker is a plain
+# `python -c` child reached over multiprocessing.connection rather than a
+# multiprocessing.Process: spawn would re-import the CLI's __main__ module in the child.
+ISOLATED_INTERPRETER = os.getenv("INTERPRETER_ISOLATION", "").strip().lower() == "process"
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _worker_main(authkey_hex: str):
+    """Worker process loop: receives cells, returns their captured output."""
+    with Listener(("localhost", 0), authkey=bytes.fromhex(authkey_hex)) as listener:
+        # Tell the parent where to connect on the first stdout line (it reads EOF instead if we
+        # die before this), then point stdout at stderr so nothing else lands in that pipe
+        sys.stdout.write(f"{listener.address[0]} {listener.address[1]}\n")
+        sys.stdout.flush()
+        os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+        conn = listener.accept()
+    while True:
+        try:
+            code = conn.recv()
+        except EOFError:
+            break
+        importlib.invalidate_caches()  # pick up packages installed by the parent meanwhile
+        buf = io.StringIO()
+        with contextlib.redirect_stdout(buf):  # single-threaded process: a global swap is fine
+            output = _run_cell(code, buf)
+        conn.send(output)
+    wait_for_saves()
+
+class _InterpreterWorker:
+    def __init__(self):
+        authkey = secrets.token_bytes(16)
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [_PROJECT_ROOT, os.getenv("PYTHONPATH")])))
+        bootstrap = ("import sys; from tools.expert_crew_tools import _worker_main; "
+                     "_worker_main(sys.argv[1])")
+        # Same cwd as this process: CACHE_DIR is relative. The address comes back over stdout
+        # (pass_fds would be simpler but isn't supported on Windows)
+        self._proc = subprocess.Popen([sys.executable, "-c", bootstrap, authkey.hex()],
+                                      env=env, stdout=subprocess.PIPE, text=True)
+        with self._proc.stdout as ready:
+            address = ready.readline().split()
+        if len(address) != 2:
+            raise RuntimeError("interpreter worker failed to start")
+        self._conn = Client((address[0], int(address[1])), authkey=authkey)
+
+    def run(self, code: str) -> str:
+        try:
+            self._conn.send(code)
+            # Poll instead of a blocking recv() so an interrupt from BaseAgent._arun_tool lands
+            while not self._conn.poll(0.2):
+                pass
+            return self._conn.recv()
+        except (EOFError, OSError):
+            self.close()
+            return "❌ Execution Error: the interpreter worker died; its state (variables) was reset."
+        except KeyboardInterrupt:
+            self.close(force=True)  # the cell may be stuck; don't wait for it
+            raise
+
+    def alive(self) -> bool:
+        return self._proc.poll() is None
+
+    def close(self, force: bool = False):
+        try:
+            self._conn.close()
+            if force:
+                self._proc.kill()
+            self._proc.wait(timeout=5)  # lets the worker flush pending save_df writes
+        except Exception:
+            self._proc.kill()
+
+_WORKER: Optional[_InterpreterWorker] = None
+_WORKER_LOCK = threading.Lock()
+
+def _get_worker() -> _InterpreterWorker:
+    global _WORKER
+    with _WORKER_LOCK:
+        if _WORKER is None or not _WORKER.alive():
+            _WORKER = _InterpreterWorker()
+            atexit.register(_WORKER.close)
+        return _WORKER
+
+def _is_installed(spec: str) -> bool:
+    """True for a bare package name that is already installed (by distribution or module name)."""
+    if not re.fullmatch(r"[A-Za-z0-9._-]+", spec):
+        return False  # version specifiers / extras: let pip decide
+    try:
+        importlib.metadata.distribution(spec)
+        return True
+    except importlib.metadata.PackageNotFoundError:
+        return importlib.util.find_spec(spec.replace("-", "_")) is not None
 
 @tool
 def install_package(package_name: str) -> str:
     """
-    Installs a Python package using pip. 
+    Installs one or more Python packages using pip. 
     Use this ONLY when you encounter a `ModuleNotFoundError` or `ImportError`.
+    Pass several packages at once separated by spaces or commas (e.g. "seaborn plotly"):
+    they are installed with a single confirmation and a single pip run.
     The user will be prompted for confirmation before installation proceeds.
     """
-    print(f"\n📦 Request to install package: {package_name}")
-    user_confirm = input(f"⚠️  Agent wants to install '{package_name}'. Allow? (y/n): ").strip().lower()
+    requested = [p for p in re.split(r"[\s,]+", package_name) if p]
+    pending = [p for p in requested if not _is_installed(p)]
+    if not pending:
+        return f"Already installed: {', '.join(requested)}."
+    packages = " ".join(pending)
+
+    print(f"\n📦 Request to install package(s): {packages}")
+    user_confirm = _ask(f"⚠️  Agent wants to install '{packages}'. Allow? (y/n): ").strip().lower()
     
     if user_confirm != 'y':
-        return f"User denied installation of package '{package_name}'."
+        return f"User denied installation of package '{packages}'."
     
     try:
-        print(f"⏳ Installing {package_name}...")
-        # Use sys.executable to ensure we install in the current environment
-        subprocess.check_call([sys.executable, "-m", "pip", "install", package_name])
-        return f"Successfully installed '{package_name}'."
-    except subprocess.CalledProcessError as e:
-        return f"Failed to install '{package_name}'. Error: {e}"
+        print(f"⏳ Installing {packages}...")
+        # Use sys.executable to ensure we install in the current environment;
+        # one resolver run for the whole batch, output streamed as pip produces it
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "pip", "install", "--no-input", "--upgrade-strategy", "only-if-needed", *pending],
+            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+        )
+        tail = []
+        for line in proc.stdout:
+            print(line, end="")
+            tail = (tail + [line])[-10:]
+        if proc.wait() != 0:
+            return f"Failed to install '{packages}'. pip output:\n{''.join(tail)}"
+        importlib.invalidate_caches()  # so the agent's next import sees the new packages
+        return f"Successfully installed '{packages}'."
     except Exception as e:
         return f"Error installing package: {e}"
 
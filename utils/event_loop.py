@@ -0,0 +1,73 @@
+"""
+event_loop.py
+
+Shared background event loop for the agents' async work (tool fan-out, LLM calls).
+
+Agents are driven from synchronous code (CLI loops, LangGraph nodes), so instead of
+spinning up a fresh loop with `asyncio.run()` on every task we keep one long-lived loop
+in a daemon thread — the same pattern `QdrantMCPWrapper` uses for the MCP session.
+Anything bound to a loop (asyncio locks, async HTTP connection pools) stays valid
+across tasks.
+"""
+
+import sys
+import asyncio
+import threading
+from typing import Any, Coroutine, Optional
+
+_LOOP: Optional[asyncio.AbstractEventLoop] = None
+_LOOP_THREAD: Optional[threading.Thread] = None
+_LOOP_LOCK = threading.Lock()
+
+
+def _new_loop() -> asyncio.AbstractEventLoop:
+    """uvloop's libuv-based loop when available (not on Windows), else the stdlib loop."""
+    if sys.platform != "win32":
+        try:
+            import uvloop
+            return uvloop.new_event_loop()
+        except ImportError:
+            pass
+    return asyncio.new_event_loop()
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """Returns the shared event loop, starting its background thread on first use."""
+    global _LOOP, _LOOP_THREAD
+    with _LOOP_LOCK:
+        # Also replace a loop whose thread died (an exception escaping run_forever)
+        if _LOOP is None or _LOOP.is_closed() or not _LOOP_THREAD.is_alive():
+            _LOOP = _new_loop()
+            _LOOP_THREAD = threading.Thread(target=_LOOP.run_forever, name="agent-event-loop", daemon=True)
+            _LOOP_THREAD.start()
+    return _LOOP
+
+
+def run_sync(coro: Coroutine[Any, Any, Any]) -> Any:
+    """
+    Runs a coroutine on the shared loop and blocks the calling thread until it finishes.
+    Must not be called from the loop thread itself (it would deadlock).
+    """
+    loop = get_loop()
+    if threading.current_thread() is _LOOP_THREAD:
+        coro.close()
+        raise RuntimeError("run_sync() called from the shared event loop thread; await the coroutine instead.")
+
+    future = asyncio.run_coroutine_threadsafe(coro, loop)
+    try:
+        return future.result()
+    except KeyboardInterrupt:
+        # Stop the background work too, otherwise it keeps running after Ctrl+C
+        future.cancel()
+        raise
+
+
+async def run_async(coro: Coroutine[Any, Any, Any]) -> Any:
+    """
+    Awaits a coroutine on the shared loop from another event loop (e.g. the CLI's) without
+    blocking it. Cancelling the awaiting task cancels the work on the shared loop as well.
+    """
+    loop = get_loop()
+    if threading.current_thread() is _LOOP_THREAD:
+        return await coro
+    return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
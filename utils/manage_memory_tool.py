@@ -1,15 +1,26 @@
+import io
 import os
+import gzip
 import json
 import sys
 import time
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import lru_cache, partial
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator
 from dotenv import load_dotenv
 import mcp_server_qdrant
 from qdrant_client import QdrantClient
 from qdrant_client.http import models
-from qdrant_setup import chat_log_add_tool, chat_log_search_tool, log_batch_chat
+from qdrant_setup import chat_log_add_tool, chat_log_search_tool, log_batch_chat, clear_context_dedup
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Load .env from project root (one level up from utils)
 load_dotenv(Path(__file__).parent.parent / ".env")
@@ -25,8 +36,9 @@ except ImportError:
 # Assuming this script is in NotDataAnalyst/
 # Use absolute paths relative to this script
 BASE_DIR = Path(__file__).parent
-HOT_MEMORY_FILE = BASE_DIR / "hot_memory.json" 
-WARM_MEMORY_FILE = BASE_DIR / "warm_memory_dump.json"
+HOT_MEMORY_FILE = BASE_DIR / "hot_memory.txt"
+LEGACY_HOT_MEMORY_FILE = BASE_DIR / "hot_memory.json"  # format before hot_memory.txt
+WARM_MEMORY_DIR = Path("warm_memory")  # WarmMemory.FALLBACK_DIR (relative to the working directory)
 DUMP_DIR = Path("memory_dumps")
 DUMP_DIR.mkdir(exist_ok=True)
 
@@ -34,25 +46,58 @@ DUMP_DIR.mkdir(exist_ok=True)
 COLLECTION_NAME = "chat_logs_mcp" # Main collection for chat logs in clear_memory
 _CONTEXT_COLLECTION = "context_store" # From dump_everything
 _LOGS_COLLECTION = "chat_logs_mcp"   # From dump_everything
+_LLM_CACHE_COLLECTION = "llm_cache"  # semantic_cache.CACHE_COLLECTION (recreated on first use)
 
 VECTOR_SIZE = 384
+REDIS_DUMP_CHUNK = 500  # sessions per pipelined round trip in dump_warm
+QDRANT_SCROLL_LIMIT = 2048  # points per scroll page in dump_cold (payloads only, no vectors)
+MCP_BENCH_SIZE = 10  # entries test_mcp_tools writes/searches (they stay in chat_logs_mcp)
 
 # --- Generators / Helpers ---
+def _write_json(path: Path, data: Any):
+    """Writes an indented UTF-8 JSON dump in one write (orjson when installed)."""
+    if orjson is not None:
+        payload = orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    else:
+        payload = json.dumps(data, indent=2, ensure_ascii=False).encode("utf-8")
+    with open(path, 'wb') as f:
+        f.write(payload)
+
+_loads = orjson.loads if orjson is not None else json.loads
+
+@lru_cache(maxsize=1)
 def _get_qdrant_client():
+    """One client (and connection pool) for every admin operation in this run."""
     url = os.getenv("QDRANT_URL", "").strip()
     api_key = os.getenv("QDRANT_API_KEY", "").strip()
-    return QdrantClient(url=url, api_key=api_key)
+    # gRPC needs the server's gRPC port (6334) reachable, so it is opt-in
+    prefer_grpc = os.getenv("QDRANT_PREFER_GRPC", "").strip().lower() in ("1", "true", "yes")
+    return QdrantClient(url=url, api_key=api_key, prefer_grpc=prefer_grpc, timeout=60)
+
+# The dumps run concurrently (see main); whole lines only, so their output doesn't interleave
+_print_lock = threading.Lock()
+
+def _log(*args):
+    with _print_lock:
+        print(*args, flush=True)
+
+def _json_line(obj: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE)
+    return json.dumps(obj, ensure_ascii=False).encode("utf-8") + b"\n"
 
 # --- Clear Functions ---
 def clear_hot_memory():
     # Hot memory is typically in the same dir as memory_manager.py, which is here.
     # We use HOT_MEMORY_FILE defined above.
-    # Note: memory_manager.py defines it as: Path(__file__).parent / "hot_memory.json"
+    # Note: memory_manager.py defines it as: Path(__file__).parent / "hot_memory.txt"
     
     print(f"🔥 Clearing Hot Memory ({HOT_MEMORY_FILE})...")
-    if HOT_MEMORY_FILE.exists():
+    files = [f for f in (HOT_MEMORY_FILE, LEGACY_HOT_MEMORY_FILE) if f.exists()]
+    if files:
         try:
-            os.remove(HOT_MEMORY_FILE)
+            for f in files:
+                os.remove(f)
             print("✅ Hot Memory deleted.")
         except Exception as e:
             print(f"❌ Failed to delete Hot Memory: {e}")
@@ -60,57 +105,71 @@ def clear_hot_memory():
         print("ℹ️  Hot Memory file not found.")
 
 def clear_warm_memory():
-    print(f"⚡ Clearing Warm Memory ({WARM_MEMORY_FILE})...")
-    if WARM_MEMORY_FILE.exists():
+    print(f"⚡ Clearing Warm Memory ({WARM_MEMORY_DIR})...")
+    if WARM_MEMORY_DIR.exists():
         try:
-            os.remove(WARM_MEMORY_FILE)
+            shutil.rmtree(WARM_MEMORY_DIR)
             print("✅ Warm Memory deleted.")
         except Exception as e:
             print(f"❌ Failed to delete Warm Memory: {e}")
     else:
-        print("ℹ️  Warm Memory file not found.")
+        print("ℹ️  Warm Memory folder not found.")
 
-def clear_cold_memory():
-    # We clear both the Chat Logs and the Context Store
-    collections_to_clear = [COLLECTION_NAME, _CONTEXT_COLLECTION]
+def clear_cold_memory(recreate: bool = False):
+    """
+    Deletes the Chat Logs and Context Store collections, plus the LLM semantic cache (its
+    answers were built from the deleted context). They don't need recreating here: the app's
+    MCP startup (qdrant_setup.tune_collections) creates missing collections with the tuned
+    config. Pass recreate=True to get empty Chat Logs / Context Store back immediately.
+    """
+    # We clear the Chat Logs, the Context Store and the LLM cache
+    collections_to_clear = [COLLECTION_NAME, _CONTEXT_COLLECTION, _LLM_CACHE_COLLECTION]
     
     print(f"🧊 Clearing Cold Memory (Qdrant Collections: {collections_to_clear})...")
     
     url = os.getenv("QDRANT_URL", "").strip()
-    api_key = os.getenv("QDRANT_API_KEY", "").strip()
     
     if not url:
         print("❌ QDRANT_URL not set in .env. Skipping Cold Memory.")
         return
 
     try:
-        client = QdrantClient(url=url, api_key=api_key)
-        
-        for col_name in collections_to_clear:
-            print(f"   👉 Processing '{col_name}'...")
-            
-            # Check if collection exists
-            try:
-                collections = client.get_collections().collections
-                exists = any(c.name == col_name for c in collections)
-            except Exception:
-                exists = False
+        client = _get_qdrant_client()
+
+        # One listing for all collections instead of one per collection
+        try:
+            existing = {c.name for c in client.get_collections().collections}
+        except Exception:
+            existing = set()
+
+        def clear_collection(col_name):
+            _log(f"   👉 Processing '{col_name}'...")
             
-            if exists:
+            if col_name in existing:
                 client.delete_collection(col_name)
-                print(f"      ✅ Collection '{col_name}' deleted.")
+                _log(f"      ✅ Collection '{col_name}' deleted.")
             else:
-                print(f"      ℹ️  Collection '{col_name}' not found.")
-                
+                _log(f"      ℹ️  Collection '{col_name}' not found.")
+
+            if not recreate or col_name == _LLM_CACHE_COLLECTION:
+                return
             # Recreate empty collection with NAMED VECTOR for MCP compatibility
-            print(f"      🔄 Recreating empty collection '{col_name}'...")
+            _log(f"      🔄 Recreating empty collection '{col_name}'...")
             client.create_collection(
                 collection_name=col_name,
                 vectors_config={
                     "fast-all-minilm-l6-v2": models.VectorParams(size=VECTOR_SIZE, distance=models.Distance.COSINE)
                 }
             )
-            print(f"      ✅ Collection '{col_name}' recreated with named vector 'fast-all-minilm-l6-v2'.")
+            _log(f"      ✅ Collection '{col_name}' recreated with named vector 'fast-all-minilm-l6-v2'.")
+
+        # The collections are independent: delete (and recreate) them side by side
+        with ThreadPoolExecutor(max_workers=len(collections_to_clear)) as pool:
+            list(pool.map(clear_collection, collections_to_clear))
+
+        # The dedup hashes describe the deleted context_store; keeping them would skip re-storing
+        clear_context_dedup()
+        _log("      ✅ Context dedup table cleared.")
         
     except Exception as e:
         print(f"❌ Failed to clear Cold Memory: {e}")
@@ -118,7 +177,7 @@ def clear_cold_memory():
 # --- Dump Functions ---
 def dump_hot():
     """Dumps Hot Memory (Global Context) to a JSON file."""
-    print("🔥 Dumping Hot Memory...")
+    _log("🔥 Dumping Hot Memory...")
     TIMESTAMP = datetime.now().strftime("%Y%m%d_%H%M%S")
     try:
         hot_memory = HotMemory()
@@ -130,145 +189,156 @@ def dump_hot():
         }
         
         output_file = DUMP_DIR / f"hot_memory_dump_{TIMESTAMP}.json"
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
-        print(f"✅ Hot Memory dumped to {output_file}")
+        _write_json(output_file, data)
+        _log(f"✅ Hot Memory dumped to {output_file}")
     except Exception as e:
-        print(f"❌ Failed to dump Hot Memory: {e}")
+        _log(f"❌ Failed to dump Hot Memory: {e}")
+
+def _redis_sessions(r):
+    """Yields (session_id, {"chat_history", "metadata"}) for every chat:* key, chunk by chunk."""
+    # SCAN instead of the blocking KEYS; each chunk of sessions is fetched in one round trip
+    # WarmMemory's connections return raw bytes
+    session_ids = list(dict.fromkeys(
+        key.decode("utf-8").split(":", 1)[1] for key in r.scan_iter(match="chat:*", count=1000)
+    ))
+    for i in range(0, len(session_ids), REDIS_DUMP_CHUNK):
+        chunk = session_ids[i:i + REDIS_DUMP_CHUNK]
+        pipe = r.pipeline(transaction=False)
+        for session_id in chunk:
+            pipe.lrange(f"chat:{session_id}", 0, -1)
+            pipe.hgetall(f"meta:{session_id}")
+        fetched = pipe.execute()
+
+        for session_id, raw_msgs, raw_meta in zip(chunk, fetched[::2], fetched[1::2]):
+            # Chat history
+            messages = []
+            for m in raw_msgs:
+                try:
+                    messages.append(_loads(m))
+                except:
+                    messages.append(m.decode("utf-8", "replace"))
+
+            # Metadata
+            metadata = {}
+            for k, v in raw_meta.items():
+                k = k.decode("utf-8")
+                try:
+                    metadata[k] = WarmMemory.decode_metadata(v)
+                except:
+                    metadata[k] = v.decode("utf-8", "replace")
+
+            yield session_id, {"chat_history": messages, "metadata": metadata}
 
 def dump_warm():
-    """Dumps Warm Memory (Redis/Local Chat History) for ALL sessions."""
-    print("⚡ Dumping Warm Memory (All Sessions)...")
+    """
+    Dumps Warm Memory (Redis/Local Chat History) for ALL sessions to a gzipped JSON-Lines
+    file, one {"session_id", "chat_history", "metadata"} object per session, written as
+    each session is fetched. Read it back with load_warm_dump().
+    """
+    _log("⚡ Dumping Warm Memory (All Sessions)...")
     TIMESTAMP = datetime.now().strftime("%Y%m%d_%H%M%S")
     try:
         # Initialize a temporary instance to check connection and access client
         base_memory = WarmMemory(session_id="temp_dump_scanner")
-        
-        all_sessions_data = {}
 
-        if base_memory.use_redis:
-            print("   - Mode: Redis")
+        output_file = DUMP_DIR / f"warm_memory_export_{TIMESTAMP}.jsonl.gz"
+        count = 0
+        with io.BufferedWriter(gzip.open(output_file, 'wb'), buffer_size=1 << 20) as out:
+            if base_memory.use_redis:
+                _log("   - Mode: Redis")
+                sessions = _redis_sessions(base_memory.r)
+            else:
+                _log(f"   - Mode: Local Files ({base_memory.FALLBACK_DIR})")
+                sessions = WarmMemory.iter_local_sessions()
+
             try:
-                r = base_memory.r
-                chat_keys = r.keys("chat:*")
-                
-                for key in chat_keys:
-                    parts = key.split(":", 1)
-                    if len(parts) < 2: 
-                        continue
-                    session_id = parts[1]
-                    
-                    # Fetch chat history
-                    raw_msgs = r.lrange(key, 0, -1)
-                    messages = []
-                    for m in raw_msgs:
-                        try:
-                            messages.append(json.loads(m))
-                        except:
-                            messages.append(m)
-                    
-                    # Fetch metadata
-                    meta_key = f"meta:{session_id}"
-                    raw_meta = r.hgetall(meta_key)
-                    metadata = {}
-                    for k, v in raw_meta.items():
-                        try:
-                            metadata[k] = json.loads(v)
-                        except:
-                            metadata[k] = v
-                    
-                    all_sessions_data[session_id] = {
-                        "chat_history": messages,
-                        "metadata": metadata
-                    }
+                for session_id, data in sessions:
+                    out.write(_json_line({"session_id": session_id, **data}))
+                    count += 1
             except Exception as e:
-                print(f"Error accessing Redis: {e}")
-                
-        else:
-            print(f"   - Mode: Local File ({base_memory.FALLBACK_FILE})")
-            if base_memory.FALLBACK_FILE.exists():
-                with open(base_memory.FALLBACK_FILE, 'r', encoding='utf-8') as f:
-                    local_store = json.load(f)
-                
-                for key, value in local_store.items():
-                    if key.startswith("chat:"):
-                        session_id = key.split(":", 1)[1]
-                        if session_id not in all_sessions_data:
-                            all_sessions_data[session_id] = {"chat_history": [], "metadata": {}}
-                        all_sessions_data[session_id]["chat_history"] = value
-                        
-                    elif key.startswith("meta:"):
-                        session_id = key.split(":", 1)[1]
-                        if session_id not in all_sessions_data:
-                            all_sessions_data[session_id] = {"chat_history": [], "metadata": {}}
-                        all_sessions_data[session_id]["metadata"] = value
-
-        output_file = DUMP_DIR / f"warm_memory_export_{TIMESTAMP}.json"
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(all_sessions_data, f, indent=2, ensure_ascii=False)
-        print(f"✅ Warm Memory (All Sessions) dumped to {output_file}")
+                _log(f"Error reading sessions (dump cut short after {count}): {e}")
+
+        _log(f"✅ Warm Memory ({count} sessions) dumped to {output_file}")
     except Exception as e:
-        print(f"❌ Failed to dump Warm Memory: {e}")
+        _log(f"❌ Failed to dump Warm Memory: {e}")
+
+def load_warm_dump(path) -> Iterator[Dict[str, Any]]:
+    """Iterates the sessions of a dump_warm export (.jsonl.gz)."""
+    with gzip.open(path, 'rb') as f:
+        for line in f:
+            if line.strip():
+                yield _loads(line)
 
 def dump_cold():
-    """Dumps Cold Memory (Qdrant Collections) to a JSON file."""
-    print("🧊 Dumping Cold Memory...")
+    """
+    Dumps Cold Memory (Qdrant Collections) to a gzipped JSON-Lines file, one
+    {"collection", "id", "payload"} object per point, streamed page by page.
+    """
+    _log("🧊 Dumping Cold Memory...")
     TIMESTAMP = datetime.now().strftime("%Y%m%d_%H%M%S")
     try:
         client = _get_qdrant_client()
-        
-        dump_data = {
-            "context_store": [],
-            "chat_logs_mcp": []
-        }
-        
-        def scroll_collection(collection_name):
-            points = []
+
+        write_lock = threading.Lock()
+
+        def scroll_collection(collection_name, out) -> int:
+            count = 0
             next_offset = None
             while True:
                 results, next_offset = client.scroll(
                     collection_name=collection_name,
-                    limit=100,
+                    limit=QDRANT_SCROLL_LIMIT,
                     offset=next_offset,
                     with_payload=True,
                     with_vectors=False
                 )
-                
-                for point in results:
-                    points.append({
-                        "id": point.id,
-                        "payload": point.payload
-                    })
-                
+
+                # One write per page; nothing is accumulated in memory
+                page = b"".join(
+                    _json_line({"collection": collection_name, "id": point.id, "payload": point.payload})
+                    for point in results
+                )
+                with write_lock:
+                    out.write(page)
+                count += len(results)
+
                 if next_offset is None:
                     break
-            return points
+            return count
 
-        # Dump Context Store
-        try:
-            print(f"   - Scrolling {_CONTEXT_COLLECTION}...")
-            dump_data["context_store"] = scroll_collection(_CONTEXT_COLLECTION)
-        except Exception as e:
-            print(f"   ⚠️ Could not dump {_CONTEXT_COLLECTION}: {e}")
-
-        # Dump Chat Logs
-        try:
-            print(f"   - Scrolling {_LOGS_COLLECTION}...")
-            dump_data["chat_logs"] = scroll_collection(_LOGS_COLLECTION)
-        except Exception as e:
-            print(f"   ⚠️ Could not dump {_LOGS_COLLECTION}: {e}")
+        def dump_collection(collection_name, out):
+            try:
+                _log(f"   - Scrolling {collection_name}...")
+                count = scroll_collection(collection_name, out)
+                _log(f"     {collection_name}: {count} points")
+            except Exception as e:
+                _log(f"   ⚠️ Could not dump {collection_name}: {e}")
 
-        output_file = DUMP_DIR / f"cold_memory_dump_{TIMESTAMP}.json"
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(dump_data, f, indent=2, ensure_ascii=False)
-        print(f"✅ Cold Memory dumped to {output_file}")
+        # Both collections are scrolled in parallel; pages interleave in the file, tagged by collection
+        output_file = DUMP_DIR / f"cold_memory_dump_{TIMESTAMP}.jsonl.gz"
+        with io.BufferedWriter(gzip.open(output_file, 'wb'), buffer_size=1 << 20) as out:
+            with ThreadPoolExecutor(max_workers=2) as pool:
+                list(pool.map(partial(dump_collection, out=out), (_CONTEXT_COLLECTION, _LOGS_COLLECTION)))
+        _log(f"✅ Cold Memory dumped to {output_file}")
 
     except Exception as e:
-        print(f"❌ Failed to dump Cold Memory: {e}")
+        _log(f"❌ Failed to dump Cold Memory: {e}")
 
 
 def test_mcp_tools():
     print("\n--- MCP Integration Final Report ---")
+
+    # 0. Warm-up: the first call starts the MCP server and loads its embedding model,
+    # which would otherwise be billed to whichever measurement runs first
+    print("\n0. Warming up MCP session...")
+    start_time = time.time()
+    try:
+        chat_log_search_tool.invoke({"query": "warmup", "collection_name": "chat_logs_mcp"})
+        warmup_duration = time.time() - start_time
+        print(f"⏱️  Warm-up Duration: {warmup_duration:.4f} seconds")
+    except Exception as e:
+        print(f"❌ Warm-up Failed: {e}")
+        warmup_duration = 0
     
     # 1. Test chat_log_add_tool
     print("\n1. Testing chat_log_add_tool...")
@@ -306,10 +376,33 @@ def test_mcp_tools():
     except Exception as e:
         print(f"❌ Search Failed: {e}")
         search_duration = 0
+
+    # 3. Steady state: one batched store of N entries, then N searches
+    print(f"\n3. Timing batched add + {MCP_BENCH_SIZE} searches...")
+    batch_per_item = search_per_item = 0
+    try:
+        start_time = time.time()
+        result = log_batch_chat([
+            {"role": "user", "content": f"MCP Benchmark {i}", "summary": "Benchmark entry"}
+            for i in range(MCP_BENCH_SIZE)
+        ], default_agent="Tester")
+        batch_per_item = (time.time() - start_time) / MCP_BENCH_SIZE
+        print(f"✅ Batch Add: {result['count']}/{MCP_BENCH_SIZE} stored, {batch_per_item:.4f}s per item")
+
+        start_time = time.time()
+        for i in range(MCP_BENCH_SIZE):
+            chat_log_search_tool.invoke({"query": f"MCP Benchmark {i}", "collection_name": "chat_logs_mcp"})
+        search_per_item = (time.time() - start_time) / MCP_BENCH_SIZE
+        print(f"✅ Searches: {search_per_item:.4f}s per query")
+    except Exception as e:
+        print(f"❌ Batch Timing Failed: {e}")
         
     print("\n--- Summary ---")
+    print(f"Warm-up (cold start) Time: {warmup_duration:.4f}s")
     print(f"Log 1 Query Time: {add_duration:.4f}s")
     print(f"Search 1 Query Time: {search_duration:.4f}s")
+    print(f"Batched Log Time per Item: {batch_per_item:.4f}s")
+    print(f"Search Time per Query (avg of {MCP_BENCH_SIZE}): {search_per_item:.4f}s")
     print("----------------")
 
 # --- Main Interface ---
@@ -336,9 +429,10 @@ def main():
                 
         elif choice == '2':
             print("\n--- Dumping Memories ---")
-            dump_hot()
-            dump_warm()
-            dump_cold()
+            # Independent and I/O-bound (file, Redis, Qdrant): run them side by side
+            with ThreadPoolExecutor(max_workers=3) as pool:
+                for future in [pool.submit(dump) for dump in (dump_hot, dump_warm, dump_cold)]:
+                    future.result()
             print("✨ Done.")
 
         elif choice == '3':
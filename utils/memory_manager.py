@@ -1,15 +1,27 @@
 import redis
 import json
 import os
+import re
+import queue
+import time
+import atexit
 import threading
+from collections import deque
+from itertools import islice
 from datetime import datetime
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Tuple, Iterator
 from dotenv import load_dotenv
 from pathlib import Path
 
 # Import the optimized Cold Storage backend
 from utils.qdrant_setup import log_batch_chat, search_chat_history, search_context
 from utils.model_manager import ModelManager
+from utils.messages import flatten_content
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 load_dotenv()
 
@@ -17,49 +29,94 @@ load_dotenv()
 model_manager = ModelManager()
 Logger = model_manager.get_model(temperature=0.1)
 
+
+# --- JSON (orjson when installed: this runs on every chat turn) ---
+def _dumps(obj: Any, indent: bool = False) -> bytes:
+    """UTF-8 JSON bytes; `indent` for the files people read, compact for Redis."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0))
+    return json.dumps(obj, indent=2 if indent else None, ensure_ascii=False).encode("utf-8")
+
+_loads = orjson.loads if orjson is not None else json.loads
+
+def _atomic_write(path: Path, data: bytes):
+    """Writes a sibling temp file and swaps it in, so readers never see a torn file."""
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+_FENCE_RE = re.compile(r"```(?:json)?\s*(.*?)\s*```", re.S)
+
+# Archived messages shorter than this get a templated summary instead of an LLM call
+MIN_SUMMARY_CHARS = 20
+
 # ==========================================================
 # 🧱 HOT MEMORY (Global Context - Persistent File)
 # ==========================================================
 class HotMemory:
     """
     Handles the 'Always-On' Global Context.
-    Uses a dedicated JSON file for persistence across separate agent runs.
+    Uses a dedicated plain-text file for persistence across separate agent runs:
+    first line is the save timestamp, the rest is the context verbatim.
     """
-    _HOT_MEMORY_FILE = Path(__file__).parent / "hot_memory.json"
+    _HOT_MEMORY_FILE = Path(__file__).parent / "hot_memory.txt"
+    _LEGACY_FILE = Path(__file__).parent / "hot_memory.json"  # earlier JSON format, still read
     _CONTEXT_KEY = "global_project_context"
 
+    # Parsed context shared by every instance (each agent builds one), keyed by the file's
+    # mtime so a context saved by another process is still picked up. (mtime_ns, context)
+    _cache: Optional[Tuple[Optional[int], str]] = None
+    _cache_lock = threading.Lock()
+
     def __init__(self):
-        # Load context when the object is initialized
-        self._global_context = self._load_context_from_file()
+        # Load context when the object is initialized (parsed only if the file changed)
+        self._global_context = self._cached_context()
+
+    def _file_mtime(self) -> Optional[int]:
+        try:
+            return self._HOT_MEMORY_FILE.stat().st_mtime_ns
+        except OSError:
+            return None
+
+    def _cached_context(self) -> str:
+        mtime = self._file_mtime()
+        with HotMemory._cache_lock:
+            if HotMemory._cache is None or HotMemory._cache[0] != mtime:
+                HotMemory._cache = (mtime, self._load_context_from_file())
+            return HotMemory._cache[1]
 
     def _load_context_from_file(self) -> str:
         """Loads the global context from the persistent file."""
-        if not self._HOT_MEMORY_FILE.exists():
-            return ""
         try:
-            with open(self._HOT_MEMORY_FILE, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                return data.get(self._CONTEXT_KEY, "")
+            if self._HOT_MEMORY_FILE.exists():
+                # Bytes, not text mode: the context's own line endings stay as saved
+                return self._HOT_MEMORY_FILE.read_bytes().decode("utf-8").partition("\n")[2]
+            if self._LEGACY_FILE.exists():
+                return _loads(self._LEGACY_FILE.read_bytes()).get(self._CONTEXT_KEY, "")
+            return ""
         except Exception as e:
             print(f"⚠️ HotMemory: Failed to load context from file. Starting fresh. Error: {e}")
             return ""
 
     def _save_context_to_file(self, context_text: str):
         """Saves the global context to the persistent file."""
-        data = {
-            self._CONTEXT_KEY: context_text,
-            "timestamp": datetime.now().isoformat()
-        }
         try:
-            with open(self._HOT_MEMORY_FILE, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
+            _atomic_write(self._HOT_MEMORY_FILE, f"{datetime.now().isoformat()}\n{context_text}".encode("utf-8"))
         except Exception as e:
             print(f"❌ HotMemory: Failed to save context to file. Error: {e}")
 
     def set_context(self, context_text: str):
         """Update the global system prompt context and save it persistently."""
+        # Compare against the shared file-backed value: this instance's copy may predate a
+        # save made through another HotMemory (e.g. the Contextor's)
+        if context_text == self._cached_context():
+            self._global_context = context_text
+            return
         self._global_context = context_text
         self._save_context_to_file(context_text)
+        with HotMemory._cache_lock:
+            HotMemory._cache = (self._file_mtime(), context_text)
 
     def get_context(self) -> str:
         """Retrieve the global context for system prompt injection."""
@@ -72,17 +129,185 @@ class HotMemory:
 # ==========================================================
 # ⚡ WARM MEMORY (Redis -> Fallback to JSON File)
 # ==========================================================
+# In-process ring buffer of each session's most recent messages, shared by every
+# WarmMemory instance in this process (agents in the Router share one session_id).
+# It mirrors the tail of the store: appended on add_message, trimmed when the
+# archiver pops, dropped on clear_session. Seeded from the store on first read.
+RECENT_WINDOW_SIZE = 30
+_recent_windows: Dict[str, deque] = {}
+_session_versions: Dict[str, int] = {}
+_pending_writes: Dict[str, int] = {}  # queued but not yet persisted, per session
+_history_lock = threading.Lock()
+_fallback_lock = threading.Lock()  # local fallback files (writer thread vs. readers)
+
+# Fire-and-forget persistence: add_message only updates the in-process window and
+# queues the write. One background thread drains the queue, batching everything
+# queued so far into a single Redis pipeline (or one file append) per WarmMemory.
+_WRITE_QUEUE: "queue.Queue" = queue.Queue()
+_writer_thread: Optional[threading.Thread] = None
+_writer_lock = threading.Lock()
+
+def _start_writer():
+    global _writer_thread
+    with _writer_lock:
+        if _writer_thread is None or not _writer_thread.is_alive():
+            _writer_thread = threading.Thread(target=_writer_loop, name="warm-memory-writer", daemon=True)
+            _writer_thread.start()
+
+def _writer_loop():
+    while True:
+        batch = [_WRITE_QUEUE.get()]
+        while True:
+            try:
+                batch.append(_WRITE_QUEUE.get_nowait())
+            except queue.Empty:
+                break
+
+        # Group by WarmMemory instance, keeping the original order within each
+        grouped: Dict[int, tuple] = {}
+        for memory, msg_obj in batch:
+            grouped.setdefault(id(memory), (memory, []))[1].append(msg_obj)
+
+        for memory, msgs in grouped.values():
+            try:
+                memory._persist_messages(msgs)
+            except Exception as e:
+                print(f"❌ WarmMemory write failed: {e}")
+        for _ in batch:
+            _WRITE_QUEUE.task_done()
+
+# Archival (LLM summary + Qdrant store) runs on one background thread fed by a bounded
+# queue, instead of a new thread per overflow. Overflows arriving within ARCHIVE_COALESCE_SECONDS
+# are merged (up to ARCHIVE_COALESCE_MAX messages) into one summarize/store batch.
+# Callers add a turn's user message and agent reply separately (before / after the LLM call),
+# so each usually overflows alone: a batch holding a single message that needs an LLM summary
+# waits up to ARCHIVE_PAIR_SECONDS for the next overflow, and the pair shares one summary call.
+ARCHIVE_COALESCE_SECONDS = 0.1
+ARCHIVE_PAIR_SECONDS = 30.0
+ARCHIVE_COALESCE_MAX = 16
+ARCHIVE_EXIT_WAIT_SECONDS = 15.0
+_ARCHIVE_QUEUE: "queue.Queue" = queue.Queue(maxsize=1024)
+_archiver_thread: Optional[threading.Thread] = None
+
+def _start_archiver():
+    global _archiver_thread
+    with _writer_lock:
+        if _archiver_thread is None or not _archiver_thread.is_alive():
+            _archiver_thread = threading.Thread(target=_archiver_loop, name="warm-memory-archiver", daemon=True)
+            _archiver_thread.start()
+
+def _needs_llm_summary(msg: Dict[str, Any]) -> bool:
+    return len((msg.get("content") or "").strip()) >= MIN_SUMMARY_CHARS
+
+def _archiver_loop():
+    while True:
+        memory, msgs = _ARCHIVE_QUEUE.get()
+        if memory is None:  # exit flush with nothing held
+            _ARCHIVE_QUEUE.task_done()
+            continue
+        batch = list(msgs)
+        taken = 1
+        start = time.monotonic()
+        while len(batch) < ARCHIVE_COALESCE_MAX:
+            lone = sum(1 for m in batch if _needs_llm_summary(m)) == 1
+            timeout = start + (ARCHIVE_PAIR_SECONDS if lone else ARCHIVE_COALESCE_SECONDS) - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                more_memory, more = _ARCHIVE_QUEUE.get(timeout=timeout)
+            except queue.Empty:
+                break
+            taken += 1
+            if more_memory is None:  # exiting: archive what we hold now
+                break
+            batch.extend(more)
+
+        try:
+            memory._archive_oldest(batch)
+        except Exception as e:
+            print(f"❌ WarmMemory archive failed: {e}")
+        for _ in range(taken):
+            _ARCHIVE_QUEUE.task_done()
+
+def flush_pending_writes():
+    """Blocks until every queued WarmMemory write has been persisted."""
+    if _writer_thread is not None and _writer_thread.is_alive():
+        _WRITE_QUEUE.join()
+
+atexit.register(flush_pending_writes)
+
+def _flush_archives():
+    """At exit, stops the archiver holding a message for pairing and gives it a moment to finish."""
+    flush_pending_writes()  # their overflows are archived too
+    if _archiver_thread is None or not _archiver_thread.is_alive():
+        return
+    try:
+        _ARCHIVE_QUEUE.put_nowait((None, []))
+    except queue.Full:
+        pass
+    deadline = time.monotonic() + ARCHIVE_EXIT_WAIT_SECONDS
+    while _ARCHIVE_QUEUE.unfinished_tasks and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+atexit.register(_flush_archives)
+
+# One Redis connection pool per server, shared by every WarmMemory in the process, so new
+# instances (one per agent / Contextor session) don't each open their own sockets.
+# Capped at 100 connections; callers wait up to 5s for a free one instead of failing.
+REDIS_MAX_CONNECTIONS = 100
+_REDIS_POOLS: Dict[tuple, "redis.ConnectionPool"] = {}
+_redis_pool_lock = threading.Lock()
+
+def _get_redis_pool(host: str, port: int, db: int) -> "redis.ConnectionPool":
+    url = os.getenv("REDIS_URL", "").strip()
+    key = (url,) if url else (host, port, db)
+    with _redis_pool_lock:
+        pool = _REDIS_POOLS.get(key)
+        if pool is None:
+            # Raw bytes replies: values are JSON parsed straight from bytes, no str decode first
+            options = dict(max_connections=REDIS_MAX_CONNECTIONS, timeout=5, decode_responses=False)
+            if url:
+                pool = redis.BlockingConnectionPool.from_url(url, **options)
+            else:
+                pool = redis.BlockingConnectionPool(host=host, port=port, db=db, **options)
+            _REDIS_POOLS[key] = pool
+        return pool
+
+# RPUSH the batch, then LRANGE+LTRIM whatever exceeds the threshold, atomically and in
+# one round trip. Returns {new_length, {popped...}}.
+_PUSH_AND_TRIM_LUA = """
+local key = KEYS[1]
+local threshold = tonumber(ARGV[1])
+for i = 2, #ARGV do
+    redis.call('RPUSH', key, ARGV[i])
+end
+local len = redis.call('LLEN', key)
+if len <= threshold then
+    return {len, {}}
+end
+local overflow = len - threshold
+local popped = redis.call('LRANGE', key, 0, overflow - 1)
+redis.call('LTRIM', key, overflow, -1)
+return {threshold, popped}
+"""
+
 class WarmMemory:
     """
     Handles High-Speed, Short-Term Memory.
-    Attempts to use Redis, but falls back to a JSON file if Redis is offline.
+    Attempts to use Redis, but falls back to local files if Redis is offline.
     This ensures admin tools can see data even without Redis.
     """
-    # File path for local fallback persistence
-    FALLBACK_FILE = Path("warm_memory_dump.json")
+    # Local fallback: per session, an append-only JSON-Lines chat log, the byte offset of
+    # its first live line (archived messages are skipped past, not rewritten) and a small
+    # metadata file. The log is compacted once its dead prefix exceeds FALLBACK_COMPACT_BYTES.
+    FALLBACK_DIR = Path("warm_memory")
+    FALLBACK_COMPACT_BYTES = 4096
 
-    def __init__(self, session_id: str = "default_session", host='localhost', port=6379, db=0, llm=None):
+    def __init__(self, session_id: str = "default_session", host='localhost', port=6379, db=0, llm=None,
+                 max_content_chars: Optional[int] = None):
         self.session_id = session_id
+        # If set, message content is truncated once on write instead of on every read
+        self.max_content_chars = max_content_chars
         self.chat_key = f"chat:{session_id}"
         self.meta_key = f"meta:{session_id}"
         self.ARCHIVE_THRESHOLD = 10
@@ -93,136 +318,322 @@ class WarmMemory:
         self.r = None
 
         try:
-            # Try connecting to Redis
-            self.r = redis.Redis(host=host, port=port, db=db, decode_responses=True)
+            # Try connecting to Redis (REDIS_URL, if set, overrides host/port/db)
+            self.r = redis.Redis(connection_pool=_get_redis_pool(host, port, db))
             self.r.ping() # Test connection
             self.use_redis = True
+            self._push_and_trim = self.r.register_script(_PUSH_AND_TRIM_LUA)
         except (redis.ConnectionError, ConnectionRefusedError):
-            # print(f"⚠️  Redis not found. Using File Fallback: {self.FALLBACK_FILE}")
+            # print(f"⚠️  Redis not found. Using File Fallback: {self.FALLBACK_DIR}")
             self.use_redis = False
             self._ensure_local_store()
 
+    @classmethod
+    def _local_files(cls, stem: str) -> Tuple[Path, Path, Path]:
+        """(chat log, head offset, metadata) files of a session in the local fallback."""
+        return (cls.FALLBACK_DIR / f"{stem}.chat.jsonl",
+                cls.FALLBACK_DIR / f"{stem}.head",
+                cls.FALLBACK_DIR / f"{stem}.meta.json")
+
     def _ensure_local_store(self):
-        """Load local JSON store if it exists, else create empty."""
-        if not self.FALLBACK_FILE.exists():
-            self._local_store = {}
-            self._save_local_store()
-        else:
+        """Resolves this session's fallback files; nothing is loaded up front."""
+        stem = re.sub(r"[^\w.-]", "_", self.session_id)  # session ids may hold ':'
+        self._chat_file, self._head_file, self._meta_file = self._local_files(stem)
+        try:
+            self.FALLBACK_DIR.mkdir(exist_ok=True)
+        except OSError as e:
+            print(f"❌ Failed to create warm memory folder: {e}")
+
+    @staticmethod
+    def _read_head(head_file: Path) -> int:
+        try:
+            return int(head_file.read_text() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    @staticmethod
+    def _parse_lines(lines) -> List[Dict[str, Any]]:
+        msgs = []
+        for line in lines:
             try:
-                with open(self.FALLBACK_FILE, 'r', encoding='utf-8') as f:
-                    self._local_store = json.load(f)
-            except Exception:
-                self._local_store = {}
+                msgs.append(_loads(line))
+            except ValueError:
+                pass  # torn write from an interrupted run
+        return msgs
 
-    def _save_local_store(self):
-        """Persist local store to disk."""
+    @classmethod
+    def _read_local_chat(cls, chat_file: Path, head_file: Path, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Live messages of a chat log (only the last `limit` are parsed, if given)."""
         try:
-            with open(self.FALLBACK_FILE, 'w', encoding='utf-8') as f:
-                json.dump(self._local_store, f, indent=2, ensure_ascii=False)
-        except Exception as e:
-            print(f"❌ Failed to save warm memory dump: {e}")
+            with open(chat_file, 'rb') as f:
+                f.seek(cls._read_head(head_file))
+                return cls._parse_lines(deque(f, maxlen=limit) if limit else f)
+        except FileNotFoundError:
+            return []
+
+    @staticmethod
+    def _read_local_meta(meta_file: Path) -> Dict[str, Any]:
+        try:
+            with open(meta_file, 'rb') as f:
+                return _loads(f.read())
+        except (OSError, ValueError):
+            return {}
+
+    @classmethod
+    def iter_local_sessions(cls) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Yields (session, {"chat_history": [...], "metadata": {...}}) for every session in the
+        local fallback, one at a time, so a dump never holds more than one session in memory.
+        """
+        if not cls.FALLBACK_DIR.is_dir():
+            return
+        stems = {}
+        for entry in os.scandir(cls.FALLBACK_DIR):
+            for suffix in (".chat.jsonl", ".meta.json"):
+                if entry.name.endswith(suffix):
+                    stems.setdefault(entry.name[:-len(suffix)], None)
+        for stem in stems:
+            chat_file, head_file, meta_file = cls._local_files(stem)
+            with _fallback_lock:
+                data = {
+                    "chat_history": cls._read_local_chat(chat_file, head_file),
+                    "metadata": {k: cls.decode_metadata(v) for k, v in cls._read_local_meta(meta_file).items()},
+                }
+            yield stem, data
 
     # --- Structured Metadata ---
+    # Stored metadata values carry a type tag, so reads don't have to guess: "s:" + a plain
+    # string as-is, "j:" + JSON for anything else. Untagged values from before still decode.
+    @staticmethod
+    def _encode_metadata(value: Any) -> str:
+        if isinstance(value, str):
+            return "s:" + value
+        return "j:" + _dumps(value).decode("utf-8")
+
+    @staticmethod
+    def decode_metadata(val: Any) -> Any:
+        """Decodes a stored metadata value (tagged or legacy, str or Redis bytes)."""
+        if isinstance(val, bytes):
+            val = val.decode("utf-8")
+        if isinstance(val, str):
+            if val.startswith("s:"):
+                return val[2:]
+            if val.startswith("j:"):
+                return _loads(val[2:])
+        try:
+            return _loads(val)
+        except (ValueError, TypeError):  # orjson.JSONDecodeError subclasses ValueError too
+            return val
+
     def save_metadata(self, key: str, value: Any):
-        if isinstance(value, (dict, list)):
-            value = json.dumps(value)
+        value = self._encode_metadata(value)
 
         if self.use_redis:
             self.r.hset(self.meta_key, key, value)
         else:
-            self._ensure_local_store() # Reload to get latest
-            if self.meta_key not in self._local_store:
-                self._local_store[self.meta_key] = {}
-            self._local_store[self.meta_key][key] = value
-            self._save_local_store()
+            with _fallback_lock:
+                meta = self._read_local_meta(self._meta_file)
+                meta[key] = value
+                try:
+                    _atomic_write(self._meta_file, _dumps(meta, indent=True))
+                except OSError as e:
+                    print(f"❌ Failed to save warm memory metadata: {e}")
 
     def get_metadata(self, key: str) -> Any:
         val = None
         if self.use_redis:
             val = self.r.hget(self.meta_key, key)
         else:
-            self._ensure_local_store()
-            val = self._local_store.get(self.meta_key, {}).get(key)
+            with _fallback_lock:
+                val = self._read_local_meta(self._meta_file).get(key)
 
         if val is None:
             return None
-        try:
-            return json.loads(val)
-        except (json.JSONDecodeError, TypeError):
-            return val
+        return self.decode_metadata(val)
 
     # --- Chat History (The Buffer) ---
     def add_message(self, role: str, content: str):
-        msg_obj = {
-            "role": role, 
-            "content": content, 
-            "timestamp": datetime.now().isoformat()
-        }
-        
+        self.add_messages([(role, content)])
+
+    def add_messages(self, pairs: List[tuple]):
+        """Adds several (role, content) messages in order; they are persisted as one batch."""
+        timestamp = datetime.now().isoformat()
+        msg_objs = []
+        for role, content in pairs:
+            if self.max_content_chars and len(content) > self.max_content_chars:
+                content = content[:self.max_content_chars] + "... [TRUNCATED]"
+            msg_objs.append({
+                "role": role, 
+                "content": content, 
+                "timestamp": timestamp
+            })
+
+        # Visible to readers in this process immediately; persisted in the background
+        _start_writer()
+        with _history_lock:
+            _session_versions[self.session_id] = _session_versions.get(self.session_id, 0) + 1
+            _pending_writes[self.session_id] = _pending_writes.get(self.session_id, 0) + len(msg_objs)
+            window = _recent_windows.get(self.session_id)
+            if window is not None:
+                window.extend(msg_objs)
+            for msg_obj in msg_objs:
+                _WRITE_QUEUE.put((self, msg_obj))
+
+    def _persist_messages(self, msgs: List[Dict[str, Any]]):
+        """Writes queued messages to the store (runs on the writer thread), then archives overflow."""
+        msgs_to_archive = []
         current_len = 0
-        if self.use_redis:
-            self.r.rpush(self.chat_key, json.dumps(msg_obj))
-            current_len = self.r.llen(self.chat_key)
-        else:
-            self._ensure_local_store()
-            if self.chat_key not in self._local_store:
-                self._local_store[self.chat_key] = []
-            self._local_store[self.chat_key].append(msg_obj)
-            self._save_local_store()
-            current_len = len(self._local_store[self.chat_key])
-
-        if current_len > self.ARCHIVE_THRESHOLD:
-            # Pop oldest message(s) synchronously to maintain warm memory size
-            msgs_to_archive = self._pop_oldest_sync()
-            
-            # Archive asynchronously
-            if msgs_to_archive:
-                thread = threading.Thread(target=self._archive_oldest, args=(msgs_to_archive,))
-                thread.daemon = True
-                thread.start()
-
-    def _pop_oldest_sync(self) -> List[Dict[str, Any]]:
+        try:
+            if self.use_redis:
+                # Push + overflow trim in a single atomic round trip
+                current_len, popped_raw = self._push_and_trim(
+                    keys=[self.chat_key],
+                    args=[self.ARCHIVE_THRESHOLD, *(_dumps(m) for m in msgs)]
+                )
+                msgs_to_archive = [_loads(m) for m in popped_raw]
+            else:
+                # One appended line per message; the live tail stays short (ARCHIVE_THRESHOLD)
+                with _fallback_lock:
+                    with open(self._chat_file, 'ab') as f:
+                        f.write(b"".join(_dumps(m) + b"\n" for m in msgs))
+                    current_len = len(self._read_local_chat(self._chat_file, self._head_file))
+        finally:
+            with _history_lock:
+                _pending_writes[self.session_id] = _pending_writes.get(self.session_id, 0) - len(msgs)
+
+        if msgs_to_archive:
+            self._trim_window(current_len)
+
+        # Pop oldest message(s) to maintain warm memory size (file fallback)
+        while current_len > self.ARCHIVE_THRESHOLD:
+            popped = self._pop_oldest_sync(current_len)
+            if not popped:
+                break
+            msgs_to_archive.extend(popped)
+            current_len -= len(popped)
+
+        # Archive asynchronously
+        if msgs_to_archive:
+            _start_archiver()
+            _ARCHIVE_QUEUE.put((self, msgs_to_archive))  # blocks (backpressure) if the archiver is far behind
+
+    def _pop_oldest_sync(self, current_len: Optional[int] = None) -> List[Dict[str, Any]]:
         """Removes oldest messages from store and returns them."""
         msgs = []
         if self.use_redis:
             old_msgs_raw = self.r.lpop(self.chat_key, self.ARCHIVE_BATCH_SIZE)
             if old_msgs_raw:
-                msgs = [json.loads(m) for m in old_msgs_raw]
+                msgs = [_loads(m) for m in old_msgs_raw]
         else:
-            self._ensure_local_store()
-            all_msgs = self._local_store.get(self.chat_key, [])
-            msgs = all_msgs[:self.ARCHIVE_BATCH_SIZE]
-            self._local_store[self.chat_key] = all_msgs[self.ARCHIVE_BATCH_SIZE:]
-            self._save_local_store()
+            with _fallback_lock:
+                current_len, msgs = self._pop_local_head()
+
+        self._trim_window(None if current_len is None else max(current_len - len(msgs), 0))
         return msgs
 
+    def _pop_local_head(self) -> Tuple[int, List[Dict[str, Any]]]:
+        """Moves the chat log's head offset past the oldest message(s); returns (length before, popped)."""
+        try:
+            with open(self._chat_file, 'rb') as f:
+                f.seek(self._read_head(self._head_file))
+                popped = [line for line in (f.readline() for _ in range(self.ARCHIVE_BATCH_SIZE)) if line]
+                head = f.tell()
+                rest = f.read()
+        except FileNotFoundError:
+            return 0, []
+
+        if head > self.FALLBACK_COMPACT_BYTES:
+            # Reset the head before swapping files: a crash in between replays messages, never loses them
+            _atomic_write(self._head_file, b"0")
+            _atomic_write(self._chat_file, rest)
+        else:
+            _atomic_write(self._head_file, str(head).encode())
+        return len(popped) + rest.count(b"\n"), self._parse_lines(popped)
+
+    def _trim_window(self, store_len: Optional[int]):
+        """Keeps the in-process window in line with the store after oldest messages were removed."""
+        with _history_lock:
+            _session_versions[self.session_id] = _session_versions.get(self.session_id, 0) + 1
+            window = _recent_windows.get(self.session_id)
+            if window is None:
+                return
+            if store_len is None:
+                # Unknown store length, re-seed on next read
+                del _recent_windows[self.session_id]
+                return
+            # The window holds the store's tail (plus queued writes); only trim it once that is shorter
+            remaining = store_len + _pending_writes.get(self.session_id, 0)
+            while len(window) > remaining:
+                window.popleft()
+
+    def get_recent_messages_cached(self, limit: int = 20) -> List[Dict[str, str]]:
+        """
+        Same as get_recent_messages, but served from the session's in-process ring buffer
+        so repeated history builds (agents + Watcher share a session) never touch Redis
+        or re-parse JSON. Only the first read of a session does one LRANGE.
+        """
+        if limit > RECENT_WINDOW_SIZE:
+            return self.get_recent_messages(limit=limit)
+
+        with _history_lock:
+            window = _recent_windows.get(self.session_id)
+            if window is not None:
+                return list(islice(window, max(len(window) - limit, 0), None))
+            version = _session_versions.get(self.session_id, 0)
+
+        msgs = self.get_recent_messages(limit=RECENT_WINDOW_SIZE)
+
+        with _history_lock:
+            # Only install the window if nothing was written while we were reading
+            if version == _session_versions.get(self.session_id, 0):
+                _recent_windows[self.session_id] = deque(msgs, maxlen=RECENT_WINDOW_SIZE)
+        return msgs[-limit:]
+
     def get_recent_messages(self, limit: int = 20) -> List[Dict[str, str]]:
+        flush_pending_writes()
         if self.use_redis:
             raw_msgs = self.r.lrange(self.chat_key, -limit, -1)
-            return [json.loads(m) for m in raw_msgs]
+            return [_loads(m) for m in raw_msgs]
         else:
-            self._ensure_local_store()
-            return self._local_store.get(self.chat_key, [])[-limit:]
+            with _fallback_lock:
+                return self._read_local_chat(self._chat_file, self._head_file, limit)
     
     def clear_session(self):
+        flush_pending_writes()
         if self.use_redis:
             self.r.delete(self.chat_key)
             self.r.delete(self.meta_key)
         else:
-            self._ensure_local_store()
-            if self.chat_key in self._local_store:
-                del self._local_store[self.chat_key]
-            if self.meta_key in self._local_store:
-                del self._local_store[self.meta_key]
-            self._save_local_store()
+            with _fallback_lock:
+                for path in (self._chat_file, self._head_file, self._meta_file):
+                    path.unlink(missing_ok=True)
+        with _history_lock:
+            _session_versions[self.session_id] = _session_versions.get(self.session_id, 0) + 1
+            _recent_windows.pop(self.session_id, None)
 
     # --- Internal Archiver ---
     def _archive_oldest(self, msgs_to_archive: List[Dict[str, Any]]):
         #print(f"⚡ WarmMemory full (> {self.ARCHIVE_THRESHOLD}). Archiving {len(msgs_to_archive)} msg(s) to Cold Storage (Async)...")
+        # Trivial messages ("ok", "thanks", "") are summarized here, without the LLM
+        to_summarize = []
+        for msg in msgs_to_archive:
+            content = (msg.get("content") or "").strip()
+            if len(content) < MIN_SUMMARY_CHARS:
+                msg["summary"] = f"{msg.get('role', 'Unknown')} message: {content or '[empty response]'}"
+            else:
+                to_summarize.append(msg)
+
+        # Generate Summary if LLM is available (one call for the whole batch)
+        if Logger and len(to_summarize) > 1:
+            summaries = self._summarize_batch(to_summarize)
+            if summaries is not None:
+                for msg, summary in zip(to_summarize, summaries):
+                    msg["summary"] = summary
+                to_summarize = []
+
         summary_examples = ""
-        # Generate Summary if LLM is available
         if Logger:
-            for msg in msgs_to_archive:
+            for msg in to_summarize:
                 try:
                     content = msg.get("content", "")
                     prompt = (
@@ -234,7 +645,7 @@ class WarmMemory:
                     )
                     # Assuming llm is a LangChain ChatModel
                     summary_response = Logger.invoke(prompt)
-                    msg["summary"] = summary_response.content
+                    msg["summary"] = flatten_content(summary_response.content)
                 except Exception as e:
                     # Handle rate limit gracefully
                     error_str = str(e).lower()
@@ -247,6 +658,41 @@ class WarmMemory:
         if msgs_to_archive:
             ColdMemory.archive_batch(msgs_to_archive)
 
+    @staticmethod
+    def _summarize_batch(msgs: List[Dict[str, Any]]) -> Optional[List[str]]:
+        """
+        Summarizes several messages with one LLM call. Returns a summary per message, or
+        None when the reply isn't a JSON array of the right length (callers then go per message).
+        A rate limit is not retried per message: every message gets the skipped marker.
+        """
+        numbered = "\n".join(f"{i}: {m.get('content', '')}" for i, m in enumerate(msgs, 1))
+        prompt = (
+            f"""Summarize each of these {len(msgs)} chat messages for future retrieval (not too long but enough to get blur picture of the conversation).
+            Include key entities (only if there are any) and key words which make easy to retrieve context without needing any specefic words (Only 3 most relevent keywords MAX).
+            If User or Any Agent Returns empty response like "" then in summary just say user asked this agent retured empty response.
+            Return ONLY a JSON array of {len(msgs)} strings, one summary per message, in order.
+            Messages:
+            {numbered}"""
+        )
+        try:
+            content = flatten_content(Logger.invoke(prompt).content)
+        except Exception as e:
+            error_str = str(e).lower()
+            if "rate_limit" in error_str or "429" in error_str:
+                print("⚠️ Rate limit hit, archiving without summary")
+                return ["[Summary skipped - rate limit]"] * len(msgs)
+            print(f"⚠️ Failed to generate summaries: {e}")
+            return ["[Summary generation failed]"] * len(msgs)
+
+        match = _FENCE_RE.search(content)
+        try:
+            summaries = _loads(match.group(1) if match else content)
+        except ValueError:
+            return None
+        if not isinstance(summaries, list) or len(summaries) != len(msgs):
+            return None
+        return [s if isinstance(s, str) else str(s) for s in summaries]
+
 
 # ==========================================================
 # 🧊 COLD MEMORY (Qdrant - Archive)
@@ -0,0 +1,12 @@
+"""
+messages.py
+
+Helpers for LangChain message contents shared by the agents and the memory layer.
+"""
+
+
+def flatten_content(content) -> str:
+    """Joins the text parts of a list-style message content (Gemini) into one string."""
+    if isinstance(content, list):
+        return "\n".join(p["text"] for p in content if isinstance(p, dict) and "text" in p).strip()
+    return str(content).strip()
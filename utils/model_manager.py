@@ -1,17 +1,96 @@
 import os
-from typing import Dict, Any, List
+import time
+import asyncio
+import threading
+from types import MappingProxyType
+from typing import Dict, Any, List, Optional
 
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_openai import ChatOpenAI
+# Provider SDKs (langchain_google_genai / langchain_openai) are imported where a model of that
+# type is first built: each pulls in a large dependency tree that most runs only half use.
+from langchain_core.utils.function_calling import convert_to_openai_tool
 from dotenv import load_dotenv
 
 load_dotenv()
 
-load_dotenv()
-
 # Global override for model switching across all agents
 _MANUAL_MODEL_OVERRIDE = None
 
+# Shared by every ModelManager: provider switches / fallbacks reuse model clients,
+# tool schemas (serialized once) and tool-bound runnables instead of rebuilding them.
+_MODEL_CACHE: Dict[tuple, Any] = {}         # (model_id, temperature) -> model
+_TOOL_SCHEMA_CACHE: Dict[tuple, list] = {}  # tool names -> OpenAI-format schemas
+_BOUND_CACHE: Dict[tuple, tuple] = {}       # (id(model), tool names) -> (model, bound runnable)
+_MODEL_PROVIDER: Dict[int, str] = {}        # id(cached model) -> provider name
+
+# Provider health for the fallback paths (attempt_llm_call, BaseAgent._ainvoke_with_fallback).
+# After PROVIDER_TRIP_AFTER consecutive failures a provider is skipped for min(60, 2**fails)
+# seconds; once that passes one attempt is let through again (half-open). Healthy providers
+# are tried fastest first, by an EWMA of their successful call latency.
+PROVIDER_TRIP_AFTER = 3
+PROVIDER_EWMA_ALPHA = 0.3
+_PROVIDER_STATE: Dict[str, Dict[str, float]] = {}
+_provider_lock = threading.Lock()
+
+# One HTTP connection pool for every OpenAI-compatible provider (Groq, OpenRouter, Cerebras),
+# so fallbacks and concurrent agents reuse warm TLS connections. Async calls all run on the
+# shared loop (utils/event_loop.py), so a single AsyncClient is safe to share.
+_HTTP_CLIENTS = None
+
+def _shared_http_clients():
+    """Returns (httpx.Client, httpx.AsyncClient), or (None, None) if httpx is unavailable."""
+    global _HTTP_CLIENTS
+    if _HTTP_CLIENTS is None:
+        try:
+            import httpx
+            try:
+                import h2  # noqa: F401  (HTTP/2 support is optional)
+                http2 = True
+            except ImportError:
+                http2 = False
+            # httpx drops idle connections after 5s by default, shorter than the gap between
+            # most agent steps; keep them for a minute so the next call skips the TLS handshake
+            limits = httpx.Limits(max_keepalive_connections=32, max_connections=64, keepalive_expiry=60)
+            timeout = httpx.Timeout(60.0, connect=10.0)
+            _HTTP_CLIENTS = (
+                httpx.Client(limits=limits, http2=http2, timeout=timeout),
+                httpx.AsyncClient(limits=limits, http2=http2, timeout=timeout),
+            )
+        except ImportError:
+            _HTTP_CLIENTS = (None, None)
+    return _HTTP_CLIENTS
+
+# Model used when switching to a provider without naming a model
+_DEFAULT_MODEL_FOR_PROVIDER = {
+    "gemini": "gemini-2.5-flash",
+    "groq": "qwen3-32b",
+    "openrouter": "llama-3.3-70b",
+    "cerebras": "qwen-3-32b",
+}
+
+_PREWARMED = set()
+
+def _prewarm(base_url: str):
+    """
+    Opens a connection to an OpenAI-compatible provider in the background (once per URL)
+    so the DNS + TCP + TLS setup overlaps with prompt building instead of the first call.
+    Goes through the shared async client: the async model calls reuse its pool.
+    """
+    if base_url in _PREWARMED:
+        return
+    _PREWARMED.add(base_url)
+    _, http_async_client = _shared_http_clients()
+    if http_async_client is None:
+        return
+    from utils.event_loop import get_loop
+
+    async def _head():
+        try:
+            await http_async_client.head(base_url)
+        except Exception:
+            pass  # best effort: the real request will report real errors
+
+    asyncio.run_coroutine_threadsafe(_head(), get_loop())
+
 def switch_to_provider(provider: str, model_id: str = None):
     """
     Globally switches the active model provider for ALL agents.
@@ -19,24 +98,46 @@ def switch_to_provider(provider: str, model_id: str = None):
     global _MANUAL_MODEL_OVERRIDE
     print(f"🔄 Switching global model provider to: {provider}")
     
-    # We create a temporary manager just to get the model object
-    temp_manager = ModelManager()
-    
     # Find a default model for the provider if not specified
     if not model_id:
-        if provider == "gemini": model_id = "gemini-2.5-flash"
-        elif provider == "groq": model_id = "qwen3-32b"
-        elif provider == "openrouter": model_id = "llama-3.3-70b"
-        elif provider == "cerebras": model_id = "qwen-3-32b"
+        model_id = _DEFAULT_MODEL_FOR_PROVIDER.get(provider)
     
     try:
         # We bypass the override check here to actually get the new model
-        _MANUAL_MODEL_OVERRIDE = temp_manager._create_model_instance(model_id)
+        _MANUAL_MODEL_OVERRIDE = _DEFAULT_MANAGER._create_model_instance(model_id)
         print(f"✅ Global model switched to {model_id}")
     except Exception as e:
         print(f"❌ Failed to switch model: {e}")
-    except Exception as e:
-        print(f"❌ Failed to switch model: {e}")
+
+def provider_of(llm) -> Optional[str]:
+    """Provider name ("gemini", "groq", ...) of a model returned by ModelManager, if known."""
+    return _MODEL_PROVIDER.get(id(llm))
+
+def record_provider_result(provider: Optional[str], ok: bool, elapsed: float = 0.0):
+    """Feeds one call outcome into the provider's breaker / latency estimate."""
+    if provider is None:
+        return
+    with _provider_lock:
+        state = _PROVIDER_STATE.setdefault(provider, {"fails": 0, "open_until": 0.0, "ewma": 0.0})
+        if ok:
+            state["fails"], state["open_until"] = 0, 0.0
+            state["ewma"] = elapsed if not state["ewma"] else (
+                PROVIDER_EWMA_ALPHA * elapsed + (1 - PROVIDER_EWMA_ALPHA) * state["ewma"])
+        else:
+            state["fails"] += 1
+            if state["fails"] >= PROVIDER_TRIP_AFTER:
+                state["open_until"] = time.monotonic() + min(60, 2 ** state["fails"])
+
+def fallback_order(providers: List[str], exclude: Optional[str] = None) -> List[str]:
+    """
+    `providers` minus `exclude` and any provider whose breaker is open, fastest first.
+    Providers without a measured latency keep their relative order after the measured ones.
+    """
+    now = time.monotonic()
+    with _provider_lock:
+        states = {p: _PROVIDER_STATE.get(p) for p in providers}
+    usable = [p for p in providers if p != exclude and not (states[p] and now < states[p]["open_until"])]
+    return sorted(usable, key=lambda p: states[p]["ewma"] if states[p] and states[p]["ewma"] else float("inf"))
 
 def attempt_llm_call(manager, messages, max_retries=3):
     """
@@ -44,79 +145,89 @@ def attempt_llm_call(manager, messages, max_retries=3):
     Dynamically reorganizes the provider priority list based on failures.
     """
     # Try current model first
+    llm = manager.get_model()
+    start = time.monotonic()
     try:
-        return manager.get_model().invoke(messages)
+        response = llm.invoke(messages)
+        record_provider_result(provider_of(llm), True, time.monotonic() - start)
+        return response
     except Exception as e:
+        record_provider_result(provider_of(llm), False)
         print(f"⚠️  LLM Call Failed: {e}")
     
     # Extended Fallback sequence including Cerebras
     providers = ["gemini", "groq", "openrouter", "cerebras"]
     
-    # Simple rotation: Try each provider in the list
-    for provider in providers:
+    # Healthy providers only, fastest first
+    for provider in fallback_order(providers, exclude=provider_of(llm)):
         print(f"🔄 Auto-switching to fallback provider: {provider}...")
+        start = time.monotonic()
         try:
             switch_to_provider(provider)
             # We must fetch the model again after switch
             response = manager.get_model().invoke(messages)
+            record_provider_result(provider, True, time.monotonic() - start)
             return response
         except Exception as e:
+             record_provider_result(provider, False)
              print(f"❌ Provider {provider} failed: {e}")
              continue
     
     raise RuntimeError("All LLM providers failed to respond.")
 
+# Define available models configuration
+# Keys are display names or IDs, values are config dicts. Read-only and shared by every
+# ModelManager, so creating one (switch_to_provider, each agent) doesn't rebuild it.
+_MODELS_CONFIG = MappingProxyType({
+    "gemini-2.5-flash": {
+        "type": "google",
+        "model_name": "gemini-2.5-flash",
+        "display_name": "Gemini 2.5 Flash (Google)"
+    },
+    "gemini-2.5-pro": {
+        "type": "google",
+        "model_name": "gemini-2.5-pro",
+        "display_name": "Gemini 2.5 Pro (Google)"
+    },
+    "gpt-oss-120b": {
+        "type": "cerebras",
+        "model_name": "gpt-oss-120b",
+        "display_name": "GPT-OSS 120B (Cerebras)"
+    },
+    "qwen3-32b": {
+        "type": "groq",
+        "model_name": "qwen/qwen3-32b",
+        "display_name": "Qwen3 32B (Groq)"
+    },
+    "llama-3.3-70b": {
+        "type": "openrouter",
+        "model_name": "meta-llama/llama-3.3-70b-instruct:free",
+        "display_name": "Llama 3.3 70B (OpenRouter)"
+    },
+    "qwen-3-32b": {
+        "type": "cerebras",
+        "model_name": "qwen-3-32b",
+        "display_name": "Qwen 3 32B (Cerebras)"
+    },
+    "zai-glm-4.6": {
+        "type": "cerebras",
+        "model_name": "zai-glm-4.6",
+        "display_name": "Zai GLM 4.6 (Cerebras)"
+    }
+})
+
+_LIST_MODELS = tuple({"id": key, "name": val["display_name"]} for key, val in _MODELS_CONFIG.items())
+
 class ModelManager:
+    models_config = _MODELS_CONFIG
+
     def __init__(self):
         # Default model
         self.current_model_name = "qwen3-32b"
-        
-        # Define available models configuration
-        # Keys are display names or IDs, values are config dicts
-        self.models_config = {
-            "gemini-2.5-flash": {
-                "type": "google",
-                "model_name": "gemini-2.5-flash",
-                "display_name": "Gemini 2.5 Flash (Google)"
-            },
-            "gemini-2.5-pro": {
-                "type": "google",
-                "model_name": "gemini-2.5-pro",
-                "display_name": "Gemini 2.5 Pro (Google)"
-            },
-            "gpt-oss-120b": {
-                "type": "cerebras",
-                "model_name": "gpt-oss-120b",
-                "display_name": "GPT-OSS 120B (Cerebras)"
-            },
-            "qwen3-32b": {
-                "type": "groq",
-                "model_name": "qwen/qwen3-32b",
-                "display_name": "Qwen3 32B (Groq)"
-            },
-            "llama-3.3-70b": {
-                "type": "openrouter",
-                "model_name": "meta-llama/llama-3.3-70b-instruct:free",
-                "display_name": "Llama 3.3 70B (OpenRouter)"
-            },
-            "qwen-3-32b": {
-                "type": "cerebras",
-                "model_name": "qwen-3-32b",
-                "display_name": "Qwen 3 32B (Cerebras)"
-            },
-            "zai-glm-4.6": {
-                "type": "cerebras",
-                "model_name": "zai-glm-4.6",
-                "display_name": "Zai GLM 4.6 (Cerebras)"
-            }
-        }
 
     def list_models(self) -> List[Dict[str, Any]]:
         """Returns a list of available models with metadata."""
-        return [
-            {"id": key, "name": val["display_name"]} 
-            for key, val in self.models_config.items()
-        ]
+        return [dict(m) for m in _LIST_MODELS]
 
     def get_model(self, model_id: str = None, temperature: float = 0):
         """
@@ -132,20 +243,59 @@ class ModelManager:
         
         return self._create_model_instance(model_id, temperature)
 
+    def get_model_with_tools(self, tools: List[Any], model_id: str = None, temperature: float = 0):
+        """
+        Returns the current model with `tools` bound, cached per (model instance, tool set).
+        Tool schemas are converted to the OpenAI format once and reused for every provider.
+        """
+        llm = self.get_model(model_id, temperature)
+        tool_names = tuple(t.name for t in tools)
+
+        cached = _BOUND_CACHE.get((id(llm), tool_names))
+        if cached is not None and cached[0] is llm:
+            return cached[1]
+
+        schemas = _TOOL_SCHEMA_CACHE.get(tool_names)
+        if schemas is None:
+            schemas = [convert_to_openai_tool(t) for t in tools]
+            _TOOL_SCHEMA_CACHE[tool_names] = schemas
+
+        bound = llm.bind_tools(schemas)
+        _BOUND_CACHE[(id(llm), tool_names)] = (llm, bound)
+        return bound
+
     def _create_model_instance(self, model_id: str, temperature: float = 0):
-        """Internal method to create the model object."""
+        """Returns the (cached) model object for model_id."""
         if model_id not in self.models_config:
             raise ValueError(f"Model {model_id} not found.")
 
+        cached = _MODEL_CACHE.get((model_id, temperature))
+        if cached is not None:
+            self.current_model_name = model_id
+            return cached
+
+        model = self._build_model_instance(model_id, temperature)
+        # Don't cache the Gemini fallback under the requested model's key
+        if self.current_model_name == model_id:
+            _MODEL_CACHE[(model_id, temperature)] = model
+        model_type = self.models_config[self.current_model_name]["type"]
+        _MODEL_PROVIDER[id(model)] = "gemini" if model_type == "google" else model_type
+        return model
+
+    def _build_model_instance(self, model_id: str, temperature: float = 0):
+        """Internal method to create the model object."""
+
         config = self.models_config[model_id]
         model_type = config["type"]
         name = config["model_name"]
 
         # Update current default if successful
         self.current_model_name = model_id
+        http_client, http_async_client = _shared_http_clients()
 
         try:
             if model_type == "google":
+                from langchain_google_genai import ChatGoogleGenerativeAI
                 return ChatGoogleGenerativeAI(
                     model=name,
                     temperature=temperature
@@ -156,11 +306,15 @@ class ModelManager:
                 api_key = os.getenv("GROQ_API_KEY")
                 if not api_key:
                     print("⚠️  WARNING: GROQ_API_KEY not found in environment.")
+                _prewarm("https://api.groq.com/openai/v1")
+                from langchain_openai import ChatOpenAI
                 return ChatOpenAI(
                     model=name,
                     temperature=temperature,
                     api_key=api_key,
-                    base_url="https://api.groq.com/openai/v1"
+                    base_url="https://api.groq.com/openai/v1",
+                    http_client=http_client,
+                    http_async_client=http_async_client
                 )
                 
             elif model_type == "openrouter":
@@ -168,11 +322,15 @@ class ModelManager:
                 api_key = os.getenv("OPENROUTER_API_KEY")
                 if not api_key:
                     print("⚠️  WARNING: OPENROUTER_API_KEY not found in environment.")
+                _prewarm("https://openrouter.ai/api/v1")
+                from langchain_openai import ChatOpenAI
                 return ChatOpenAI(
                     model=name,
                     temperature=temperature,
                     api_key=api_key,
-                    base_url="https://openrouter.ai/api/v1" 
+                    base_url="https://openrouter.ai/api/v1",
+                    http_client=http_client,
+                    http_async_client=http_async_client
                 )
 
             elif model_type == "cerebras":
@@ -180,15 +338,25 @@ class ModelManager:
                 api_key = os.getenv("CEREBRAS_API_KEY")
                 if not api_key:
                     print("⚠️  WARNING: CEREBRAS_API_KEY not found in environment.")
+                _prewarm("https://api.cerebras.ai/v1")
+                from langchain_openai import ChatOpenAI
                 return ChatOpenAI(
                     model=name,
                     temperature=temperature,
                     api_key=api_key,
-                    base_url="https://api.cerebras.ai/v1"
+                    base_url="https://api.cerebras.ai/v1",
+                    http_client=http_client,
+                    http_async_client=http_async_client
                 )
         except Exception as e:
             print(f"❌ Error initializing model {model_id}: {e}")
             # Fallback to default if everything fails to avoid crash
+            if (model_id, temperature) == ("gemini-2.5-flash", 0):
+                raise
             print("Defaulting back to Gemini 2.5 Flash...")
-            self.current_model_name = "gemini-2.5-flash"
-            return ChatGoogleGenerativeAI(model="gemini-2.5-flash", temperature=0)
+            # Through the cache: every failed build shares one Gemini client (and its channel)
+            return self._create_model_instance("gemini-2.5-flash")
+
+
+# Used by switch_to_provider: one manager (and its models_config) for every switch
+_DEFAULT_MANAGER = ModelManager()
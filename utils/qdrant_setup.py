@@ -16,8 +16,16 @@ Configuration:
 
 import asyncio
 import threading
+import logging
 import os
+import re
 import json
+import time
+import hashlib
+import sqlite3
+from functools import lru_cache
+from collections import OrderedDict
+from pathlib import Path
 from typing import Optional, List, Dict, Any
 from dotenv import load_dotenv
 from mcp import ClientSession, StdioServerParameters
@@ -28,20 +36,78 @@ load_dotenv()
 
 QDRANT_URL = os.getenv("QDRANT_URL")
 QDRANT_API_KEY = os.getenv("QDRANT_API_KEY")
+# Optional already-running mcp-server-qdrant (SSE endpoint, e.g. http://127.0.0.1:8000/sse) shared by
+# every process, instead of spawning a fresh server per process. Start one with:
+#   python -m utils.qdrant_setup --transport sse
+MCP_QDRANT_URL = os.getenv("MCP_QDRANT_URL")
+
+# Collections written through the MCP server, and the vector it stores in them
+MCP_COLLECTIONS = ("chat_logs_mcp", "context_store")
+MCP_VECTOR_NAME = "fast-all-minilm-l6-v2"
+MCP_VECTOR_SIZE = 384
+logger = logging.getLogger(__name__)
+MCP_MAX_CONCURRENCY = 16   # tool calls in flight at once on the MCP session
+# mcp-server-qdrant's qdrant-find has no per-call limit; the server returns QDRANT_SEARCH_LIMIT
+# hits (default 10). Our callers use top_k <= 5, so don't make it fetch and send more than that.
+MCP_SEARCH_LIMIT = "5"
+_FIND_LIMIT_PARAMS = ("limit", "top_k", "query_limit")
+
+def tune_collections():
+    """
+    Creates the MCP collections (if missing) or updates them with binary quantization,
+    HNSW m=16 / ef_construct=100 and on-disk payloads. The MCP server creates collections
+    with Qdrant's defaults, so this is done directly with qdrant-client.
+    """
+    if not QDRANT_URL:
+        return
+    try:
+        from qdrant_client import QdrantClient
+        from qdrant_client.http import models
+
+        client = QdrantClient(url=QDRANT_URL, api_key=QDRANT_API_KEY or None)
+        quantization = models.BinaryQuantization(binary=models.BinaryQuantizationConfig(always_ram=True))
+        hnsw = models.HnswConfigDiff(m=16, ef_construct=100)
+
+        for name in MCP_COLLECTIONS:
+            if not client.collection_exists(name):
+                client.create_collection(
+                    collection_name=name,
+                    vectors_config={
+                        MCP_VECTOR_NAME: models.VectorParams(size=MCP_VECTOR_SIZE, distance=models.Distance.COSINE)
+                    },
+                    hnsw_config=hnsw,
+                    quantization_config=quantization,
+                    on_disk_payload=True,
+                )
+            else:
+                client.update_collection(
+                    collection_name=name,
+                    hnsw_config=hnsw,
+                    quantization_config=quantization,
+                    collection_params=models.CollectionParamsDiff(on_disk_payload=True),
+                )
+    except Exception as e:
+        print(f"⚠️ Qdrant collection tuning skipped: {e}")
+
+def _server_env() -> Dict[str, str]:
+    """Environment for the mcp-server-qdrant process (spawned per wrapper, or shared via MCP_QDRANT_URL)."""
+    # Ensure environment variables are set
+    env = os.environ.copy()
+    if QDRANT_URL:
+        env["QDRANT_URL"] = QDRANT_URL
+    if QDRANT_API_KEY:
+        env["QDRANT_API_KEY"] = QDRANT_API_KEY
+    
+    # Workaround for mcp-server-qdrant bug with make_partial_function
+    # The server uses a helper that breaks Pydantic validation for FastMCP tools.
+    # Setting this environment variable bypasses that helper.
+    env["QDRANT_ALLOW_ARBITRARY_FILTER"] = "true"
+    env.setdefault("QDRANT_SEARCH_LIMIT", MCP_SEARCH_LIMIT)
+    return env
 
 class QdrantMCPWrapper:
     def __init__(self):
-        # Ensure environment variables are set
-        env = os.environ.copy()
-        if QDRANT_URL:
-            env["QDRANT_URL"] = QDRANT_URL
-        if QDRANT_API_KEY:
-            env["QDRANT_API_KEY"] = QDRANT_API_KEY
-        
-        # Workaround for mcp-server-qdrant bug with make_partial_function
-        # The server uses a helper that breaks Pydantic validation for FastMCP tools.
-        # Setting this environment variable bypasses that helper.
-        env["QDRANT_ALLOW_ARBITRARY_FILTER"] = "true"
+        env = _server_env()
         
         # Use the current python executable to run the module
         # We use -c execution to ensure the main() function is called, as the module
@@ -59,21 +125,38 @@ class QdrantMCPWrapper:
         self._session = None
         self._session_ready = threading.Event()
         self._shutdown_event = None # Initialized in loop
+        self._tuned = False
+        self._start_lock = threading.Lock()
+        self.find_limit_param: Optional[str] = None   # qdrant-find's per-call limit argument, if it has one
 
     def start(self):
         """Starts the MCP server in a background thread if not already running."""
-        # Only start the thread if it's not running
-        if not (self._thread and self._thread.is_alive()):
-            print(f"DEBUG: Starting new MCP thread. Current thread: {threading.current_thread().name}")
-            self._loop = asyncio.new_event_loop()
-            self._thread = threading.Thread(target=self._run_loop, daemon=True)
-            self._thread.start()
-        else:
-             print(f"DEBUG: MCP thread already running: {self._thread.name}")
-        
-        # Always wait for session to be ready, regardless of who started the thread
-        if not self._session_ready.wait(timeout=20):
-             raise RuntimeError("Timeout waiting for MCP server to start")
+        # Fast path: session up and collections tuned, no locking or waiting
+        if self._session is not None and self._tuned:
+            return
+
+        # One caller at a time past this point, so a race can't spin up two loops/servers
+        with self._start_lock:
+            if self._session is not None and self._tuned:
+                return
+
+            # Only start the thread if it's not running
+            if not (self._thread and self._thread.is_alive()):
+                logger.debug("Starting new MCP thread. Current thread: %s", threading.current_thread().name)
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._run_loop, daemon=True)
+                self._thread.start()
+            else:
+                 logger.debug("MCP thread already running: %s", self._thread.name)
+            
+            # Wait for session to be ready, regardless of who started the thread
+            if not self._session_ready.wait(timeout=20):
+                 raise RuntimeError("Timeout waiting for MCP server to start")
+
+            # Apply collection tuning once per process, before the first store can create them
+            if not self._tuned:
+                tune_collections()
+                self._tuned = True
 
     def _run_loop(self):
         """Runs the asyncio loop in the background thread."""
@@ -83,10 +166,17 @@ class QdrantMCPWrapper:
 
     async def _lifecycle(self):
         """Manages the lifecycle of the MCP session."""
+        if MCP_QDRANT_URL:
+            # Shared long-lived server: no process spawn / imports / embedding model load per run
+            from mcp.client.sse import sse_client
+            transport = sse_client(MCP_QDRANT_URL)
+        else:
+            transport = stdio_client(self.server_params)
         try:
-            async with stdio_client(self.server_params) as (read, write):
+            async with transport as (read, write):
                 async with ClientSession(read, write) as session:
                     await session.initialize()
+                    await self._discover_find_limit(session)
                     self._session = session
                     self._session_ready.set()
                     
@@ -94,13 +184,23 @@ class QdrantMCPWrapper:
                     await self._shutdown_event.wait()
         except Exception as e:
             print(f"MCP Session Error: {type(e).__name__}: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.debug("MCP session traceback", exc_info=True)
         finally:
-            print("DEBUG: MCP Session Ended")
+            logger.debug("MCP Session Ended")
             self._session = None
             self._session_ready.clear()
 
+    async def _discover_find_limit(self, session):
+        """Checks once whether qdrant-find accepts a result limit, so we never send an ignored one."""
+        try:
+            listed = await session.list_tools()
+            for t in listed.tools:
+                if t.name == "qdrant-find":
+                    props = (t.inputSchema or {}).get("properties", {})
+                    self.find_limit_param = next((p for p in _FIND_LIMIT_PARAMS if p in props), None)
+        except Exception as e:
+            logger.debug("qdrant-find schema check failed: %s", e)
+
     def run_tool_sync(self, tool_name: str, arguments: Dict[str, Any]) -> Any:
         """Runs a tool synchronously using the persistent session."""
         if not self._session:
@@ -114,13 +214,59 @@ class QdrantMCPWrapper:
                 self._session.call_tool(tool_name, arguments), 
                 self._loop
             )
-            res = future.result()
-            # print(f"DEBUG: Tool {tool_name} returned: {res}") 
-            return res
+            return future.result()
         except Exception as e:
             print(f"Error calling {tool_name}: {e}")
             raise e
 
+    async def run_tool_async(self, tool_name: str, arguments: Dict[str, Any]) -> Any:
+        """Awaitable variant of run_tool_sync for callers running on their own event loop."""
+        if not self._session:
+            await asyncio.to_thread(self.start)
+
+        if not self._session:
+             raise RuntimeError("Failed to initialize MCP session")
+
+        future = asyncio.run_coroutine_threadsafe(
+            self._session.call_tool(tool_name, arguments),
+            self._loop
+        )
+        return await asyncio.wrap_future(future)
+
+    def run_tool_batch_sync(self, tool_name: str, arguments_list: List[Dict[str, Any]],
+                            retries: int = 2) -> List[Any]:
+        """
+        Runs one tool for several argument sets concurrently on the persistent session,
+        so a batch costs about one round trip instead of one per call. Failed calls (raised
+        or isError results, e.g. Qdrant timeouts) are retried with exponential backoff.
+        Returns results in order, with the exception in place of any call that kept failing.
+        """
+        if not self._session:
+            self.start()
+
+        if not self._session:
+             raise RuntimeError("Failed to initialize MCP session")
+
+        async def call(arguments, limit):
+            for attempt in range(retries + 1):
+                try:
+                    async with limit:
+                        res = await self._session.call_tool(tool_name, arguments)
+                    if getattr(res, "isError", False):
+                        raise RuntimeError(" ".join(getattr(c, "text", "") for c in res.content) or "tool error")
+                    return res
+                except Exception:
+                    if attempt == retries:
+                        raise
+                    await asyncio.sleep(0.5 * 2 ** attempt)
+
+        async def call_all():
+            # Bounded so a large archive doesn't flood the server (backoff sleeps don't hold a slot)
+            limit = asyncio.Semaphore(MCP_MAX_CONCURRENCY)
+            return await asyncio.gather(*(call(a, limit) for a in arguments_list), return_exceptions=True)
+
+        return asyncio.run_coroutine_threadsafe(call_all(), self._loop).result()
+
 # Global instance
 mcp_wrapper = QdrantMCPWrapper()
 
@@ -128,46 +274,51 @@ mcp_wrapper = QdrantMCPWrapper()
 
 from datetime import datetime
 
+# Entries per qdrant-store point. 1 keeps one embedding per exchange (best recall for
+# search_chat_history); larger values join entries with "\n---\n" into one payload, trading
+# recall for fewer embeddings/points on large archives.
+CHAT_LOG_STORE_BATCH = int(os.getenv("CHAT_LOG_STORE_BATCH", "1"))
+CHAT_LOG_SEPARATOR = "\n---\n"
+_USER_ROLE = "user"
+_AGENT_ROLES = frozenset({"ai", "assistant", "contextor", "analyst"})
+
 def log_batch_chat(conversations: List[Dict[str, Any]], default_agent: str = "Archived") -> Dict[str, Any]:
     """
     Batch logs chat messages using MCP qdrant-store-memory tool.
     ATTEMPT TO PAIR MESSAGES (User -> Agent) to match requested format:
     [time_stamp, user_query, agent, agent_response, summary]
     """
-    count = 0
-    errors = []
+    memory_texts = []
     
     # Simple pairing logic: Iterate and look for User then Agent
     # If we find Agent without User, we log with empty User query?
     # If we find User without Agent, we wait for next?
     
+    # Unpack every message once up front: (raw role, normalized role, content, timestamp, summary)
+    now = datetime.now().isoformat()  # For messages without a timestamp
+    rows = [(m.get('role', 'unknown'), m.get('role', 'unknown').lower(), m.get('content', ''),
+             m.get('timestamp') or now, m.get('summary', '')) for m in conversations]
+    n = len(rows)
+
     # We will iterate and combine.
     i = 0
-    while i < len(conversations):
-        msg = conversations[i]
-        role = msg.get('role', 'unknown').lower()
-        content = msg.get('content', '')
-        timestamp = msg.get('timestamp', datetime.now().isoformat())
-        summary = msg.get('summary', '')
+    while i < n:
+        _, role, content, timestamp, summary = rows[i]
         
         user_query = ""
         agent_response = ""
         agent_name = default_agent
         
-        if role == 'user':
+        if role == _USER_ROLE:
             user_query = content
             # Look ahead for agent response
-            if i + 1 < len(conversations):
-                next_msg = conversations[i+1]
-                if next_msg.get('role', '').lower() in ['ai', 'assistant', 'contextor', 'analyst']:
-                    agent_response = next_msg.get('content', '')
-                    agent_name = next_msg.get('role', default_agent) # Use the role as agent name
-                    # If the user message didn't have a summary, check the agent message
-                    if not summary:
-                        summary = next_msg.get('summary', '')
-                    i += 1 # Skip next message as we consumed it
+            if i + 1 < n and rows[i + 1][1] in _AGENT_ROLES:
+                # Use the role as agent name; fall back to the agent message's summary
+                agent_name, _, agent_response, _, next_summary = rows[i + 1]
+                summary = summary or next_summary
+                i += 1 # Skip next message as we consumed it
         
-        elif role in ['ai', 'assistant', 'contextor', 'analyst']:
+        elif role in _AGENT_ROLES:
              # Orphan agent message (or system started with specific agent output)
              agent_response = content
              agent_name = role
@@ -177,55 +328,129 @@ def log_batch_chat(conversations: List[Dict[str, Any]], default_agent: str = "Ar
 
         # Construct the requested format
         # [time_stamp, user_query, agent, agent_response, summary]
-        memory_text = f"[{timestamp}, {user_query}, {agent_name}, {agent_response}, {summary}]"
-            
-        try:
-            # Using 'qdrant-store' tool
-            res = mcp_wrapper.run_tool_sync("qdrant-store", {
-                "information": memory_text,
-                "collection_name": "chat_logs_mcp"
-            })
-            #print(f"DEBUG: log_batch_chat store result: {res}")
-            count += 1
-        except Exception as e:
-            errors.append(str(e))
+        memory_texts.append(f"[{timestamp}, {user_query}, {agent_name}, {agent_response}, {summary}]")
         
         i += 1
+
+    if not memory_texts:
+        return {"status": "ok", "count": 0, "errors": []}
+
+    size = max(1, CHAT_LOG_STORE_BATCH)
+    chunks = [memory_texts[j:j + size] for j in range(0, len(memory_texts), size)]
+
+    # Using 'qdrant-store' tool: all chunks in flight at once, each retried on failure
+    try:
+        results = mcp_wrapper.run_tool_batch_sync("qdrant-store", [
+            {"information": CHAT_LOG_SEPARATOR.join(chunk), "collection_name": "chat_logs_mcp"} for chunk in chunks
+        ])
+        # A joined payload the server kept rejecting: store its entries one by one instead
+        rejected = [chunk for chunk, r in zip(chunks, results) if isinstance(r, BaseException) and len(chunk) > 1]
+        if rejected:
+            singles = [text for chunk in rejected for text in chunk]
+            retried = mcp_wrapper.run_tool_batch_sync("qdrant-store", [
+                {"information": text, "collection_name": "chat_logs_mcp"} for text in singles
+            ])
+    except Exception as e:
+        return {"status": "error", "count": 0, "errors": [str(e)]}
+    finally:
+        invalidate_search_cache("chat_logs_mcp")
+
+    count, errors = 0, []
+    for chunk, r in zip(chunks, results):
+        if not isinstance(r, BaseException):
+            count += len(chunk)
+        elif len(chunk) == 1:
+            errors.append(str(r))
+    if rejected:
+        errors.extend(str(r) for r in retried if isinstance(r, BaseException))
+        count += sum(1 for r in retried if not isinstance(r, BaseException))
             
     return {"status": "ok" if not errors else "partial_error", "count": count, "errors": errors}
             
 
 
+# Recent qdrant-find results keyed by (query, collection, top_k): agent loops often repeat the same
+# search, which would otherwise cost an MCP round trip + embedding + vector search each time.
+# Entries expire after SEARCH_CACHE_TTL seconds and are dropped whenever we store into the
+# collection, so a fresh write is visible to the next search.
+SEARCH_CACHE_SIZE = 512
+SEARCH_CACHE_TTL = 30.0
+_SEARCH_CACHE: "OrderedDict[tuple, tuple]" = OrderedDict()   # key -> (expires_at, result)
+_SEARCH_LOCK = threading.Lock()
+
+SEARCH_TRUNCATE_CHARS = 1000
+_TRUNCATED = "... [TRUNCATED]"
+# qdrant-find answers with a "Results for the query ..." header item, then one item per hit
+_FIND_HEADER = "Results for the query"
+_ENTRY_RE = re.compile(r"<entry><content>(.*)</content><metadata>(.*)</metadata></entry>", re.DOTALL)
+
+def _find_hits(result: Any, top_k: int, truncate: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Splits a qdrant-find result into up to top_k {"text", "metadata"} hits."""
+    content = getattr(result, 'content', None)
+    if not isinstance(content, list):
+        return [{"text": str(result), "metadata": {}}]
+    hits = []
+    for item in content:
+        text = getattr(item, 'text', None)
+        if text is None:
+            text = str(item)
+        if text.startswith(_FIND_HEADER):
+            continue
+        metadata = {}
+        match = _ENTRY_RE.fullmatch(text)
+        if match:
+            text = match.group(1)
+            try:
+                metadata = json.loads(match.group(2)) if match.group(2) else {}
+            except ValueError:
+                pass
+        if truncate is not None and len(text) > truncate:
+            text = text[:truncate] + _TRUNCATED
+        hits.append({"text": text, "metadata": metadata})
+        if len(hits) >= top_k:
+            break
+    return hits
+
+def invalidate_search_cache(collection: Optional[str] = None):
+    """Drops cached search results (for one collection, or all)."""
+    with _SEARCH_LOCK:
+        if collection is None:
+            _SEARCH_CACHE.clear()
+        else:
+            for key in [k for k in _SEARCH_CACHE if k[1] == collection]:
+                del _SEARCH_CACHE[key]
+
+def _find(query: str, collection: str, top_k: int) -> Any:
+    """qdrant-find through the search cache. Errors propagate and are not cached."""
+    key = (query, collection, top_k)
+    now = time.monotonic()
+    with _SEARCH_LOCK:
+        hit = _SEARCH_CACHE.get(key)
+        if hit is not None and hit[0] > now:
+            _SEARCH_CACHE.move_to_end(key)
+            return hit[1]
+    arguments = {"query": query, "collection_name": collection}
+    if mcp_wrapper.find_limit_param:
+        arguments[mcp_wrapper.find_limit_param] = top_k
+    result = mcp_wrapper.run_tool_sync("qdrant-find", arguments)
+    if not getattr(result, "isError", False):
+        with _SEARCH_LOCK:
+            _SEARCH_CACHE[key] = (now + SEARCH_CACHE_TTL, result)
+            _SEARCH_CACHE.move_to_end(key)
+            while len(_SEARCH_CACHE) > SEARCH_CACHE_SIZE:
+                _SEARCH_CACHE.popitem(last=False)
+    return result
+
 def search_chat_history(query: str, top_k: int = 2, metadata_filter: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
     """
     Searches chat history using MCP qdrant-find tool.
     """
     try:
         # qdrant-find usually takes 'query'
-        result = mcp_wrapper.run_tool_sync("qdrant-find", {
-            "query": query,
-            "collection_name": "chat_logs_mcp"
-        })
+        result = _find(query, "chat_logs_mcp", top_k)
         
-        # Parse result to extract text from content
-        found_text = []
-        if hasattr(result, 'content') and isinstance(result.content, list):
-            for item in result.content:
-                text_content = ""
-                if hasattr(item, 'text'):
-                    text_content = item.text
-                else:
-                    text_content = str(item)
-                
-                # Truncate to avoid exploding context window
-                if len(text_content) > 1000:
-                    text_content = text_content[:1000] + "... [TRUNCATED]"
-                found_text.append(text_content)
-        else:
-             found_text.append(str(result))
-             
-        full_text = "\n\n".join(found_text)
-        return [{"text": full_text, "metadata": {}}] 
+        # One entry per hit, truncated to avoid exploding context window
+        return _find_hits(result, top_k, truncate=SEARCH_TRUNCATE_CHARS)
     except Exception as e:
         print(f"MCP Search Error: {e}")
         return []
@@ -235,44 +460,125 @@ def search_context(query: str, top_k: int = 5) -> List[Dict[str, Any]]:
     Searches context using MCP.
     """
     try:
-        result = mcp_wrapper.run_tool_sync("qdrant-find", {
-            "query": query,
-            "collection_name": "context_store"
-        })
-        
-        # Parse result to extract text from content
-        found_text = []
-        if hasattr(result, 'content') and isinstance(result.content, list):
-            for item in result.content:
-                if hasattr(item, 'text'):
-                    found_text.append(item.text)
-                else:
-                    found_text.append(str(item))
-        else:
-             found_text.append(str(result))
-             
-        full_text = "\n\n".join(found_text)
-        return [{"text": full_text, "metadata": {}}]
+        result = _find(query, "context_store", top_k)
+        return _find_hits(result, top_k)
     except Exception as e:
         print(f"MCP Context Search Error: {e}")
         return []
 
+def _store_result_message(result: Any) -> str:
+    """Extracts a readable message from a qdrant-store result."""
+    content = getattr(result, 'content', None)
+    if not content:
+        return str(result)
+    msg = getattr(content[0], 'text', None)
+    return msg if msg is not None else str(content[0])
+
+# --- Context Upsert Dedup ---
+# Hashes of context entries already stored, so an unchanged summary is not re-embedded.
+# Keyed by Qdrant URL + collection, and a hit is confirmed against Qdrant before skipping,
+# so a repointed QDRANT_URL or a collection dropped elsewhere doesn't block re-storing.
+_UPSERTS_DB = Path(__file__).parent / "context_upserts.db"
+_upserts_lock = threading.Lock()
+_CONTEXT_COLLECTION = "context_store"
+
+def _context_hash(info: str, collection: str = _CONTEXT_COLLECTION) -> str:
+    return hashlib.sha256(f"{QDRANT_URL or ''}\n{collection}\n{info}".encode("utf-8")).hexdigest()
+
+@lru_cache(maxsize=1)
+def _dedup_client():
+    from qdrant_client import QdrantClient
+    return QdrantClient(url=QDRANT_URL, api_key=QDRANT_API_KEY or None)
+
+def _point_exists(info: str, collection: str = _CONTEXT_COLLECTION) -> bool:
+    """True if an entry with exactly this text is in `collection` (mcp-server-qdrant's "document" payload)."""
+    if not QDRANT_URL:
+        return True  # local storage owned by the MCP server: nothing to check against
+    try:
+        from qdrant_client.http import models
+        return _dedup_client().count(
+            collection_name=collection,
+            count_filter=models.Filter(must=[
+                models.FieldCondition(key="document", match=models.MatchValue(value=info))
+            ]),
+            exact=True,
+        ).count > 0
+    except Exception:
+        return False  # e.g. the collection is gone: store again
+
+def _already_stored(info: str, info_hash: str) -> bool:
+    return _is_stored(info_hash) and _point_exists(info)
+
+def _is_stored(info_hash: str) -> bool:
+    try:
+        with _upserts_lock, sqlite3.connect(_UPSERTS_DB) as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS upserts (hash TEXT PRIMARY KEY, ts TEXT)")
+            return conn.execute("SELECT 1 FROM upserts WHERE hash = ?", (info_hash,)).fetchone() is not None
+    except sqlite3.Error as e:
+        print(f"⚠️ Context dedup lookup failed: {e}")
+        return False
+
+def _mark_stored(info_hash: str):
+    try:
+        with _upserts_lock, sqlite3.connect(_UPSERTS_DB) as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS upserts (hash TEXT PRIMARY KEY, ts TEXT)")
+            conn.execute("INSERT OR REPLACE INTO upserts VALUES (?, ?)", (info_hash, datetime.now().isoformat()))
+    except sqlite3.Error as e:
+        print(f"⚠️ Context dedup write failed: {e}")
+
+def clear_context_dedup():
+    """Forgets every stored-context hash (call when context_store is deleted)."""
+    try:
+        with _upserts_lock, sqlite3.connect(_UPSERTS_DB) as conn:
+            conn.execute("DROP TABLE IF EXISTS upserts")
+    except sqlite3.Error as e:
+        print(f"⚠️ Context dedup reset failed: {e}")
+
+def _context_info(text: str, dataset: str, agent: str, section: str) -> str:
+    """The stored (and dedup-hashed) form of a context entry."""
+    return f"SECTION: {section}\nDATASET: {dataset}\nAGENT: {agent}\nCONTENT: {text}"
+
 def update_context(text: str, dataset: str = "Unknown", agent: str = "Contextor", section: str = "General") -> str:
     """
     Updates the context store (replacing old update_context from test_memory_sys).
+    Identical entries that were already stored are skipped (no re-embedding).
     """
-    info = f"SECTION: {section}\nDATASET: {dataset}\nAGENT: {agent}\nCONTENT: {text}"
+    info = _context_info(text, dataset, agent, section)
+    info_hash = _context_hash(info)
+    if _already_stored(info, info_hash):
+        return "Context unchanged: already stored."
     try:
         result = mcp_wrapper.run_tool_sync("qdrant-store", {
             "information": info,
-            "collection_name": "context_store"
+            "collection_name": _CONTEXT_COLLECTION
+        })
+        invalidate_search_cache(_CONTEXT_COLLECTION)
+        if getattr(result, "isError", False):
+            return f"Error updating context: {_store_result_message(result)}"
+        _mark_stored(info_hash)
+        return f"Context updated: {_store_result_message(result)}"
+    except Exception as e:
+        print(f"MCP Context Update Error: {e}")
+        return f"Error updating context: {e}"
+
+async def aupdate_context(text: str, dataset: str = "Unknown", agent: str = "Contextor", section: str = "General") -> str:
+    """
+    Async variant of update_context; does not block the caller's event loop.
+    """
+    info = _context_info(text, dataset, agent, section)
+    info_hash = _context_hash(info)
+    if await asyncio.to_thread(_already_stored, info, info_hash):
+        return "Context unchanged: already stored."
+    try:
+        result = await mcp_wrapper.run_tool_async("qdrant-store", {
+            "information": info,
+            "collection_name": _CONTEXT_COLLECTION
         })
-        # Parse result for cleaner output
-        msg = str(result)
-        if hasattr(result, 'content') and result.content:
-             msg = result.content[0].text if hasattr(result.content[0], 'text') else str(result.content[0])
-             
-        return f"Context updated: {msg}"
+        invalidate_search_cache(_CONTEXT_COLLECTION)
+        if getattr(result, "isError", False):
+            return f"Error updating context: {_store_result_message(result)}"
+        await asyncio.to_thread(_mark_stored, info_hash)
+        return f"Context updated: {_store_result_message(result)}"
     except Exception as e:
         print(f"MCP Context Update Error: {e}")
         return f"Error updating context: {e}"
@@ -291,6 +597,7 @@ def chat_log_add_tool(user_query: str, agent: str, agent_response: str, summary:
             "information": memory_text,
             "collection_name": "chat_logs_mcp"
         })
+        invalidate_search_cache("chat_logs_mcp")
         return f"Logged successfully: {result}"
     except Exception as e:
         return f"Error logging: {e}"
@@ -299,10 +606,15 @@ def chat_log_add_tool(user_query: str, agent: str, agent_response: str, summary:
 def chat_log_search_tool(query: str, top_k: int = 1, metadata_filter_json: Optional[str] = None) -> str:
     """Search chat history for relevant conversations."""
     try:
-        result = mcp_wrapper.run_tool_sync("qdrant-find", {
-            "query": query,
-            "collection_name": "chat_logs_mcp"
-        })
+        result = _find(query, "chat_logs_mcp", top_k)
         return str(result)
     except Exception as e:
         return f"Error searching: {e}"
+
+
+if __name__ == "__main__":
+    # Runs the MCP server with the same settings the wrapper would spawn it with; pass
+    # `--transport sse` for a shared server and point MCP_QDRANT_URL at its /sse endpoint.
+    os.environ.update(_server_env())
+    from mcp_server_qdrant.main import main
+    main()
@@ -0,0 +1,262 @@
+"""
+semantic_cache.py
+
+Qdrant-backed semantic cache for LLM completions.
+
+Key Components:
+- lookup / store: Direct cache access (used by BaseAgent._arobust_invoke).
+- get_or_invoke: Convenience wrapper `llm.invoke(messages)` -> cached completion on hit.
+
+How a hit is decided:
+- The model (id + temperature) and everything except the final message (system prompt,
+  history) must match EXACTLY (sha256 `prefix_hash`, used as a payload filter).
+- A short final message is embedded with the same FastEmbed model the MCP server uses
+  (all-MiniLM-L6-v2) and must score >= threshold (cosine) against a cached prompt.
+- A long final message (> SEMANTIC_MAX_CHARS, e.g. a raw dataset summary) must match
+  EXACTLY: MiniLM truncates long inputs, so two prompts differing only past the cut-off
+  (new row count, new min/max) would embed almost identically.
+- Entries older than CACHE_TTL_SECONDS are never served (and are purged on startup).
+
+Configuration:
+- Uses the `llm_cache` collection with binary quantization (32x smaller vectors in RAM).
+- Disabled silently when QDRANT_URL is not set or fastembed/qdrant-client are unavailable.
+- Cleared together with Cold Memory (manage_memory_tool.clear_cold_memory).
+- Only plain-text completions are cached; responses carrying tool calls are not.
+- Prompts ending in a tool result are never looked up or stored: the answer depends on the
+  exact tool output (numbers), which an embedding match can't tell apart.
+"""
+
+import os
+import json
+import uuid
+import asyncio
+import time
+import hashlib
+import threading
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+from dotenv import load_dotenv
+from langchain_core.messages import AIMessage
+
+load_dotenv()
+
+CACHE_COLLECTION = "llm_cache"
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+VECTOR_NAME = "fast-all-minilm-l6-v2"
+VECTOR_SIZE = 384
+SIMILARITY_THRESHOLD = 0.92
+SEMANTIC_MAX_CHARS = 1000  # ~256 MiniLM word pieces; longer final messages need an exact match
+CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+_client = None
+_embedder = None
+_disabled = False
+_init_lock = threading.Lock()
+
+
+def _init() -> bool:
+    """Lazily connects to Qdrant, loads the embedder and ensures the cache collection exists."""
+    global _client, _embedder, _disabled
+    if _client is not None:
+        return True
+    if _disabled:
+        return False
+
+    with _init_lock:
+        if _client is not None:
+            return True
+        url = os.getenv("QDRANT_URL", "").strip()
+        if not url:
+            _disabled = True
+            return False
+        try:
+            from fastembed import TextEmbedding
+            from qdrant_client import QdrantClient
+            from qdrant_client.http import models
+
+            client = QdrantClient(url=url, api_key=os.getenv("QDRANT_API_KEY", "").strip() or None)
+            if not client.collection_exists(CACHE_COLLECTION):
+                client.create_collection(
+                    collection_name=CACHE_COLLECTION,
+                    vectors_config={
+                        VECTOR_NAME: models.VectorParams(size=VECTOR_SIZE, distance=models.Distance.COSINE)
+                    },
+                    quantization_config=models.BinaryQuantization(
+                        binary=models.BinaryQuantizationConfig(always_ram=True)
+                    ),
+                )
+                client.create_payload_index(CACHE_COLLECTION, "prefix_hash", models.PayloadSchemaType.KEYWORD)
+                client.create_payload_index(CACHE_COLLECTION, "ts_epoch", models.PayloadSchemaType.FLOAT)
+            else:
+                # Purge expired entries (and pre-TTL ones without ts_epoch)
+                client.delete(
+                    collection_name=CACHE_COLLECTION,
+                    points_selector=models.FilterSelector(filter=models.Filter(must_not=[_fresh_condition()])),
+                    wait=False,
+                )
+            _embedder = TextEmbedding(EMBEDDING_MODEL)
+            _client = client
+            return True
+        except Exception as e:
+            print(f"⚠️ Semantic cache disabled: {e}")
+            _disabled = True
+            return False
+
+
+# --- Helpers ---
+
+def _message_text(message: Any) -> str:
+    """Flattens a LangChain message / (role, content) tuple to 'role: content [tool calls]'."""
+    tool_calls = None
+    if isinstance(message, tuple):
+        role, content = message[0], message[1]
+    else:
+        role, content = getattr(message, "type", "message"), getattr(message, "content", message)
+        tool_calls = getattr(message, "tool_calls", None)
+    if isinstance(content, list):
+        content = "\n".join(p.get("text", "") for p in content if isinstance(p, dict))
+    if tool_calls:
+        # Name + args only: call ids are random per run
+        calls = json.dumps([(c.get("name"), c.get("args")) for c in tool_calls], sort_keys=True, default=str)
+        return f"{role}: {content} [tool_calls: {calls}]"
+    return f"{role}: {content}"
+
+
+def _cacheable(messages: List[Any]) -> bool:
+    """False for empty prompts and prompts whose final message is a tool result."""
+    if not messages:
+        return False
+    last = messages[-1]
+    role = last[0] if isinstance(last, tuple) else getattr(last, "type", None)
+    return role != "tool"
+
+
+def _model_key(llm: Any) -> str:
+    """'model_id@temperature' of a chat model (or a bound tool-calling wrapper around one)."""
+    if llm is None:
+        return ""
+    llm = getattr(llm, "bound", llm)
+    model = getattr(llm, "model_name", None) or getattr(llm, "model", None) or type(llm).__name__
+    return f"{model}@{getattr(llm, 'temperature', None)}"
+
+
+def _split_prompt(messages: List[Any], llm: Any = None) -> Tuple[str, str]:
+    """Returns (prefix_hash, final_message_text). The prefix hash covers the model too."""
+    texts = [_message_text(m) for m in messages]
+    prefix = "\n".join([_model_key(llm)] + texts[:-1])
+    prefix_hash = hashlib.sha256(prefix.encode("utf-8")).hexdigest()
+    return prefix_hash, texts[-1] if texts else ""
+
+
+def _point_id(prefix_hash: str, final_text: str) -> str:
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{prefix_hash}:{final_text}"))
+
+
+def _fresh_condition():
+    """Payload condition matching entries younger than CACHE_TTL_SECONDS."""
+    from qdrant_client.http import models
+    return models.FieldCondition(key="ts_epoch", range=models.Range(gte=time.time() - CACHE_TTL_SECONDS))
+
+
+def _embed(text: str) -> List[float]:
+    return next(iter(_embedder.embed([text]))).tolist()
+
+
+# --- Public API ---
+
+def lookup(messages: List[Any], threshold: float = SIMILARITY_THRESHOLD, llm: Any = None) -> Optional[str]:
+    """Returns a cached completion for an equivalent prompt to the same model, or None."""
+    if not _cacheable(messages) or not _init():
+        return None
+    from qdrant_client.http import models
+
+    try:
+        prefix_hash, final_text = _split_prompt(messages, llm)
+        if len(final_text) > SEMANTIC_MAX_CHARS:
+            points = _client.retrieve(
+                collection_name=CACHE_COLLECTION,
+                ids=[_point_id(prefix_hash, final_text)],
+                with_payload=True,
+            )
+            points = [p for p in points if p.payload.get("ts_epoch", 0) >= time.time() - CACHE_TTL_SECONDS]
+        else:
+            points = _client.query_points(
+                collection_name=CACHE_COLLECTION,
+                query=_embed(final_text),
+                using=VECTOR_NAME,
+                query_filter=models.Filter(must=[
+                    models.FieldCondition(key="prefix_hash", match=models.MatchValue(value=prefix_hash)),
+                    _fresh_condition(),
+                ]),
+                search_params=models.SearchParams(
+                    quantization=models.QuantizationSearchParams(rescore=True)
+                ),
+                score_threshold=threshold,
+                limit=1,
+                with_payload=True,
+            ).points
+        if not points:
+            return None
+
+        hit = points[0]
+        _client.set_payload(
+            collection_name=CACHE_COLLECTION,
+            payload={"hits": int(hit.payload.get("hits", 0)) + 1},
+            points=[hit.id],
+            wait=False,
+        )
+        return hit.payload.get("completion")
+    except Exception as e:
+        print(f"⚠️ Semantic cache lookup failed: {e}")
+        return None
+
+
+def store(messages: List[Any], response: Any, llm: Any = None):
+    """Caches a plain-text completion of `llm`. Tool-calling responses are skipped."""
+    if not _cacheable(messages) or getattr(response, "tool_calls", None):
+        return
+    completion = getattr(response, "content", response)
+    if not isinstance(completion, str) or not completion.strip() or not _init():
+        return
+    from qdrant_client.http import models
+
+    try:
+        prefix_hash, final_text = _split_prompt(messages, llm)
+        _client.upsert(
+            collection_name=CACHE_COLLECTION,
+            points=[models.PointStruct(
+                id=_point_id(prefix_hash, final_text),
+                vector={VECTOR_NAME: _embed(final_text)},
+                payload={
+                    "prefix_hash": prefix_hash,
+                    "prompt": final_text,
+                    "completion": completion,
+                    "ts": datetime.now().isoformat(),
+                    "ts_epoch": time.time(),
+                    "hits": 0,
+                },
+            )],
+            wait=False,
+        )
+    except Exception as e:
+        print(f"⚠️ Semantic cache store failed: {e}")
+
+
+def get_or_invoke(llm, messages: List[Any], threshold: float = SIMILARITY_THRESHOLD):
+    """`llm.invoke(messages)` with a semantic cache in front of it."""
+    cached = lookup(messages, threshold=threshold, llm=llm)
+    if cached is not None:
+        return AIMessage(content=cached)
+    response = llm.invoke(messages)
+    store(messages, response, llm)
+    return response
+
+
+async def aget_or_invoke(llm, messages: List[Any], threshold: float = SIMILARITY_THRESHOLD):
+    """Async `llm.ainvoke(messages)` with a semantic cache in front of it."""
+    cached = await asyncio.to_thread(lookup, messages, threshold, llm)
+    if cached is not None:
+        return AIMessage(content=cached)
+    response = await llm.ainvoke(messages)
+    await asyncio.to_thread(store, messages, response, llm)
+    return response